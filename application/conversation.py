@@ -0,0 +1,159 @@
+"""
+@fileoverview Memoria de la conversación entre turnos.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Sin memoria, cada turno envía un prompt nuevo y el modelo vuelve a
+             procesar la instrucción de sistema. ConversationSession mantiene el
+             sistema y el historial como una lista de mensajes que solo crece por
+             el final: así, de un turno al siguiente, el backend encuentra el
+             prefijo en su caché KV y solo evalúa la pregunta nueva. Cuando el
+             historial supera el presupuesto de tokens, los turnos más antiguos
+             se condensan en un resumen (en segundo plano y con holgura, para
+             que el prefijo cambie pocas veces). Tras un periodo de inactividad
+             la conversación empieza de cero.
+"""
+
+import threading
+import time
+from domain.services import ILLMService, ITracer, NullTracer
+
+PROMPT_RESUMEN = ("Resume en pocas frases la conversación siguiente entre un usuario y su asistente Jarvis. "
+                  "Conserva nombres, datos concretos y preferencias del usuario. Responde solo con el resumen.")
+
+def estimar_tokens(texto: str) -> int:
+    """
+    @function estimar_tokens
+    @description Aproximación barata (unos 4 caracteres por token) para el presupuesto;
+                 no hace falta el tokenizador exacto del modelo.
+    """
+    return (len(texto) + 3) // 4
+
+
+class ConversationSession:
+    """
+    @class ConversationSession
+    @description Historial de una conversación con presupuesto de tokens, resumen
+                 de los turnos antiguos y reinicio por inactividad.
+    """
+    def __init__(self, llm_service: ILLMService, prompt_sistema: str, model="mistral", presupuesto_tokens=1500,
+                 fraccion_tras_resumen=0.6, inactividad_s=300.0, tracer: ITracer | None = None):
+        """
+        @param {ILLMService} llm_service - Servicio con el que se generan los resúmenes.
+        @param {str} prompt_sistema - Instrucción de sistema, fija durante toda la sesión.
+        @param {int} presupuesto_tokens - Tokens estimados máximos del historial.
+        @param {float} fraccion_tras_resumen - Tras resumir, el historial queda por debajo
+               de esta fracción del presupuesto; la holgura evita resumir en cada turno.
+        @param {float} inactividad_s - Segundos sin turnos tras los que se olvida la conversación.
+        @param {ITracer | None} tracer - Recibe el tamaño del historial en cada turno.
+        """
+        self.llm_service = llm_service
+        self.prompt_sistema = prompt_sistema
+        self.model = model
+        self.presupuesto_tokens = presupuesto_tokens
+        self.fraccion_tras_resumen = fraccion_tras_resumen
+        self.inactividad_s = inactividad_s
+        self.tracer = tracer or NullTracer()
+        self._lock = threading.Lock()
+        self._resumiendo = False
+        self.stats = {"turnos": 0, "resumenes": 0, "reinicios": 0}
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Olvida el historial y el resumen."""
+        with self._lock:
+            self._historial = []
+            self._resumen = ""
+            self._ultimo_turno = time.monotonic()
+
+    def _tokens_historial(self) -> int:
+        return sum(estimar_tokens(m["content"]) for m in self._historial) + estimar_tokens(self._resumen)
+
+    def _sistema(self) -> list[dict]:
+        mensajes = [{"role": "system", "content": self.prompt_sistema}]
+        if self._resumen:
+            mensajes.append({"role": "system", "content": f"Resumen de la conversación anterior: {self._resumen}"})
+        return mensajes
+
+    def mensajes_para(self, comando: str) -> list[dict]:
+        """
+        @param {str} comando - Pregunta del usuario en este turno.
+        @returns {list[dict]} - Sistema, resumen, historial y la pregunta, listos para 'stream_conversar'.
+        """
+        with self._lock:
+            inactiva = time.monotonic() - self._ultimo_turno
+            if self._historial and inactiva > self.inactividad_s:
+                print(f"🧹 Conversación reiniciada tras {inactiva:.0f} s de inactividad.")
+                self._historial = []
+                self._resumen = ""
+                self.stats["reinicios"] += 1
+            self.tracer.registrar("historial_tokens", self._tokens_historial())
+            return self._sistema() + list(self._historial) + [{"role": "user", "content": comando}]
+
+    def registrar(self, comando: str, respuesta: str):
+        """
+        @param {str} comando - Pregunta del turno.
+        @param {str} respuesta - Lo que el asistente llegó a decir (puede estar cortado
+               por un barge-in); si está vacío, el turno no se guarda.
+        """
+        respuesta = respuesta.strip()
+        with self._lock:
+            self._ultimo_turno = time.monotonic()
+            if not respuesta:
+                return
+            self._historial += [{"role": "user", "content": comando},
+                                {"role": "assistant", "content": respuesta}]
+            self.stats["turnos"] += 1
+            if self._resumiendo or self._tokens_historial() <= self.presupuesto_tokens:
+                return
+            self._resumiendo = True
+        # Fuera del camino crítico: el siguiente turno tarda segundos en llegar.
+        threading.Thread(target=self._resumir, name="resumen-conversacion", daemon=True).start()
+
+    def _resumir(self):
+        """Condensa los turnos más antiguos hasta dejar el historial por debajo del objetivo."""
+        try:
+            with self._lock:
+                objetivo = self.presupuesto_tokens * self.fraccion_tras_resumen
+                n, restantes = 0, self._tokens_historial()
+                # Se conserva al menos el último intercambio completo.
+                while restantes > objetivo and n < len(self._historial) - 2:
+                    restantes -= estimar_tokens(self._historial[n]["content"]) + \
+                                 estimar_tokens(self._historial[n + 1]["content"])
+                    n += 2
+                antiguos = self._historial[:n]
+                resumen_previo = self._resumen
+            if not antiguos:
+                return
+
+            etiquetas = {"user": "Usuario", "assistant": "Jarvis"}
+            transcripcion = "\n".join(f"{etiquetas[m['role']]}: {m['content']}" for m in antiguos)
+            if resumen_previo:
+                transcripcion = f"Resumen previo: {resumen_previo}\n{transcripcion}"
+            inicio = time.perf_counter()
+            generador = self.llm_service.stream_conversar(
+                [{"role": "system", "content": PROMPT_RESUMEN}, {"role": "user", "content": transcripcion}],
+                model=self.model)
+            try:
+                resumen = "".join(generador).strip()
+            finally:
+                generador.close()
+
+            with self._lock:
+                # Si se reinició mientras tanto, el resumen ya no aplica.
+                if self._historial[:n] != antiguos:
+                    return
+                # Si el resumen falla, se descartan los turnos antiguos igualmente.
+                self._resumen = resumen or resumen_previo
+                del self._historial[:n]
+                self.stats["resumenes"] += 1
+            print(f"📝 {n // 2} turno(s) antiguos resumidos en {time.perf_counter() - inicio:.1f} s.")
+        except Exception as e:
+            print(f"Error resumiendo la conversación: {e}")
+        finally:
+            with self._lock:
+                self._resumiendo = False
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {**self.stats, "mensajes": len(self._historial), "tokens_estimados": self._tokens_historial(),
+                    "con_resumen": bool(self._resumen)}
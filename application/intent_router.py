@@ -0,0 +1,286 @@
+"""
+@fileoverview Enrutador de intenciones locales: responde sin el LLM a los comandos simples.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Muchos comandos (la hora, la fecha, temporizadores, volumen, "repite",
+             "para") no necesitan una generación completa del modelo. IntentRouter
+             compila los patrones de todas las intenciones en un trie de palabras
+             sobre el texto normalizado, con huecos tipados (números, unidades de
+             tiempo) que extraen los parámetros. Buscar cuesta lo mismo con diez
+             intenciones que con mil: solo se recorren las ramas que coinciden con
+             las palabras del comando. Los manejadores devuelven un stream de texto,
+             como el LLM, así que el resto del turno no cambia; si ninguna
+             intención coincide, se usa el LLM.
+             Sintaxis de los patrones: palabras literales, "[opcional]" o
+             "[una|otra]", "(una|otra)" y huecos "{nombre:tipo}".
+"""
+
+import itertools
+import re
+import threading
+import time
+import unicodedata
+from typing import Callable, Generator, Iterable
+
+# Palabras que no cambian el sentido del comando y se ignoran al buscar.
+MULETILLAS = frozenset({"jarvis", "oye", "porfa", "porfavor"})
+
+UNIDADES = ["cero", "uno", "dos", "tres", "cuatro", "cinco", "seis", "siete", "ocho", "nueve", "diez",
+            "once", "doce", "trece", "catorce", "quince", "dieciseis", "diecisiete", "dieciocho", "diecinueve",
+            "veinte", "veintiuno", "veintidos", "veintitres", "veinticuatro", "veinticinco", "veintiseis",
+            "veintisiete", "veintiocho", "veintinueve"]
+DECENAS = {"treinta": 30, "cuarenta": 40, "cincuenta": 50, "sesenta": 60, "setenta": 70, "ochenta": 80,
+           "noventa": 90}
+NUMEROS = {**{palabra: i for i, palabra in enumerate(UNIDADES)}, **DECENAS, "un": 1, "una": 1, "cien": 100}
+UNIDADES_TIEMPO = {"segundo": 1, "segundos": 1, "minuto": 60, "minutos": 60, "hora": 3600, "horas": 3600}
+# Cómo se escriben (con tildes) los valores de cada hueco en el vocabulario del
+# reconocedor; sirve para construir la gramática de comandos del STT.
+TILDES = {"dieciseis": "dieciséis", "veintidos": "veintidós", "veintitres": "veintitrés", "veintiseis": "veintiséis"}
+VOCABULARIO_HUECOS = {
+    "numero": [TILDES.get(p, p) for p in UNIDADES[1:]] + [f"{d} y {TILDES.get(u, u)}" for d in DECENAS
+                                                          for u in UNIDADES[1:10]] + list(DECENAS) + ["un", "una", "cien"],
+    "unidad_tiempo": list(UNIDADES_TIEMPO),
+}
+
+def normalizar_comando(texto: str) -> list[str]:
+    """
+    @function normalizar_comando
+    @param {str} texto - Transcripción del STT.
+    @returns {list[str]} - Palabras en minúsculas, sin tildes, signos ni muletillas.
+    """
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"\bpor favor\b", " ", re.sub(r"[^\w\s]", " ", texto))
+    return [palabra for palabra in texto.split() if palabra not in MULETILLAS]
+
+
+def numero_en_palabras(n: int) -> str:
+    """Número de 0 a 100 tal como se dice (para que el TTS lo lea de forma natural)."""
+    if n < len(UNIDADES):
+        return UNIDADES[n]
+    if n == 100:
+        return "cien"
+    decena = next(p for p, v in DECENAS.items() if v == n // 10 * 10)
+    return decena if n % 10 == 0 else f"{decena} y {UNIDADES[n % 10]}"
+
+
+def _leer_numero(palabras: list[str], i: int) -> Iterable[tuple[int, int]]:
+    """Hueco 'numero': cifras o palabras ("veinticinco", "treinta y cinco")."""
+    palabra = palabras[i]
+    if palabra.isdigit():
+        yield int(palabra), 1
+    elif palabra in NUMEROS:
+        valor = NUMEROS[palabra]
+        if palabra in DECENAS and palabras[i + 1:i + 2] == ["y"] and i + 2 < len(palabras) \
+                and 0 < NUMEROS.get(palabras[i + 2], 10) < 10:
+            yield valor + NUMEROS[palabras[i + 2]], 3
+        yield valor, 1
+
+
+def _leer_unidad_tiempo(palabras: list[str], i: int) -> Iterable[tuple[int, int]]:
+    """Hueco 'unidad_tiempo': devuelve los segundos de la unidad."""
+    if palabras[i] in UNIDADES_TIEMPO:
+        yield UNIDADES_TIEMPO[palabras[i]], 1
+
+
+def _leer_texto(palabras: list[str], i: int) -> Iterable[tuple[str, int]]:
+    """Hueco 'texto': una o más palabras libres (de la más larga a la más corta)."""
+    for fin in range(len(palabras), i, -1):
+        yield " ".join(palabras[i:fin]), fin - i
+
+
+TIPOS_DE_HUECO = {"numero": _leer_numero, "unidad_tiempo": _leer_unidad_tiempo, "texto": _leer_texto}
+
+
+class _Nodo:
+    """Nodo privado del trie: hijos literales, hijos-hueco e intención terminal."""
+    __slots__ = ("hijos", "huecos", "intencion")
+
+    def __init__(self):
+        self.hijos = {}
+        self.huecos = []
+        self.intencion = None
+
+
+class IntentRouter:
+    """
+    @class IntentRouter
+    @description Índice de patrones en trie, manejadores enchufables y estadísticas
+                 de acierto y de latencia ahorrada frente al LLM.
+    """
+    def __init__(self, tipos_de_hueco: dict | None = None):
+        """
+        @param {dict | None} tipos_de_hueco - Tipos adicionales: nombre → función
+               (palabras, i) que produce pares (valor, palabras consumidas).
+        """
+        self.tipos_de_hueco = {**TIPOS_DE_HUECO, **(tipos_de_hueco or {})}
+        self._raiz = _Nodo()
+        self._manejadores = {}
+        self._variantes = []
+        self._lock = threading.Lock()
+        self._ultima_respuesta = ""
+        self._ttft_llm = None
+        self.stats = {"consultas": 0, "aciertos": 0, "por_intencion": {}, "ahorro_total_s": 0.0,
+                      "busqueda_total_s": 0.0}
+
+    # --- Registro ------------------------------------------------------------
+
+    def registrar(self, nombre: str, patrones: list[str], manejador: Callable[[dict], Iterable[str]]):
+        """
+        @param {str} nombre - Identificador de la intención.
+        @param {list[str]} patrones - Frases en la sintaxis del módulo.
+        @param {Callable[[dict], Iterable[str]]} manejador - Recibe los huecos extraídos y
+               devuelve el texto de la respuesta (un str o un iterable de trozos).
+        """
+        self._manejadores[nombre] = manejador
+        for patron in patrones:
+            for variante in self._expandir(patron):
+                self._variantes.append(variante)
+                self._insertar(variante, nombre)
+
+    @staticmethod
+    def _expandir(patron: str) -> Iterable[list[str]]:
+        """Convierte opcionales y alternativas en todas las secuencias de palabras posibles."""
+        opciones = []
+        for parte in re.findall(r"\[[^\]]+\]|\([^)]+\)|\{[^}]+\}|\S+", patron):
+            if parte.startswith("["):
+                opciones.append([alternativa.split() for alternativa in parte[1:-1].split("|")] + [[]])
+            elif parte.startswith("("):
+                opciones.append([alternativa.split() for alternativa in parte[1:-1].split("|")])
+            else:
+                opciones.append([[parte]])
+        for combinacion in itertools.product(*opciones):
+            yield [palabra for trozo in combinacion for palabra in trozo]
+
+    def _insertar(self, palabras: list[str], nombre: str):
+        nodo = self._raiz
+        for palabra in palabras:
+            if palabra.startswith("{"):
+                hueco, tipo = palabra[1:-1].split(":")
+                if tipo not in self.tipos_de_hueco:
+                    raise ValueError(f"Tipo de hueco desconocido: {tipo}")
+                siguiente = next((n for h, t, n in nodo.huecos if (h, t) == (hueco, tipo)), None)
+                if siguiente is None:
+                    siguiente = _Nodo()
+                    nodo.huecos.append((hueco, tipo, siguiente))
+            else:
+                # Los literales se normalizan igual que los comandos ("qué" → "que").
+                normalizada = normalizar_comando(palabra)
+                if not normalizada:
+                    continue
+                siguiente = nodo.hijos.setdefault(normalizada[0], _Nodo())
+            nodo = siguiente
+        if nodo.intencion is None:
+            nodo.intencion = nombre
+
+    def frases(self, vocabulario: dict | None = None) -> Iterable[str]:
+        """
+        @param {dict | None} vocabulario - Valores por tipo de hueco; por defecto VOCABULARIO_HUECOS.
+        @returns {Iterable[str]} - Las frases que reconocen las intenciones, tal como se
+                 escribieron los patrones (con tildes), para la gramática del STT. Los
+                 huecos se rellenan recorriendo sus valores en paralelo; las variantes
+                 con huecos sin vocabulario cerrado (p. ej. 'texto') se omiten.
+        """
+        vocabulario = {**VOCABULARIO_HUECOS, **(vocabulario or {})}
+        for variante in self._variantes:
+            huecos = [vocabulario.get(p[1:-1].split(":")[1]) if p.startswith("{") else None for p in variante]
+            if any(p.startswith("{") and valores is None for p, valores in zip(variante, huecos)):
+                continue
+            vueltas = max((len(valores) for valores in huecos if valores), default=1)
+            for k in range(vueltas):
+                yield " ".join(valores[k % len(valores)] if valores else p.lower()
+                               for p, valores in zip(variante, huecos))
+
+    # --- Búsqueda ------------------------------------------------------------
+
+    def _buscar(self, nodo: _Nodo, palabras: list[str], i: int, huecos: dict) -> tuple[str, dict] | None:
+        """Recorre el trie; los literales tienen prioridad sobre los huecos."""
+        if i == len(palabras):
+            return (nodo.intencion, dict(huecos)) if nodo.intencion else None
+        hijo = nodo.hijos.get(palabras[i])
+        if hijo is not None:
+            encontrado = self._buscar(hijo, palabras, i + 1, huecos)
+            if encontrado:
+                return encontrado
+        for hueco, tipo, siguiente in nodo.huecos:
+            for valor, consumidas in self.tipos_de_hueco[tipo](palabras, i):
+                huecos[hueco] = valor
+                encontrado = self._buscar(siguiente, palabras, i + consumidas, huecos)
+                del huecos[hueco]
+                if encontrado:
+                    return encontrado
+        return None
+
+    def resolver(self, comando: str) -> tuple[str, dict] | None:
+        """
+        @param {str} comando - Transcripción final del STT.
+        @returns {tuple[str, dict] | None} - (intención, huecos), o None si hay que preguntar al LLM.
+        """
+        inicio = time.perf_counter()
+        palabras = normalizar_comando(comando)
+        encontrado = self._buscar(self._raiz, palabras, 0, {}) if palabras else None
+        with self._lock:
+            self.stats["consultas"] += 1
+            self.stats["busqueda_total_s"] += time.perf_counter() - inicio
+        return encontrado
+
+    # --- Respuesta y métricas ---------------------------------------------
+
+    def responder(self, intencion: tuple[str, dict]) -> Generator[str, None, None]:
+        """
+        @param {tuple[str, dict]} intencion - Resultado de 'resolver'.
+        @returns {Generator[str, None, None]} - La respuesta del manejador como stream.
+        """
+        nombre, huecos = intencion
+        inicio = time.perf_counter()
+        respuesta = self._manejadores[nombre](huecos)
+        primero = True
+        for trozo in [respuesta] if isinstance(respuesta, str) else respuesta:
+            if primero:
+                primero = False
+                self._contar_acierto(nombre, time.perf_counter() - inicio)
+            yield trozo
+        if primero:
+            self._contar_acierto(nombre, time.perf_counter() - inicio)
+
+    def _contar_acierto(self, nombre: str, latencia: float):
+        with self._lock:
+            self.stats["aciertos"] += 1
+            self.stats["por_intencion"][nombre] = self.stats["por_intencion"].get(nombre, 0) + 1
+            if self._ttft_llm is not None:
+                self.stats["ahorro_total_s"] += max(0.0, self._ttft_llm - latencia)
+
+    def medir_llm(self, generador) -> Generator[str, None, None]:
+        """Envuelve el stream del LLM para medir su primer token, base del ahorro estimado."""
+        inicio = time.perf_counter()
+        try:
+            primero = True
+            for chunk in generador:
+                if primero:
+                    primero = False
+                    ttft = time.perf_counter() - inicio
+                    with self._lock:
+                        self._ttft_llm = ttft if self._ttft_llm is None else 0.8 * self._ttft_llm + 0.2 * ttft
+                yield chunk
+        finally:
+            generador.close()
+
+    def recordar(self, respuesta: str):
+        """Guarda la última respuesta dicha, para la intención 'repetir'."""
+        if respuesta.strip():
+            self._ultima_respuesta = respuesta.strip()
+
+    @property
+    def ultima_respuesta(self) -> str:
+        return self._ultima_respuesta
+
+    def estadisticas(self) -> dict:
+        """
+        @returns {dict} - Tasa de acierto, aciertos por intención y latencia ahorrada estimada.
+        """
+        with self._lock:
+            stats = {**self.stats, "por_intencion": dict(self.stats["por_intencion"])}
+        stats["tasa_acierto"] = stats["aciertos"] / stats["consultas"] if stats["consultas"] else 0.0
+        stats["busqueda_media_us"] = stats.pop("busqueda_total_s") / stats["consultas"] * 1e6 if stats["consultas"] else 0.0
+        stats["ttft_llm_medio_s"] = self._ttft_llm
+        return stats
@@ -0,0 +1,151 @@
+"""
+@fileoverview Reparto equitativo del LLM entre varias sesiones.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Con varias sesiones simultáneas, el LLM es el recurso escaso: un
+             servidor Ollama local atiende bien una o dos generaciones a la vez.
+             FairLLMScheduler limita las generaciones concurrentes y, cuando hay
+             cola, concede los huecos por turnos entre sesiones (round-robin),
+             de modo que una sesión con muchas peticiones no deja sin servicio a
+             las demás. Cada sesión usa su propia vista, que implementa ILLMService.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Generator
+from domain.services import ILLMService
+
+class FairLLMScheduler:
+    """
+    @class FairLLMScheduler
+    @description Semáforo con cola por sesión y reparto round-robin.
+    """
+    def __init__(self, llm_service: ILLMService, max_concurrentes=2):
+        """
+        @param {ILLMService} llm_service - Servicio compartido por todas las sesiones.
+        @param {int} max_concurrentes - Generaciones simultáneas permitidas.
+        """
+        self.llm_service = llm_service
+        self.max_concurrentes = max_concurrentes
+        self._lock = threading.Lock()
+        self._esperando = OrderedDict()
+        self._activos = 0
+        self.stats = {"concedidos": 0, "esperas": 0}
+
+    def para_sesion(self, sesion: str) -> "_LLMDeSesion":
+        """
+        @param {str} sesion - Identificador de la sesión.
+        @returns {ILLMService} - Vista del LLM para esa sesión.
+        """
+        return _LLMDeSesion(self, sesion)
+
+    def _repartir(self):
+        """Método privado (con el lock tomado): concede huecos libres por turnos."""
+        while self._activos < self.max_concurrentes and self._esperando:
+            sesion, tickets = next(iter(self._esperando.items()))
+            ticket = tickets.popleft()
+            del self._esperando[sesion]
+            if tickets:
+                # La sesión vuelve al final de la rueda.
+                self._esperando[sesion] = tickets
+            self._activos += 1
+            self.stats["concedidos"] += 1
+            ticket.set()
+
+    def adquirir(self, sesion: str, cancelado: threading.Event) -> bool:
+        """
+        @returns {bool} - True si se obtuvo un hueco; False si la petición se canceló esperando.
+        """
+        ticket = threading.Event()
+        with self._lock:
+            self._esperando.setdefault(sesion, deque()).append(ticket)
+            self._repartir()
+            if not ticket.is_set():
+                self.stats["esperas"] += 1
+        while not ticket.wait(0.1):
+            if cancelado.is_set():
+                with self._lock:
+                    if ticket.is_set():
+                        break
+                    tickets = self._esperando.get(sesion)
+                    if tickets and ticket in tickets:
+                        tickets.remove(ticket)
+                        if not tickets:
+                            del self._esperando[sesion]
+                return False
+        return True
+
+    def liberar(self):
+        with self._lock:
+            self._activos -= 1
+            self._repartir()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {**self.stats, "activos": self._activos,
+                    "en_cola": sum(len(t) for t in self._esperando.values())}
+
+
+class _LLMDeSesion(ILLMService):
+    """
+    @class _LLMDeSesion
+    @description Vista privada del planificador para una sesión. 'cancelar' solo
+                 afecta a los streams de esta sesión: se detienen en el siguiente
+                 token (o mientras esperan turno), sin tocar los de las demás.
+    """
+    def __init__(self, planificador: FairLLMScheduler, sesion: str):
+        self.planificador = planificador
+        self.sesion = sesion
+        self._cancelados = set()
+        self._lock = threading.Lock()
+
+    def stream_preguntar_a_jarvis(self, prompt: str, model: str = "mistral") -> Generator[str, None, None]:
+        return self._stream(lambda llm: llm.stream_preguntar_a_jarvis(prompt, model=model))
+
+    def stream_conversar(self, mensajes: list[dict], model: str = "mistral") -> Generator[str, None, None]:
+        return self._stream(lambda llm: llm.stream_conversar(mensajes, model=model))
+
+    def stream_cancelable(self, prompt: str, model: str = "mistral",
+                          mensajes: list[dict] | None = None) -> tuple[Generator[str, None, None], Callable[[], None]]:
+        cancelado = threading.Event()
+        cancelar_inner = []
+
+        def _abrir(llm: ILLMService):
+            generador, cancelar = llm.stream_cancelable(prompt, model, mensajes)
+            cancelar_inner.append(cancelar)
+            return generador
+
+        def _cancelar():
+            cancelado.set()
+            for cancelar in cancelar_inner:
+                cancelar()
+        return self._stream(_abrir, cancelado), _cancelar
+
+    def _stream(self, abrir, cancelado: threading.Event | None = None) -> Generator[str, None, None]:
+        cancelado = threading.Event() if cancelado is None else cancelado
+        with self._lock:
+            self._cancelados.add(cancelado)
+        try:
+            if not self.planificador.adquirir(self.sesion, cancelado):
+                return
+            try:
+                if cancelado.is_set():
+                    return
+                generador = abrir(self.planificador.llm_service)
+                try:
+                    for chunk in generador:
+                        if cancelado.is_set():
+                            return
+                        yield chunk
+                finally:
+                    generador.close()
+            finally:
+                self.planificador.liberar()
+        finally:
+            with self._lock:
+                self._cancelados.discard(cancelado)
+
+    def cancelar(self):
+        with self._lock:
+            for cancelado in self._cancelados:
+                cancelado.set()
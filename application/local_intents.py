@@ -0,0 +1,152 @@
+"""
+@fileoverview Intenciones locales básicas del asistente.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Registra en un IntentRouter las intenciones que se resuelven sin el
+             LLM: hora, fecha, temporizadores, volumen de la voz, repetir la
+             última respuesta y callar. Los temporizadores se anuncian por el
+             TTS al vencer; el volumen es el del motor de voz, no el del sistema.
+"""
+
+import datetime
+import threading
+from domain.services import ITTSService
+from application.intent_router import IntentRouter, numero_en_palabras
+
+DIAS = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+MESES = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre",
+         "octubre", "noviembre", "diciembre"]
+NOMBRES_UNIDAD = {1: ("segundo", "segundos"), 60: ("minuto", "minutos"), 3600: ("hora", "horas")}
+PASO_VOLUMEN = 0.1
+
+def decir_hora(ahora: datetime.datetime) -> str:
+    """
+    @function decir_hora
+    @returns {str} - La hora como se dice en voz alta ("Son las diez y cuarto").
+    """
+    hora, minuto = ahora.hour % 12 or 12, ahora.minute
+    if minuto > 30:
+        # "Son las once menos diez".
+        hora, minuto = hora % 12 + 1, minuto - 60
+    articulo = "Es la" if hora == 1 else "Son las"
+    texto = f"{articulo} {'una' if hora == 1 else numero_en_palabras(hora)}"
+    if minuto == 0:
+        return f"{texto} en punto."
+    if abs(minuto) == 15:
+        return f"{texto} {'y' if minuto > 0 else 'menos'} cuarto."
+    if minuto == 30:
+        return f"{texto} y media."
+    return f"{texto} {'y' if minuto > 0 else 'menos'} {numero_en_palabras(abs(minuto))}."
+
+
+class LocalIntents:
+    """
+    @class LocalIntents
+    @description Manejadores de las intenciones básicas. Cada asistente (o cada
+                 sesión del servidor) tiene los suyos, con sus temporizadores.
+    """
+    def __init__(self, tts_service: ITTSService, router: IntentRouter | None = None, reloj=datetime.datetime.now):
+        """
+        @param {ITTSService} tts_service - Voz usada para los avisos y el volumen.
+        @param {IntentRouter | None} router - Enrutador donde registrarse; si no, se crea uno.
+        @param {Callable[[], datetime]} reloj - Fuente de la hora (sustituible en benchmarks).
+        """
+        self.tts_service = tts_service
+        self.router = router or IntentRouter()
+        self.reloj = reloj
+        self._temporizadores = []
+        self._lock = threading.Lock()
+        self._detenido = False
+
+        # Los patrones se escriben con tildes: coinciden igual (se normalizan) y
+        # sirven tal cual como vocabulario de la gramática del reconocedor.
+        self.router.registrar("hora", [
+            "[qué] hora es", "(dime|sabes) [qué] hora es", "qué hora tenemos"], self._hora)
+        self.router.registrar("fecha", [
+            "(qué|a qué) (día|fecha) es hoy", "(qué|a qué) (día|fecha) estamos [hoy]",
+            "(dime|sabes) (qué|la) (día|fecha) es hoy", "día es hoy"], self._fecha)
+        self.router.registrar("temporizador", [
+            "(pon|ponme|programa) un (temporizador|cronómetro|aviso) de {n:numero} {unidad:unidad_tiempo}",
+            "(avísame|recuérdame) en {n:numero} {unidad:unidad_tiempo}",
+            "temporizador [de] {n:numero} {unidad:unidad_tiempo}"], self._temporizador)
+        self.router.registrar("cancelar_temporizador", [
+            "(cancela|quita|para) [el|los] (temporizador|temporizadores|aviso|avisos)"],
+            self._cancelar_temporizadores)
+        self.router.registrar("subir_volumen", [
+            "sube [el] volumen", "más volumen", "(habla|háblame) más alto"],
+            lambda huecos: self._fijar_volumen(self._volumen_actual() + PASO_VOLUMEN))
+        self.router.registrar("bajar_volumen", [
+            "baja [el] volumen", "menos volumen", "(habla|háblame) más bajo"],
+            lambda huecos: self._fijar_volumen(self._volumen_actual() - PASO_VOLUMEN))
+        self.router.registrar("volumen_maximo", ["[pon|sube] [el] volumen al máximo"],
+                              lambda huecos: self._fijar_volumen(1.0))
+        self.router.registrar("volumen_minimo", ["[pon|baja] [el] volumen al mínimo"],
+                              lambda huecos: self._fijar_volumen(0.0))
+        self.router.registrar("volumen", [
+            "[pon|sube|baja] [el] volumen (al|a) {n:numero} [por ciento]"],
+            lambda huecos: self._fijar_volumen(huecos["n"] / 100))
+        self.router.registrar("repetir", [
+            "repite", "repítelo", "repite [eso|lo último|la respuesta]", "(qué|cómo) has dicho",
+            "puedes repetir [eso]"], self._repetir)
+        self.router.registrar("detener", [
+            "(para|detente|calla|cállate|silencio|basta)", "(para|deja) de hablar"], self._detener)
+
+    # --- Manejadores ---------------------------------------------------------
+
+    def _hora(self, huecos: dict) -> str:
+        return decir_hora(self.reloj())
+
+    def _fecha(self, huecos: dict) -> str:
+        hoy = self.reloj()
+        return f"Hoy es {DIAS[hoy.weekday()]}, {hoy.day} de {MESES[hoy.month - 1]} de {hoy.year}."
+
+    def _temporizador(self, huecos: dict) -> str:
+        n, unidad = huecos["n"], huecos["unidad"]
+        if n <= 0:
+            return "El temporizador tiene que durar algo de tiempo."
+        duracion = f"{numero_en_palabras(n) if n <= 100 else n} {NOMBRES_UNIDAD[unidad][n != 1]}"
+        temporizador = threading.Timer(n * unidad, self._vencer, args=(duracion,))
+        temporizador.daemon = True
+        with self._lock:
+            if self._detenido:
+                return "Ahora mismo no puedo programar temporizadores."
+            self._temporizadores.append(temporizador)
+        temporizador.start()
+        print(f"⏲️  Temporizador de {duracion}.")
+        return f"Vale, te aviso dentro de {duracion}."
+
+    def _vencer(self, duracion: str):
+        with self._lock:
+            self._temporizadores = [t for t in self._temporizadores if t is not threading.current_thread()]
+        self.tts_service.hablar(f"Ha terminado el temporizador de {duracion}.")
+
+    def _cancelar_temporizadores(self, huecos: dict) -> str:
+        with self._lock:
+            pendientes, self._temporizadores = self._temporizadores, []
+        for temporizador in pendientes:
+            temporizador.cancel()
+        if not pendientes:
+            return "No hay ningún temporizador activo."
+        return "Temporizador cancelado." if len(pendientes) == 1 else "Temporizadores cancelados."
+
+    def _volumen_actual(self) -> float:
+        return getattr(self.tts_service, "volume", 1.0)
+
+    def _fijar_volumen(self, nivel: float) -> str:
+        # Nunca del todo a cero: el asistente dejaría de oírse sin avisar.
+        nivel = round(min(1.0, max(PASO_VOLUMEN, nivel)), 2)
+        self.tts_service.ajustar_volumen(nivel)
+        return f"Volumen al {numero_en_palabras(round(nivel * 100))} por ciento."
+
+    def _repetir(self, huecos: dict) -> str:
+        return self.router.ultima_respuesta or "No he dicho nada todavía."
+
+    def _detener(self, huecos: dict) -> str:
+        self.tts_service.cancelar()
+        return ""
+
+    def detener(self):
+        """Cancela los temporizadores pendientes al apagar el asistente (o cerrar la sesión)."""
+        with self._lock:
+            self._detenido = True
+        self._cancelar_temporizadores({})
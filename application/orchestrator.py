@@ -0,0 +1,278 @@
+"""
+@fileoverview Orquestador asíncrono del asistente basado en etapas y colas acotadas.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Sustituye el hilo por activación y el lock global de conversación
+             por un bucle de asyncio con una máquina de estados del turno. Las
+             etapas (hotword → STT → LLM → segmentador → TTS) se conectan con
+             colas acotadas que aplican contrapresión, y cada etapa es una
+             tarea cancelable. Los servicios del dominio, que son bloqueantes,
+             se ejecutan a través de un pool de hilos reutilizable.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from enum import Enum
+from domain.services import IHotwordDetector, ISTTService, ITTSService, ILLMService, ITracer, NullTracer
+from application.sentence_segmenter import StreamingSentenceSegmenter
+from application.use_cases import (construir_prompt, FRASE_ACTIVACION, FRASE_NO_ENTENDIDO,
+                                   MODELO_POR_DEFECTO)
+
+_FIN = None
+
+class EstadoTurno(Enum):
+    """
+    @enum EstadoTurno
+    @description Estados de un turno; su valor es el que recibe la GUI.
+    """
+    IDLE = "idle"
+    LISTENING = "listening"
+    PROCESSING = "processing"
+    SPEAKING = "speaking"
+
+
+class AssistantOrchestrator:
+    """
+    @class AssistantOrchestrator
+    @description Ejecuta los turnos de conversación de uno en uno dentro de un
+                 bucle de asyncio. Un hotword durante la respuesta la interrumpe
+                 si el barge-in está activo; en otro caso se ignora.
+    """
+    def __init__(self, hotword_detector: IHotwordDetector, stt_service: ISTTService, tts_service: ITTSService,
+                 llm_service: ILLMService, comm_queue=None, segmenter=None, prefetcher=None, barge_in=False,
+                 model=MODELO_POR_DEFECTO, tam_cola_tokens=64, tam_cola_frases=8, tracer: ITracer | None = None,
+                 executor: concurrent.futures.ThreadPoolExecutor | None = None, conversacion=None,
+                 intenciones=None):
+        """
+        @param {int} tam_cola_tokens - Capacidad de la cola LLM → segmentador.
+        @param {int} tam_cola_frases - Capacidad de la cola segmentador → TTS.
+        @param {ITracer | None} tracer - Registro de latencias por turno.
+        @param {ThreadPoolExecutor | None} executor - Pool compartido (p. ej. entre sesiones
+               del servidor); si no se pasa, el orquestador crea y cierra el suyo.
+        @param {ConversationSession | None} conversacion - Memoria entre turnos; sin ella
+               cada pregunta se envía sola con 'construir_prompt'.
+        @param {IntentRouter | None} intenciones - Atajo local para los comandos que no
+               necesitan el LLM (hora, temporizadores, volumen...).
+        """
+        self.hotword_detector = hotword_detector
+        self.stt_service = stt_service
+        self.tts_service = tts_service
+        self.llm_service = llm_service
+        self.comm_queue = comm_queue
+        self.segmenter = segmenter or StreamingSentenceSegmenter()
+        self.prefetcher = prefetcher
+        self.barge_in = barge_in
+        self.model = model
+        self.tam_cola_tokens = tam_cola_tokens
+        self.tam_cola_frases = tam_cola_frases
+        self.tracer = tracer or NullTracer()
+        self.conversacion = conversacion
+        self.intenciones = intenciones
+        self.estado = EstadoTurno.IDLE
+        self.metricas = {"turnos": 0, "interrupciones": 0, "ultimo_hasta_silencio_s": 0.0}
+        self._loop = None
+        self._executor = executor
+        self._executor_propio = executor is None
+        self._hotwords = None
+        self._turno = None
+
+    # --- Adaptadores entre hilos y el bucle de eventos ---
+
+    def _on_hotword(self):
+        """Callback del detector (en su hilo): entrega el evento al bucle sin bloquear."""
+        self._loop.call_soon_threadsafe(self._encolar_hotword)
+
+    def _encolar_hotword(self):
+        if self._hotwords.full():
+            return  # Ya hay una activación pendiente de atender.
+        self._hotwords.put_nowait(time.perf_counter())
+
+    async def _en_executor(self, funcion, *args):
+        return await self._loop.run_in_executor(self._executor, funcion, *args)
+
+    def _put_desde_hilo(self, cola: asyncio.Queue, item, detener: threading.Event) -> bool:
+        """
+        Inserta en una cola de asyncio desde un hilo del pool respetando su
+        capacidad (contrapresión). Devuelve False si la etapa se detuvo.
+        """
+        while not detener.is_set():
+            futuro = asyncio.run_coroutine_threadsafe(cola.put(item), self._loop)
+            try:
+                futuro.result(timeout=0.2)
+                return True
+            except concurrent.futures.TimeoutError:
+                if not futuro.cancel():
+                    return True  # Se completó justo al agotarse la espera.
+        return False
+
+    def _cambiar_estado(self, estado: EstadoTurno):
+        self.estado = estado
+        if self.comm_queue: self.comm_queue.put({"state": estado.value})
+
+    # --- Bucle principal ---
+
+    async def run(self):
+        """
+        @description Arranca el detector en el pool y atiende hotwords hasta que se
+                     cancele la tarea.
+        """
+        self._loop = asyncio.get_running_loop()
+        if self._executor_propio:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=6, thread_name_prefix="jarvis")
+        self._hotwords = asyncio.Queue(maxsize=1)
+        self.hotword_detector.on_hotword_callback = self._on_hotword
+        detector = self._loop.run_in_executor(self._executor, self.hotword_detector.start)
+        try:
+            while True:
+                instante_hotword = await self._hotwords.get()
+                if self._turno is not None and not self._turno.done():
+                    if not (self.barge_in and self.estado is EstadoTurno.SPEAKING):
+                        continue
+                    await self._interrumpir()
+                self._turno = asyncio.create_task(self._ejecutar_turno(instante_hotword))
+        finally:
+            if self._turno is not None:
+                self._turno.cancel()
+            self.hotword_detector.stop()
+            await asyncio.gather(detector, return_exceptions=True)
+            if self._executor_propio:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _interrumpir(self):
+        """Barge-in: calla el TTS, cancela el LLM y espera a que el turno termine."""
+        inicio = time.perf_counter()
+        self._turno.cancel()
+        await self._en_executor(self.tts_service.cancelar)
+        hasta_silencio = time.perf_counter() - inicio
+        self.llm_service.cancelar()
+        await asyncio.gather(self._turno, return_exceptions=True)
+        self.metricas["interrupciones"] += 1
+        self.metricas["ultimo_hasta_silencio_s"] = hasta_silencio
+        print(f"✋ Barge-in: silencio en {hasta_silencio * 1000:.0f} ms.")
+
+    # --- Turno de conversación ---
+
+    async def _ejecutar_turno(self, instante_hotword: float):
+        self.metricas["turnos"] += 1
+        self.tracer.iniciar_turno(instante_hotword)
+        resultado = "ok"
+        comando = None
+        respuesta = []
+        intencion = None
+        self.hotword_detector.pause()
+        self._cambiar_estado(EstadoTurno.LISTENING)
+        try:
+            await self._en_executor(self.tts_service.hablar_frase, FRASE_ACTIVACION)
+            self.tracer.marcar("acuse")
+            comando = await self._escuchar()
+            self.tracer.marcar("stt_final")
+            if not comando or not comando.strip():
+                resultado = "sin_comando"
+                if self.prefetcher: self.prefetcher.descartar()
+                await self._en_executor(self.tts_service.hablar_frase, FRASE_NO_ENTENDIDO)
+                return
+
+            self._cambiar_estado(EstadoTurno.PROCESSING)
+            if self.intenciones:
+                intencion = self.intenciones.resolver(comando)
+            if intencion:
+                self.tracer.marcar("intencion_local")
+                if self.prefetcher: self.prefetcher.descartar()
+                generador = self.intenciones.responder(intencion)
+            elif self.prefetcher:
+                generador = self.prefetcher.resolver(comando)
+            elif self.conversacion:
+                generador = self.llm_service.stream_conversar(self.conversacion.mensajes_para(comando),
+                                                              model=self.model)
+            else:
+                generador = self.llm_service.stream_preguntar_a_jarvis(construir_prompt(comando), model=self.model)
+            if self.intenciones and not intencion:
+                generador = self.intenciones.medir_llm(generador)
+
+            if self.barge_in:
+                self.hotword_detector.set_supresion_eco(True)
+                self.hotword_detector.resume()
+            await self._responder(generador, respuesta)
+        except asyncio.CancelledError:
+            resultado = "interrumpido"
+            raise
+        except Exception as e:
+            resultado = "error"
+            print(f"Error inesperado en el turno: {e}")
+        finally:
+            if self.intenciones:
+                self.intenciones.recordar("".join(respuesta))
+            # Los comandos locales no aportan contexto a la conversación con el modelo.
+            if self.conversacion and comando and comando.strip() and not intencion:
+                # Se guarda lo generado hasta el momento, aunque un barge-in lo cortara.
+                self.conversacion.registrar(comando, "".join(respuesta))
+            self.hotword_detector.set_supresion_eco(False)
+            self.hotword_detector.resume()
+            self._cambiar_estado(EstadoTurno.IDLE)
+            self.tracer.finalizar_turno(resultado)
+
+    async def _escuchar(self) -> str | None:
+        if self.prefetcher:
+            self.prefetcher.iniciar_turno()
+            return await self._en_executor(
+                lambda: self.stt_service.escuchar_comando(on_parcial=self.prefetcher.on_parcial))
+        return await self._en_executor(self.stt_service.escuchar_comando)
+
+    async def _responder(self, generador, respuesta: list):
+        """Conecta las etapas LLM → segmentador → TTS con colas acotadas."""
+        tokens = asyncio.Queue(maxsize=self.tam_cola_tokens)
+        frases = asyncio.Queue(maxsize=self.tam_cola_frases)
+        detener = threading.Event()
+        self._cambiar_estado(EstadoTurno.SPEAKING)
+        etapas = [
+            asyncio.ensure_future(self._en_executor(self._etapa_llm, generador, tokens, detener, respuesta)),
+            asyncio.create_task(self._etapa_segmentador(tokens, frases)),
+            asyncio.create_task(self._etapa_tts(frases)),
+        ]
+        try:
+            await asyncio.gather(*etapas)
+        except BaseException:
+            detener.set()
+            for etapa in etapas:
+                etapa.cancel()
+            self.segmenter.reset()
+            raise
+
+    def _etapa_llm(self, generador, tokens: asyncio.Queue, detener: threading.Event, respuesta: list):
+        """Etapa LLM (en el pool): consume el generador bloqueante del servicio y acumula el texto."""
+        try:
+            for chunk in generador:
+                self.tracer.marcar("primer_token")
+                respuesta.append(chunk)
+                if not self._put_desde_hilo(tokens, chunk, detener):
+                    return
+        finally:
+            generador.close()
+        self._put_desde_hilo(tokens, _FIN, detener)
+
+    async def _etapa_segmentador(self, tokens: asyncio.Queue, frases: asyncio.Queue):
+        self.segmenter.reset()
+        while True:
+            chunk = await tokens.get()
+            if chunk is _FIN:
+                resto = self.segmenter.flush()
+                if resto:
+                    self.tracer.marcar("primera_frase_encolada")
+                    await frases.put(resto)
+                await frases.put(_FIN)
+                return
+            for frase in self.segmenter.feed(chunk):
+                self.tracer.marcar("primera_frase_encolada")
+                await frases.put(frase)
+
+    async def _etapa_tts(self, frases: asyncio.Queue):
+        while True:
+            frase = await frases.get()
+            if frase is _FIN:
+                await self._en_executor(self.tts_service.esperar)
+                return
+            # 'encolar' puede bloquear (hasta que haya hueco en la cola del TTS, o
+            # toda la frase si el servicio solo sabe 'hablar'): fuera del bucle.
+            await self._en_executor(self.tts_service.encolar, frase)
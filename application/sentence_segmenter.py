@@ -0,0 +1,162 @@
+"""
+@fileoverview Segmentador incremental de frases para el stream del LLM.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Divide el texto que llega token a token en frases listas para el
+             TTS. Solo examina los caracteres nuevos de cada trozo, adelanta la
+             primera cláusula (en una coma o al superar un presupuesto de tokens
+             o caracteres) para reducir el tiempo hasta el primer audio, y evita
+             cortar en abreviaturas, decimales o numeraciones de listas.
+"""
+
+# Abreviaturas habituales en español tras las que un punto no cierra la frase.
+ABREVIATURAS = frozenset({
+    "sr", "sra", "srta", "sres", "dr", "dra", "lic", "ing", "arq", "prof", "ud", "uds",
+    "vd", "vds", "etc", "ej", "pág", "pag", "núm", "num", "nro", "aprox", "av", "avda",
+    "cap", "art", "vol", "vs", "tel", "máx", "mín", "dept", "depto", "cía", "ee", "uu",
+    "st", "mr", "mrs",
+})
+
+_TERMINADORES_INMEDIATOS = "?!\n"
+_TERMINADORES_DIFERIDOS = ".:"
+_SEPARADORES_CLAUSULA = ",;"
+
+
+class StreamingSentenceSegmenter:
+    """
+    @class StreamingSentenceSegmenter
+    @description Segmentador con estado para una respuesta en streaming. Se usa
+                 con 'feed' por cada trozo recibido y 'flush' al terminar.
+    """
+    def __init__(self, adelantar_primera=True, min_chars_primera=15, max_chars_primera=80,
+                 max_tokens_primera=12):
+        """
+        @param {bool} adelantar_primera - Si se adelanta la primera cláusula de la respuesta.
+        @param {int} min_chars_primera - Longitud mínima para cortar la primera cláusula en una coma.
+        @param {int} max_chars_primera - Presupuesto de caracteres antes de forzar el primer corte.
+        @param {int} max_tokens_primera - Presupuesto de tokens antes de forzar el primer corte.
+        """
+        self.adelantar_primera = adelantar_primera
+        self.min_chars_primera = min_chars_primera
+        self.max_chars_primera = max_chars_primera
+        self.max_tokens_primera = max_tokens_primera
+        self.reset()
+
+    def reset(self):
+        """Prepara el segmentador para una nueva respuesta."""
+        self._partes = []
+        self._longitud = 0
+        self._tokens = 0
+        self._emitidas = 0
+        self._palabra = []
+        self._palabra_previa = ""
+        self._palabras_en_linea = 0
+        self._ultimo_espacio = 0
+        # (posición de corte, signo, palabra previa, era la primera palabra de la línea)
+        self._pendiente = None
+
+    def _cortar(self, posicion: int, salidas: list):
+        """Método privado que emite el texto pendiente hasta 'posicion'."""
+        texto = "".join(self._partes)
+        frase = texto[:posicion].strip()
+        resto = texto[posicion:]
+        self._partes = [resto] if resto else []
+        self._longitud -= posicion
+        self._ultimo_espacio = max(0, self._ultimo_espacio - posicion)
+        # Restos formados solo por signos (p. ej. el resto de unos puntos suspensivos)
+        # no aportan nada al TTS.
+        if any(c.isalnum() for c in frase):
+            salidas.append(frase)
+            self._emitidas += 1
+
+    def _es_ambiguo(self, palabra: str) -> bool:
+        """Método privado: indica si un punto tras 'palabra' requiere ver el siguiente carácter."""
+        bajo = palabra.lower()
+        return bajo.isdigit() or len(bajo) == 1 or bajo in ABREVIATURAS
+
+    def _es_corte(self, signo: str, palabra: str, inicio_linea: bool, siguiente: str) -> bool:
+        """Método privado que decide si un signo diferido cierra realmente una frase."""
+        if signo == "," or signo == ":":
+            # "3,5" o "10:30" no son separadores; solo cortan si sigue un espacio.
+            return siguiente.isspace()
+        if signo == "...":
+            return not siguiente.isalnum()
+        if siguiente.isalnum():
+            # Decimales ("3.14") e iniciales encadenadas ("EE.UU").
+            return False
+        bajo = palabra.lower()
+        if bajo in ABREVIATURAS or (len(bajo) == 1 and bajo.isalpha()):
+            return False
+        if bajo.isdigit() and inicio_linea:
+            # Numeración de listas: "1. Primer punto".
+            return False
+        return True
+
+    def feed(self, chunk: str) -> list[str]:
+        """
+        @param {str} chunk - Nuevo trozo de texto recibido del LLM.
+        @returns {list[str]} - Frases completas listas para hablar (puede estar vacía).
+        """
+        salidas = []
+        if not chunk:
+            return salidas
+        self._tokens += 1
+        self._partes.append(chunk)
+
+        for ch in chunk:
+            self._longitud += 1
+            posicion = self._longitud
+
+            if self._pendiente is not None:
+                corte, signo, palabra, inicio_linea = self._pendiente
+                if ch == "." and signo in (".", "..."):
+                    self._pendiente = (posicion, "...", palabra, inicio_linea)
+                    continue
+                self._pendiente = None
+                if self._es_corte(signo, palabra, inicio_linea, ch):
+                    self._cortar(corte, salidas)
+                    posicion = self._longitud
+                    self._palabras_en_linea = 0
+
+            if ch.isalnum():
+                self._palabra.append(ch)
+                continue
+
+            if self._palabra:
+                self._palabra_previa = "".join(self._palabra)
+                self._palabra = []
+                self._palabras_en_linea += 1
+
+            if ch in _TERMINADORES_DIFERIDOS:
+                if self._es_ambiguo(self._palabra_previa):
+                    inicio_linea = self._palabras_en_linea <= 1
+                    self._pendiente = (posicion, ch, self._palabra_previa, inicio_linea)
+                else:
+                    # Sin ambigüedad posible se corta sin esperar al siguiente token.
+                    self._cortar(posicion, salidas)
+                    self._palabras_en_linea = 0
+            elif ch in _TERMINADORES_INMEDIATOS:
+                self._cortar(posicion, salidas)
+                self._palabras_en_linea = 0
+            elif ch in _SEPARADORES_CLAUSULA:
+                if (self.adelantar_primera and self._emitidas == 0
+                        and self._longitud >= self.min_chars_primera):
+                    self._pendiente = (posicion, ",", self._palabra_previa, False)
+            elif ch.isspace():
+                self._ultimo_espacio = posicion
+
+        if (self.adelantar_primera and self._emitidas == 0 and self._pendiente is None
+                and self._ultimo_espacio > 0
+                and (self._tokens >= self.max_tokens_primera or self._longitud >= self.max_chars_primera)):
+            self._cortar(self._ultimo_espacio, salidas)
+
+        return salidas
+
+    def flush(self) -> str | None:
+        """
+        @returns {str | None} - El texto restante al terminar el stream, si lo hay.
+        @description Vacía el segmentador y lo deja listo para la siguiente respuesta.
+        """
+        resto = "".join(self._partes).strip()
+        self.reset()
+        return resto or None
@@ -0,0 +1,179 @@
+"""
+@fileoverview Prefetch especulativo del LLM a partir de transcripciones parciales.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Mientras el usuario todavía habla, observa los resultados parciales
+             del STT. Cuando el texto parcial se mantiene estable durante una
+             ventana corta, lanza la petición al LLM por adelantado. Si la
+             transcripción final coincide, se aprovechan los tokens que ya
+             estaban llegando; si difiere, se cancela y se repite la petición.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Generator
+from domain.services import ILLMService
+
+_FIN = object()
+
+def _normalizar(texto: str) -> str:
+    return " ".join(texto.lower().split())
+
+
+class _Especulacion:
+    """Petición especulativa privada en curso y sus tokens ya recibidos."""
+    def __init__(self, texto: str):
+        self.texto = texto
+        self.lanzada = time.perf_counter()
+        self.cola = queue.Queue()
+        self.cancelada = False
+        self.cancelar_stream = None
+
+
+class SpeculativePrefetcher:
+    """
+    @class SpeculativePrefetcher
+    @description Coordina una especulación por turno entre el STT y el LLM.
+                 Uso: 'iniciar_turno', pasar 'on_parcial' al STT y llamar a
+                 'resolver' con la transcripción final.
+    """
+    def __init__(self, llm_service: ILLMService, construir_prompt: Callable[[str], str],
+                 model="mistral", ventana_estable=0.4, min_palabras=2, max_intentos=2, conversacion=None):
+        """
+        @param {ILLMService} llm_service - Servicio al que se lanzan las peticiones.
+        @param {Callable} construir_prompt - Convierte un comando en el prompt completo.
+        @param {str} model - Modelo a usar.
+        @param {float} ventana_estable - Segundos que el parcial debe permanecer igual.
+        @param {int} min_palabras - Palabras mínimas del parcial para especular.
+        @param {int} max_intentos - Especulaciones máximas por turno.
+        @param {ConversationSession | None} conversacion - Si se pasa, las peticiones
+               incluyen el historial en lugar de usar 'construir_prompt'.
+        """
+        self.llm_service = llm_service
+        self.construir_prompt = construir_prompt
+        self.model = model
+        self.ventana_estable = ventana_estable
+        self.min_palabras = min_palabras
+        self.max_intentos = max_intentos
+        self.conversacion = conversacion
+        self._lock = threading.Lock()
+        self._stats = {"turnos": 0, "especulaciones": 0, "aciertos": 0, "fallos": 0,
+                       "ahorro_total_s": 0.0}
+        self.iniciar_turno()
+
+    def iniciar_turno(self):
+        """Reinicia el estado de especulación para un nuevo comando."""
+        with self._lock:
+            self._parcial = ""
+            self._parcial_desde = 0.0
+            self._intentos = 0
+            self._actual = None
+
+    def on_parcial(self, texto: str):
+        """
+        @param {str} texto - Transcripción parcial; se espera una llamada por bloque de audio.
+        """
+        ahora = time.perf_counter()
+        texto = _normalizar(texto)
+        with self._lock:
+            if texto != self._parcial:
+                self._parcial = texto
+                self._parcial_desde = ahora
+                # El usuario siguió hablando: lo especulado ya no sirve.
+                if self._actual is not None and self._actual.texto != texto:
+                    self._cancelar(self._actual)
+                    self._actual = None
+                return
+            if (self._actual is None and self._intentos < self.max_intentos
+                    and len(texto.split()) >= self.min_palabras
+                    and ahora - self._parcial_desde >= self.ventana_estable):
+                self._intentos += 1
+                self._stats["especulaciones"] += 1
+                self._actual = self._lanzar(texto)
+
+    def _lanzar(self, texto: str) -> _Especulacion:
+        print(f"🔮 Especulando con el parcial: '{texto}'")
+        especulacion = _Especulacion(texto)
+        # Cada especulación se cancela por su cuenta: 'cancelar' del servicio
+        # cortaría también el turno real y, en el servidor, otras sesiones.
+        generador, especulacion.cancelar_stream = self._abrir(texto, cancelable=True)
+        threading.Thread(target=self._consumir, args=(especulacion, generador), daemon=True).start()
+        return especulacion
+
+    @staticmethod
+    def _consumir(especulacion: _Especulacion, generador):
+        try:
+            for chunk in generador:
+                if especulacion.cancelada:
+                    break
+                especulacion.cola.put(chunk)
+        finally:
+            generador.close()
+            especulacion.cola.put(_FIN)
+
+    def _cancelar(self, especulacion: _Especulacion):
+        especulacion.cancelada = True
+        especulacion.cancelar_stream()
+
+    def _reproducir(self, especulacion: _Especulacion) -> Generator[str, None, None]:
+        terminado = False
+        try:
+            while True:
+                chunk = especulacion.cola.get()
+                if chunk is _FIN:
+                    terminado = True
+                    return
+                yield chunk
+        finally:
+            if not terminado:
+                self._cancelar(especulacion)
+
+    def resolver(self, comando: str) -> Generator[str, None, None]:
+        """
+        @param {str} comando - Transcripción final del STT.
+        @returns {Generator[str, None, None]} - El stream de respuesta, especulado o nuevo.
+        """
+        with self._lock:
+            especulacion, self._actual = self._actual, None
+            self._stats["turnos"] += 1
+            if especulacion is not None and especulacion.texto == _normalizar(comando):
+                ahorro = time.perf_counter() - especulacion.lanzada
+                self._stats["aciertos"] += 1
+                self._stats["ahorro_total_s"] += ahorro
+                print(f"🎯 Especulación acertada (ventaja: {ahorro * 1000:.0f} ms).")
+                return self._reproducir(especulacion)
+            if especulacion is not None:
+                self._stats["fallos"] += 1
+                self._cancelar(especulacion)
+        return self._abrir(comando)
+
+    def _abrir(self, texto: str, cancelable=False):
+        """
+        @returns {Generator | tuple} - El stream, o con 'cancelable' el par (stream, cancelar).
+        """
+        if self.conversacion:
+            mensajes = self.conversacion.mensajes_para(texto)
+            if cancelable:
+                return self.llm_service.stream_cancelable(None, self.model, mensajes)
+            return self.llm_service.stream_conversar(mensajes, model=self.model)
+        if cancelable:
+            return self.llm_service.stream_cancelable(self.construir_prompt(texto), self.model)
+        return self.llm_service.stream_preguntar_a_jarvis(self.construir_prompt(texto), model=self.model)
+
+    def descartar(self):
+        """Cancela cualquier especulación pendiente (p. ej. si no hubo comando)."""
+        with self._lock:
+            especulacion, self._actual = self._actual, None
+        if especulacion is not None:
+            self._cancelar(especulacion)
+
+    def estadisticas(self) -> dict:
+        """
+        @returns {dict} - Tasa de acierto y latencia ahorrada, para ajustar la ventana.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["tasa_acierto"] = stats["aciertos"] / stats["especulaciones"] if stats["especulaciones"] else 0.0
+        stats["ahorro_medio_s"] = stats["ahorro_total_s"] / stats["aciertos"] if stats["aciertos"] else 0.0
+        return stats
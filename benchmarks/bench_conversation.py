@@ -0,0 +1,105 @@
+"""
+@fileoverview Benchmark del prefill y el TTFT a medida que crece la conversación.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Ejecuta la misma serie de preguntas contra StubOllamaServer, con un
+             prefill proporcional a los tokens que no están en su caché de
+             prefijo, en cuatro modos: sin memoria (un prompt nuevo por turno),
+             con memoria pero sin reutilizar la caché, con memoria reutilizando
+             la caché, y con un presupuesto de tokens pequeño que obliga a
+             resumir. Por turno muestra los tokens del historial, los tokens de
+             prompt realmente evaluados, el prefill y el tiempo hasta el primer token.
+             El stub tiene una sola ranura de caché: la petición de resumen la
+             ocupa, y el turno siguiente vuelve a evaluar el prefijo completo.
+             Uso: python -m benchmarks.bench_conversation [--turnos 10] [--ms-por-token 2]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from application.conversation import ConversationSession
+from application.use_cases import construir_prompt, PROMPT_SISTEMA
+from benchmarks.doubles import MemoryTracer
+from benchmarks.stub_ollama import StubOllamaServer
+from infrastructure.llm.llm_service import OllamaLLMService
+
+PREGUNTAS = [
+    "¿Cuál es la capital de Australia?",
+    "¿Y cuántos habitantes tiene?",
+    "¿Qué tiempo suele hacer allí en invierno?",
+    "Recomiéndame un plato típico de esa zona.",
+    "¿Cómo se prepara?",
+    "¿Qué vino le pega?",
+    "Resume lo que hemos hablado.",
+    "¿Qué distancia hay hasta Sídney?",
+    "¿Cuánto se tarda en tren?",
+    "¿Y en avión?",
+    "¿Qué me recomiendas visitar primero?",
+    "Gracias, eso es todo.",
+]
+
+def ejecutar(modo: str, turnos: int, s_por_token: float, presupuesto: int) -> list[dict]:
+    """Una serie de turnos en un modo; devuelve las medidas de cada turno."""
+    stub = StubOllamaServer(ttft=0.05, intervalo_token=0.005, prefill_por_token=s_por_token,
+                            cache_prefijo=modo != "memoria_sin_cache").start()
+    tracer = MemoryTracer()
+    llm = OllamaLLMService(url=stub.url, tracer=tracer)
+    conversacion = None
+    if modo != "sin_memoria":
+        conversacion = ConversationSession(llm, PROMPT_SISTEMA, presupuesto_tokens=presupuesto, tracer=tracer)
+    filas = []
+    for i in range(turnos):
+        pregunta = PREGUNTAS[i % len(PREGUNTAS)]
+        tracer.iniciar_turno()
+        inicio = time.perf_counter()
+        if conversacion:
+            generador = llm.stream_conversar(conversacion.mensajes_para(pregunta))
+        else:
+            generador = llm.stream_preguntar_a_jarvis(construir_prompt(pregunta))
+        ttft, partes = None, []
+        for chunk in generador:
+            if ttft is None and chunk:
+                ttft = time.perf_counter() - inicio
+            partes.append(chunk)
+        tracer.finalizar_turno()
+        medidas = tracer.turnos[-1]["medidas"]
+        if conversacion:
+            conversacion.registrar(pregunta, "".join(partes))
+        filas.append({"turno": i + 1, "historial": medidas.get("historial_tokens", 0),
+                      "evaluados": medidas.get("prompt_tokens"), "prefill_s": medidas.get("prefill_s"),
+                      "ttft_s": ttft})
+        time.sleep(0.2)  # Pausa entre turnos; da tiempo a que termine un resumen.
+    if conversacion:
+        filas[-1]["resumenes"] = conversacion.estadisticas()["resumenes"]
+    stub.stop()
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_conversation")
+    parser.add_argument("--turnos", type=int, default=10)
+    parser.add_argument("--ms-por-token", type=float, default=2.0, help="Prefill simulado por token no cacheado.")
+    parser.add_argument("--presupuesto", type=int, default=120, help="Presupuesto del modo con resumen.")
+    args = parser.parse_args()
+
+    modos = [("sin_memoria", 10**9), ("memoria_sin_cache", 10**9), ("memoria_con_cache", 10**9),
+             ("memoria_con_resumen", args.presupuesto)]
+    for modo, presupuesto in modos:
+        filas = ejecutar(modo, args.turnos, args.ms_por_token / 1000, presupuesto)
+        print(f"\n▶️  {modo}")
+        print(f"{'turno':>6}{'historial':>11}{'evaluados':>11}{'prefill (ms)':>14}{'TTFT (ms)':>11}")
+        for f in filas:
+            print(f"{f['turno']:>6}{f['historial']:>11}{f['evaluados'] or 0:>11}"
+                  f"{(f['prefill_s'] or 0) * 1000:>14.0f}{(f['ttft_s'] or 0) * 1000:>11.0f}")
+        if "resumenes" in filas[-1]:
+            print(f"   resúmenes: {filas[-1]['resumenes']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+@fileoverview Benchmark de extremo a extremo sin micrófono, altavoz ni Ollama real.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Cada escenario de 'benchmarks/escenarios.json' reproduce un WAV
+             grabado ("Jarvis, <comando>") a través de WavFileSource, sirve la
+             respuesta desde StubOllamaServer y ejecuta 'start_assistant' con el
+             modelo VOSK real y un TTS nulo. Mide la latencia de detección del
+             hotword, el RTF del STT, la latencia del turno (fin del comando →
+             primera frase) y la CPU/RSS del proceso. Cada escenario corre en un
+             subproceso propio para que las medidas de recursos no se mezclen.
+             Los WAV (16 bits) se graban aparte en 'benchmarks/data/audio'; los
+             instantes 'fin_hotword_s'/'fin_comando_s' se anotan a mano.
+             Uso: python -m benchmarks.bench_e2e [--guardar-baseline] [--tolerancia 0.2]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.bench_segmenter import DATA_DIR
+
+ESCENARIOS = os.path.join(os.path.dirname(__file__), "escenarios.json")
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "e2e.json")
+PREFIJO_RESULTADO = "RESULTADO_E2E "
+# Métricas comparadas con la baseline: en todas, menos es mejor.
+METRICAS = ("hotword_latencia_s", "stt_rtf", "turno_latencia_s", "cpu_s", "rss_mb")
+
+def memoria_rss_mb() -> float | None:
+    """Memoria residente del proceso (el pico si no hay psutil, que es opcional)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return None
+
+
+def ejecutar_escenario(escenario: dict, timeout=30.0) -> dict:
+    """Se ejecuta en el subproceso: monta el asistente con dobles y mide un turno."""
+    from infrastructure.audio.audio_capture import AudioCaptureService, DEFAULT_MODEL_PATH
+    from infrastructure.audio.audio_source import WavFileSource
+    from infrastructure.audio.hotword_detector import VoskHotwordDetector
+    from infrastructure.audio.stt_service import VoskSTTService
+    from infrastructure.llm.llm_service import OllamaLLMService
+    from application.use_cases import start_assistant
+    from benchmarks.doubles import MemoryTracer, RecordingTTSService
+    from benchmarks.stub_ollama import StubOllamaServer
+
+    tracer = MemoryTracer()
+    stub = StubOllamaServer(stream_grabado=escenario["stream"], ttft=escenario.get("ttft", 0.2)).start()
+    fuente = WavFileSource(os.path.join(DATA_DIR, escenario["wav"]), velocidad=escenario.get("velocidad", 1.0))
+    capture = AudioCaptureService(DEFAULT_MODEL_PATH, source=fuente, buffer_seconds=fuente.duracion + 5.0)
+    # A máxima velocidad los lectores van por detrás de la fuente a propósito:
+    # no se acota su retraso para que no descarten audio.
+    acotado = escenario.get("velocidad") is not None
+    stt = VoskSTTService(capture, tracer=tracer, max_retraso_s=5.0 if acotado else None)
+    tts = RecordingTTSService(tracer=tracer)
+    llm = OllamaLLMService(url=stub.url, tracer=tracer)
+    hotword = VoskHotwordDetector(capture, max_retraso_s=1.0 if acotado else None)
+
+    cpu_inicio = time.process_time()
+    inicio = time.perf_counter()
+    threading.Thread(target=start_assistant, args=(hotword, stt, tts, llm),
+                     kwargs={"tracer": tracer}, daemon=True).start()
+    completo = tracer.esperar_turnos(1, timeout)
+    resultado = {"nombre": escenario["nombre"], "completo": completo,
+                 "duracion_s": time.perf_counter() - inicio,
+                 "cpu_s": time.process_time() - cpu_inicio, "rss_mb": memoria_rss_mb()}
+    if completo:
+        turno = tracer.turnos[0]
+        eventos = turno["eventos"]
+        resultado["resultado_turno"] = turno["resultado"]
+        resultado["stt_rtf"] = turno["medidas"].get("stt_rtf")
+        resultado["primera_frase"] = next((texto for _, origen, texto in tts.frases if origen == "respuesta"), None)
+        # Las latencias solo tienen sentido si el audio llega a tiempo real.
+        if escenario.get("velocidad"):
+            fin_hotword = fuente.instante_de(escenario["fin_hotword_s"])
+            fin_comando = fuente.instante_de(escenario["fin_comando_s"])
+            if fin_hotword is not None:
+                resultado["hotword_latencia_s"] = eventos["hotword"] - fin_hotword
+            if fin_comando is not None and "primera_frase" in eventos:
+                resultado["turno_latencia_s"] = eventos["primera_frase"] - fin_comando
+    stub.stop()
+    return resultado
+
+
+def lanzar_subproceso(nombre: str, timeout: float) -> dict:
+    """Ejecuta un escenario en un intérprete nuevo y recoge su línea de resultado."""
+    proceso = subprocess.run([sys.executable, "-m", "benchmarks.bench_e2e", "--escenario", nombre],
+                             cwd=project_root, capture_output=True, text=True, timeout=timeout + 60)
+    for linea in reversed(proceso.stdout.splitlines()):
+        if linea.startswith(PREFIJO_RESULTADO):
+            return json.loads(linea[len(PREFIJO_RESULTADO):])
+    return {"nombre": nombre, "completo": False, "error": (proceso.stderr or proceso.stdout)[-500:]}
+
+
+def comparar(resultados: list[dict], baseline: dict, tolerancia: float) -> list[str]:
+    """
+    @returns {list[str]} - Regresiones: métricas que empeoran más de 'tolerancia' respecto a la baseline.
+    """
+    regresiones = []
+    for resultado in resultados:
+        referencia = baseline.get(resultado["nombre"], {})
+        for metrica in METRICAS:
+            actual, previo = resultado.get(metrica), referencia.get(metrica)
+            if actual is None or not previo:
+                continue
+            if (actual - previo) / previo > tolerancia:
+                regresiones.append(f"{resultado['nombre']}.{metrica}: {previo:.3f} → {actual:.3f}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_e2e")
+    parser.add_argument("--escenario", help="Uso interno: ejecuta un único escenario en este proceso.")
+    parser.add_argument("--guardar-baseline", action="store_true", help="Guarda los resultados como baseline.")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Empeoramiento relativo admitido.")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Segundos máximos por escenario.")
+    args = parser.parse_args()
+
+    with open(ESCENARIOS, encoding="utf-8") as f:
+        escenarios = {e["nombre"]: e for e in json.load(f)}
+
+    if args.escenario:
+        resultado = ejecutar_escenario(escenarios[args.escenario], args.timeout)
+        print(PREFIJO_RESULTADO + json.dumps(resultado, ensure_ascii=False), flush=True)
+        os._exit(0)  # Los hilos del asistente no terminan por sí solos.
+
+    resultados = []
+    print(f"{'escenario':<34}{'hotword (ms)':>13}{'RTF STT':>9}{'turno (ms)':>12}{'CPU (s)':>9}{'RSS (MB)':>10}")
+    for nombre, escenario in escenarios.items():
+        if not os.path.exists(os.path.join(DATA_DIR, escenario["wav"])):
+            print(f"{nombre:<34}(falta {escenario['wav']}, se omite)")
+            continue
+        resultado = lanzar_subproceso(nombre, args.timeout)
+        resultados.append(resultado)
+        if not resultado.get("completo"):
+            print(f"{nombre:<34}no completó el turno {resultado.get('error', '')}")
+            continue
+        ms = lambda clave: f"{resultado[clave] * 1000:.0f}" if resultado.get(clave) is not None else "-"
+        rtf = f"{resultado['stt_rtf']:.3f}" if resultado.get("stt_rtf") is not None else "-"
+        rss = f"{resultado['rss_mb']:.0f}" if resultado.get("rss_mb") is not None else "-"
+        print(f"{nombre:<34}{ms('hotword_latencia_s'):>13}{rtf:>9}{ms('turno_latencia_s'):>12}"
+              f"{resultado['cpu_s']:>9.2f}{rss:>10}")
+
+    completos = [r for r in resultados if r.get("completo")]
+    if args.guardar_baseline:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump({r["nombre"]: {m: r.get(m) for m in METRICAS} for r in completos}, f, indent=2)
+        print(f"Baseline guardada en {BASELINE}")
+        return
+    if not os.path.exists(BASELINE):
+        print("No hay baseline; ejecuta con --guardar-baseline para crearla.")
+        return
+    with open(BASELINE, encoding="utf-8") as f:
+        regresiones = comparar(completos, json.load(f), args.tolerancia)
+    for regresion in regresiones:
+        print(f"⚠️  Regresión: {regresion}")
+    if regresiones:
+        sys.exit(1)
+    print("Sin regresiones respecto a la baseline.")
+
+if __name__ == '__main__':
+    main()
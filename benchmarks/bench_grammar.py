@@ -0,0 +1,156 @@
+"""
+@fileoverview Benchmark del reconocimiento en dos niveles (gramática + modelo completo).
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Decodifica los comandos grabados de 'benchmarks/comandos.json' con el
+             modelo VOSK real en cuatro modos: solo el modelo completo, solo la
+             gramática de comandos (construida con las intenciones locales), y los
+             dos niveles en paralelo y como respaldo. Por modo muestra el WER, la
+             CPU de decodificación de cada nivel y cuántos comandos resolvió cada
+             uno. También mide cuánto cuesta cambiar la gramática en caliente.
+             Los WAV (16 bits) se graban aparte en 'benchmarks/data/audio/comandos'.
+             Uso: python -m benchmarks.bench_grammar [--modelo RUTA] [--conf-minima 0.85]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import vosk
+from application.intent_router import normalizar_comando
+from application.local_intents import LocalIntents
+from benchmarks.bench_intents import _TTSNulo
+from benchmarks.bench_segmenter import DATA_DIR
+from infrastructure.audio.audio_capture import cargar_modelo_vosk, DEFAULT_MODEL_PATH
+from infrastructure.audio.command_grammar import (CommandGrammar, TwoTierRecognizer, PARALELO, RESPALDO,
+                                                  GRAMATICA, COMPLETO)
+
+COMANDOS = os.path.join(os.path.dirname(__file__), "comandos.json")
+BLOQUE_S = 0.1
+
+def errores_de_palabra(referencia: list[str], hipotesis: list[str]) -> int:
+    """Distancia de edición por palabras (sustituciones + borrados + inserciones)."""
+    previa = list(range(len(hipotesis) + 1))
+    for i, r in enumerate(referencia, 1):
+        actual = [i]
+        for j, h in enumerate(hipotesis, 1):
+            actual.append(min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + (r != h)))
+        previa = actual
+    return previa[-1]
+
+
+def leer_wav(ruta: str) -> tuple[bytes, int]:
+    """PCM int16 mono (primer canal) y su frecuencia, más un segundo de silencio para cerrar."""
+    with wave.open(ruta, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"'{ruta}' no es PCM de 16 bits.")
+        muestras = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        muestras = muestras[::wav.getnchannels()]
+        samplerate = wav.getframerate()
+    return np.concatenate([muestras, np.zeros(samplerate, dtype=np.int16)]).tobytes(), samplerate
+
+
+def decodificar(reconocedor, pcm: bytes, samplerate: int) -> str:
+    tam = int(samplerate * BLOQUE_S) * 2
+    textos = [json.loads(reconocedor.Result()).get("text", "")
+              for desde in range(0, len(pcm), tam) if reconocedor.AcceptWaveform(pcm[desde:desde + tam])]
+    textos.append(json.loads(reconocedor.FinalResult()).get("text", ""))
+    return " ".join(t for t in textos if t)
+
+
+def ejecutar(modo: str, modelo, gramatica: CommandGrammar, grabaciones: list, conf_minima: float) -> dict:
+    fila = {"modo": modo, "errores": 0, "palabras": 0, "cpu": {GRAMATICA: 0.0, COMPLETO: 0.0},
+            "niveles": {GRAMATICA: 0, COMPLETO: 0}, "audio_s": 0.0}
+    for referencia, pcm, samplerate in grabaciones:
+        completo = vosk.KaldiRecognizer(modelo, samplerate)
+        if modo == COMPLETO:
+            inicio = time.thread_time()
+            texto = decodificar(completo, pcm, samplerate)
+            fila["cpu"][COMPLETO] += time.thread_time() - inicio
+            fila["niveles"][COMPLETO] += 1
+        elif modo == GRAMATICA:
+            gramatical = gramatica.adquirir(modelo, samplerate)
+            inicio = time.thread_time()
+            texto = decodificar(gramatical, pcm, samplerate)
+            fila["cpu"][GRAMATICA] += time.thread_time() - inicio
+            fila["niveles"][GRAMATICA] += 1
+            gramatica.liberar(gramatical, samplerate)
+        else:
+            gramatical = gramatica.adquirir(modelo, samplerate)
+            reconocedor = TwoTierRecognizer(gramatical, completo, conf_minima=conf_minima, modo=modo)
+            texto = decodificar(reconocedor, pcm, samplerate)
+            for nivel in (GRAMATICA, COMPLETO):
+                fila["cpu"][nivel] += reconocedor.cpu[nivel]
+                fila["niveles"][nivel] += reconocedor.niveles[nivel]
+            gramatica.liberar(gramatical, samplerate)
+        hipotesis = [p for p in normalizar_comando(texto) if p != "unk"]
+        fila["errores"] += errores_de_palabra(normalizar_comando(referencia), hipotesis)
+        fila["palabras"] += len(normalizar_comando(referencia))
+        fila["audio_s"] += len(pcm) / 2 / samplerate
+    return fila
+
+
+def medir_cambio_en_caliente(modelo, gramatica: CommandGrammar, samplerate: int) -> tuple[float, float]:
+    """Tiempo de recompilar la gramática y de que un reconocedor ya creado la adopte."""
+    gramatica.liberar(gramatica.adquirir(modelo, samplerate), samplerate)
+    inicio = time.perf_counter()
+    gramatica.registrar("contactos", ["llama a marta", "llama a juan", "manda un mensaje a lucía"])
+    compilar = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    gramatica.liberar(gramatica.adquirir(modelo, samplerate), samplerate)
+    adoptar = time.perf_counter() - inicio
+    gramatica.quitar("contactos")
+    return compilar, adoptar
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_grammar")
+    parser.add_argument("--modelo", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--conf-minima", type=float, default=0.85)
+    args = parser.parse_args()
+
+    with open(COMANDOS, encoding="utf-8") as f:
+        comandos = json.load(f)
+    grabaciones = []
+    for comando in comandos:
+        ruta = os.path.join(DATA_DIR, comando["wav"])
+        if not os.path.exists(ruta):
+            print(f"(falta {comando['wav']}, se omite)")
+            continue
+        grabaciones.append((comando["texto"], *leer_wav(ruta)))
+    if not grabaciones:
+        print("No hay grabaciones de comandos; no se puede medir.")
+        return
+
+    modelo = cargar_modelo_vosk(args.modelo)
+    if modelo is None:
+        return
+    gramatica = CommandGrammar(prefijo=None)
+    gramatica.registrar("intenciones", LocalIntents(_TTSNulo()).router.frases())
+    print(f"Gramática: {gramatica.stats['frases']} frases; {len(grabaciones)} grabaciones.\n")
+
+    print(f"{'modo':<12}{'WER':>7}{'CPU gram. (ms)':>16}{'CPU compl. (ms)':>17}{'RTF':>8}"
+          f"{'gana gram.':>12}{'gana compl.':>13}")
+    for modo in (COMPLETO, GRAMATICA, PARALELO, RESPALDO):
+        f = ejecutar(modo, modelo, gramatica, grabaciones, args.conf_minima)
+        cpu = f["cpu"][GRAMATICA] + f["cpu"][COMPLETO]
+        print(f"{modo:<12}{f['errores'] / max(f['palabras'], 1):>7.1%}{f['cpu'][GRAMATICA] * 1000:>16.0f}"
+              f"{f['cpu'][COMPLETO] * 1000:>17.0f}{cpu / f['audio_s']:>8.3f}"
+              f"{f['niveles'][GRAMATICA]:>12}{f['niveles'][COMPLETO]:>13}")
+
+    compilar, adoptar = medir_cambio_en_caliente(modelo, gramatica, grabaciones[0][2])
+    print(f"\nCambio de gramática en caliente: compilar {compilar * 1000:.1f} ms, "
+          f"adoptar en un reconocedor {adoptar * 1000:.1f} ms (sin recargar el modelo).")
+
+
+if __name__ == '__main__':
+    main()
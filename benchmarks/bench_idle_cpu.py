@@ -0,0 +1,84 @@
+"""
+@fileoverview Benchmark del consumo de CPU del detector de hotword en reposo.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Genera audio de "sala vacía" (ruido de fondo y zumbido de red) a la
+             frecuencia típica de un micrófono y lo procesa lo más rápido posible
+             con la ruta anterior (Kaldi sobre cada bloque a 48 kHz) y con la
+             nueva (front-end a 16 kHz y puerta de energía antes de Kaldi). El
+             resultado es CPU consumida por segundo de audio, es decir, la
+             fracción de un núcleo que el detector ocupa en reposo.
+             Uso: python -m benchmarks.bench_idle_cpu [--segundos 60]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import vosk
+from infrastructure.audio.audio_capture import DEFAULT_MODEL_PATH
+from infrastructure.audio.dsp import AudioFrontEnd, EnergyGate
+from infrastructure.audio.vad import EnergyVAD
+
+def audio_en_reposo(segundos: float, samplerate: int, block_duration=0.05) -> list[bytes]:
+    """Ruido de fondo a unos -55 dBFS con zumbido de 50 Hz, en bloques de captura."""
+    rng = np.random.default_rng(7)
+    t = np.arange(int(segundos * samplerate)) / samplerate
+    senal = 0.0015 * rng.standard_normal(len(t)) + 0.001 * np.sin(2 * np.pi * 50 * t)
+    pcm = (senal * 32768).astype(np.int16)
+    bloque = int(samplerate * block_duration)
+    return [pcm[i:i + bloque].tobytes() for i in range(0, len(pcm), bloque)]
+
+
+def medir(procesar, bloques: list[bytes]) -> float:
+    """CPU de proceso consumida al procesar todos los bloques."""
+    inicio = time.process_time()
+    for bloque in bloques:
+        procesar(bloque)
+    return time.process_time() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_idle_cpu")
+    parser.add_argument("--segundos", type=float, default=60.0)
+    parser.add_argument("--samplerate", type=int, default=48000, help="Frecuencia del micrófono simulado.")
+    parser.add_argument("--modelo", default=DEFAULT_MODEL_PATH)
+    args = parser.parse_args()
+
+    vosk.SetLogLevel(-1)
+    model = vosk.Model(args.modelo)
+    gramatica = '["jarvis", "[unk]"]'
+    bloques = audio_en_reposo(args.segundos, args.samplerate)
+
+    recognizer = vosk.KaldiRecognizer(model, args.samplerate, gramatica)
+    antes = medir(recognizer.AcceptWaveform, bloques)
+
+    front_end = AudioFrontEnd(args.samplerate)
+    solo_front_end = medir(front_end.procesar, bloques)
+
+    front_end = AudioFrontEnd(args.samplerate)
+    gate = EnergyGate(EnergyVAD(front_end.samplerate_salida))
+    recognizer = vosk.KaldiRecognizer(model, front_end.samplerate_salida, gramatica)
+
+    def ruta_nueva(bloque: bytes):
+        for filtrado in gate.filtrar(front_end.procesar(bloque)):
+            recognizer.AcceptWaveform(filtrado)
+
+    despues = medir(ruta_nueva, bloques)
+
+    print(f"Audio en reposo: {args.segundos:.0f} s a {args.samplerate} Hz")
+    print(f"{'ruta':<36}{'CPU (s)':>9}{'% de un núcleo':>16}")
+    for etiqueta, cpu in (("antes: Kaldi a la frecuencia nativa", antes),
+                          ("solo front-end (16 kHz)", solo_front_end),
+                          ("después: front-end + puerta + Kaldi", despues)):
+        print(f"{etiqueta:<36}{cpu:>9.2f}{cpu / args.segundos * 100:>15.1f}%")
+    print(f"Bloques entregados a Kaldi tras la puerta: {gate.fraccion_pasada() * 100:.1f}%")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+@fileoverview Benchmark del atajo de intenciones locales.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Mide tres cosas: la tasa de acierto de las intenciones básicas sobre
+             una muestra de comandos (con los que deberían ir al LLM), el tiempo
+             de búsqueda al registrar 10, 100 y 1000 intenciones sintéticas (debe
+             mantenerse casi plano), y la latencia hasta el primer texto de una
+             intención local frente a una pregunta al LLM servida por
+             StubOllamaServer.
+             Uso: python -m benchmarks.bench_intents [--repeticiones 2000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from application.intent_router import IntentRouter
+from application.local_intents import LocalIntents
+from application.use_cases import construir_prompt
+from benchmarks.stub_ollama import StubOllamaServer
+from infrastructure.llm.llm_service import OllamaLLMService
+
+# (comando, intención esperada o None si debe ir al LLM)
+MUESTRA = [
+    ("¿Qué hora es?", "hora"),
+    ("Jarvis, dime qué hora es", "hora"),
+    ("¿Qué día es hoy?", "fecha"),
+    ("¿A qué fecha estamos?", "fecha"),
+    ("Pon un temporizador de cinco minutos", "temporizador"),
+    ("Avísame en treinta y cinco segundos", "temporizador"),
+    ("Ponme un temporizador de 10 minutos, por favor", "temporizador"),
+    ("Cancela el temporizador", "cancelar_temporizador"),
+    ("Sube el volumen", "subir_volumen"),
+    ("Habla más bajo", "bajar_volumen"),
+    ("Pon el volumen al cuarenta por ciento", "volumen"),
+    ("Volumen al máximo", "volumen_maximo"),
+    ("Repite eso", "repetir"),
+    ("¿Qué has dicho?", "repetir"),
+    ("Para", "detener"),
+    ("Deja de hablar", "detener"),
+    ("¿Cuál es la capital de Australia?", None),
+    ("Explícame qué es un agujero negro", None),
+    ("¿Qué hora es en Tokio?", None),
+    ("Pon música relajante", None),
+    ("¿Qué tiempo hace mañana?", None),
+    ("Recomiéndame una película", None),
+]
+
+
+class _TTSNulo:
+    """Voz que no suena: los manejadores de volumen y 'para' solo necesitan la interfaz."""
+    volume = 1.0
+
+    def hablar(self, texto):
+        pass
+
+    def cancelar(self):
+        pass
+
+    def ajustar_volumen(self, nivel):
+        self.volume = nivel
+
+
+def medir_aciertos() -> IntentRouter:
+    intenciones = LocalIntents(_TTSNulo())
+    router = intenciones.router
+    errores = []
+    for comando, esperada in MUESTRA:
+        encontrada = router.resolver(comando)
+        nombre = encontrada[0] if encontrada else None
+        if nombre != esperada:
+            errores.append((comando, esperada, nombre))
+        if encontrada:
+            "".join(router.responder(encontrada))
+    intenciones.detener()
+    stats = router.estadisticas()
+    locales = sum(1 for _, esperada in MUESTRA if esperada)
+    print(f"▶️  Muestra: {len(MUESTRA)} comandos ({locales} locales)")
+    print(f"   tasa de acierto: {stats['tasa_acierto']:.0%}   errores de clasificación: {len(errores)}")
+    for comando, esperada, nombre in errores:
+        print(f"   ❌ '{comando}': esperada {esperada}, obtenida {nombre}")
+    return router
+
+
+def router_sintetico(n: int) -> IntentRouter:
+    """Las intenciones básicas más n sintéticas con literales, opcionales y huecos."""
+    router = LocalIntents(_TTSNulo()).router
+    for i in range(n):
+        router.registrar(f"sintetica_{i}", [
+            f"activa el modo {i} [ahora]",
+            f"(abre|lanza) la aplicacion numero {i}",
+            f"ajusta la escena {i} al {{n:numero}} por ciento",
+        ], lambda huecos: "ok")
+    return router
+
+
+def medir_escalado(repeticiones: int):
+    comandos = [c for c, _ in MUESTRA] + ["abre la aplicacion numero 7", "ajusta la escena 3 al 50 por ciento"]
+    print(f"\n▶️  Búsqueda frente al número de intenciones ({repeticiones} repeticiones por comando)")
+    print(f"{'intenciones':>12}{'media (µs)':>12}{'p95 (µs)':>10}")
+    for n in (10, 100, 1000):
+        router = router_sintetico(n)
+        tiempos = []
+        for comando in comandos:
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                router.resolver(comando)
+                tiempos.append(time.perf_counter() - inicio)
+        tiempos.sort()
+        print(f"{n:>12}{statistics.fmean(tiempos) * 1e6:>12.1f}{tiempos[int(len(tiempos) * 0.95)] * 1e6:>10.1f}")
+
+
+def medir_ahorro(router: IntentRouter):
+    stub = StubOllamaServer(ttft=0.3, intervalo_token=0.01).start()
+    llm = OllamaLLMService(url=stub.url)
+    try:
+        for _ in range(3):
+            "".join(router.medir_llm(llm.stream_preguntar_a_jarvis(construir_prompt("¿Cuál es la capital de Australia?"))))
+        router.stats["ahorro_total_s"] = 0.0
+        inicio = time.perf_counter()
+        next(router.responder(router.resolver("¿Qué hora es?")))
+        local = time.perf_counter() - inicio
+    finally:
+        stub.stop()
+    stats = router.estadisticas()
+    print("\n▶️  Primer texto: intención local frente al LLM")
+    print(f"   local: {local * 1000:.2f} ms   LLM (EWMA): {stats['ttft_llm_medio_s'] * 1000:.0f} ms   "
+          f"ahorro estimado: {stats['ahorro_total_s'] * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_intents")
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    args = parser.parse_args()
+    router = medir_aciertos()
+    medir_escalado(args.repeticiones)
+    medir_ahorro(router)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+@fileoverview Escenarios de RoutedLLMService contra varios stubs de Ollama.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Levanta instancias de StubOllamaServer que simulan backends sanos,
+             lentos, caídos (HTTP 500) e inalcanzables, y comprueba el reparto
+             por carga, las peticiones de cobertura, el failover, la apertura y
+             el cierre del circuit breaker y la exclusión por sondas. Imprime el
+             TTFT de cada escenario y termina con código 1 si alguna comprobación
+             falla.
+             Uso: python -m benchmarks.bench_llm_routing
+"""
+
+import concurrent.futures
+import os
+import socket
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.stub_ollama import StubOllamaServer, RESPUESTA_POR_DEFECTO
+from infrastructure.llm.routed_llm_service import RoutedLLMService, ABIERTO, CERRADO
+from infrastructure.llm.llm_service import RESPUESTA_SIN_CONEXION
+
+def turno(router: RoutedLLMService) -> tuple[str, float | None]:
+    """@returns {tuple[str, float | None]} - Texto completo y TTFT del turno."""
+    inicio = time.perf_counter()
+    ttft = None
+    partes = []
+    for chunk in router.stream_preguntar_a_jarvis("¿Qué hora es?"):
+        if ttft is None and chunk:
+            ttft = time.perf_counter() - inicio
+        partes.append(chunk)
+    return "".join(partes), ttft
+
+
+def url_sin_servidor() -> str:
+    """Un puerto local en el que no escucha nadie."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    return f"http://127.0.0.1:{puerto}/api/generate"
+
+
+class Comprobaciones:
+    """Acumula y muestra el resultado de cada comprobación."""
+    def __init__(self):
+        self.fallos = 0
+
+    def __call__(self, descripcion: str, ok: bool):
+        print(f"   {'✅' if ok else '❌'} {descripcion}")
+        self.fallos += not ok
+
+
+def escenario_balanceo(check: Comprobaciones):
+    print("▶️  Reparto por carga entre tres backends sanos")
+    stubs = [StubOllamaServer(ttft=0.3).start() for _ in range(3)]
+    router = RoutedLLMService([s.url for s in stubs], intervalo_sondeo=0)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=6) as pool:
+        resultados = list(pool.map(lambda _: turno(router), range(6)))
+    check("las 6 respuestas llegan completas", all(t == RESPUESTA_POR_DEFECTO for t, _ in resultados))
+    check(f"cada backend atiende 2 peticiones ({[s.peticiones for s in stubs]})",
+          all(s.peticiones == 2 for s in stubs))
+    for s in stubs:
+        s.stop()
+
+
+def escenario_lento(check: Comprobaciones):
+    print("▶️  Cobertura cuando el primer backend es lento")
+    lento = StubOllamaServer(ttft=3.0).start()
+    sano = StubOllamaServer(ttft=0.1).start()
+    router = RoutedLLMService([lento.url, sano.url], plazo_primer_token=0.5, intervalo_sondeo=0)
+    texto, ttft = turno(router)
+    print(f"   TTFT con cobertura: {ttft * 1000:.0f} ms")
+    check("la respuesta llega del backend sano", texto == RESPUESTA_POR_DEFECTO)
+    check("el TTFT queda por debajo de plazo + TTFT del sano + 0.3 s", ttft is not None and ttft < 0.9)
+    check("se lanzó una cobertura", router.stats["coberturas"] == 1)
+    _, ttft = turno(router)
+    print(f"   TTFT del segundo turno: {ttft * 1000:.0f} ms")
+    check("el segundo turno va directo al backend rápido", router.stats["coberturas"] == 1 and ttft < 0.4)
+    lento.stop()
+    sano.stop()
+
+
+def escenario_caido(check: Comprobaciones):
+    print("▶️  Failover y circuit breaker con un backend que devuelve HTTP 500")
+    caido = StubOllamaServer(fallo_http=500).start()
+    sano = StubOllamaServer(ttft=0.1).start()
+    router = RoutedLLMService([caido.url, sano.url], umbral_fallos=2, enfriamiento=1.0, intervalo_sondeo=0)
+    backend_caido = router.backends[0]
+    textos = []
+    for _ in range(2):
+        # Sin otra carga, el caído (primero de la lista) se elige hasta que se abre su circuito.
+        texto, _ = turno(router)
+        textos.append(texto)
+    check("el usuario no ve el error: failover al backend sano", all(t == RESPUESTA_POR_DEFECTO for t in textos))
+    check("el circuito se abre tras 2 fallos seguidos", backend_caido.estado == ABIERTO)
+    antes = caido.peticiones
+    turno(router)
+    check("con el circuito abierto no se envían peticiones al caído", caido.peticiones == antes)
+    caido.fallo_http = None
+    time.sleep(1.1)
+    texto, _ = turno(router)
+    check("tras el enfriamiento, la petición de prueba cierra el circuito",
+          backend_caido.estado == CERRADO and texto == RESPUESTA_POR_DEFECTO)
+    caido.stop()
+    sano.stop()
+
+
+def escenario_sondas(check: Comprobaciones):
+    print("▶️  Sondas: backend inalcanzable y modelo cargado")
+    frio = StubOllamaServer(ttft=0.1, carga_modelo=0.5).start()
+    caliente = StubOllamaServer(ttft=0.1).start()
+    router = RoutedLLMService([url_sin_servidor(), frio.url, caliente.url], intervalo_sondeo=0.2)
+    time.sleep(0.5)
+    check("el backend inalcanzable se marca como no sano", not router.backends[0].sano)
+    texto, _ = turno(router)
+    check("se prefiere el backend con el modelo ya cargado",
+          texto == RESPUESTA_POR_DEFECTO and caliente.peticiones == 1 and frio.peticiones == 0)
+    router.detener()
+    frio.stop()
+    caliente.stop()
+
+
+def escenario_sin_backends(check: Comprobaciones):
+    print("▶️  Todos los backends caídos")
+    router = RoutedLLMService([url_sin_servidor(), url_sin_servidor()], intervalo_sondeo=0)
+    texto, _ = turno(router)
+    check("se devuelve el mensaje de error habitual", texto == RESPUESTA_SIN_CONEXION)
+
+
+def main():
+    check = Comprobaciones()
+    for escenario in (escenario_balanceo, escenario_lento, escenario_caido, escenario_sondas, escenario_sin_backends):
+        escenario(check)
+    print("✅ Todos los escenarios pasan." if not check.fallos else f"❌ {check.fallos} comprobación(es) fallida(s).")
+    sys.exit(1 if check.fallos else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+@fileoverview Escenarios de ModelRouterLLMService con un stub de Ollama por nivel.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Cada nivel de modelo es un StubOllamaServer con la velocidad típica
+             de su tamaño (el pequeño responde antes y genera más rápido, el
+             grande tarda más en empezar y en cada token). Compara enviar todo al
+             modelo de siempre con el enrutado por complejidad, y comprueba qué
+             respuestas cuentan como evasivas, el escalado cuando el modelo
+             pequeño responde con evasivas y la degradación cuando el grande
+             se sale del presupuesto de TTFT.
+             Imprime el uso y la latencia por nivel y termina con código 1 si
+             alguna comprobación falla.
+             Uso: python -m benchmarks.bench_model_routing
+"""
+
+import os
+import statistics
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.bench_llm_routing import Comprobaciones
+from benchmarks.stub_ollama import StubOllamaServer, RESPUESTA_POR_DEFECTO
+from infrastructure.llm.llm_service import OllamaLLMService
+from infrastructure.llm.model_router_service import (ModelRouterLLMService, clasificar_complejidad, es_evasiva,
+                                                     NIVELES, PEQUENO, NORMAL, GRANDE)
+
+# (ttft, intervalo entre tokens) de cada nivel.
+VELOCIDADES = {PEQUENO: (0.08, 0.01), NORMAL: (0.4, 0.03), GRANDE: (1.0, 0.06)}
+RESPUESTA_EVASIVA = "Lo siento, no estoy seguro de poder responder a eso."
+RESPUESTA_CORTES = "Lo siento, son las cinco y diez."
+
+# Respuestas cortas del modelo pequeño y si deben provocar el escalado.
+EVASIVAS = [
+    ("No sé.", True),
+    ("No lo sé, la verdad.", True),
+    ("Lo siento, no puedo responder a eso.", True),
+    ("No sabría decirte.", True),
+    ("Como modelo de lenguaje, no tengo opiniones.", True),
+    ("", True),
+    (RESPUESTA_CORTES, False),
+    ("No se preocupe, son 4.", False),
+    ("No se sabe con certeza, pero se atribuye a Homero.", False),
+    ("Son las cuatro.", False),
+]
+
+PREGUNTAS = [
+    ("¿Cuánto es 2 más 2?", PEQUENO),
+    ("¿Qué hora es en Tokio?", PEQUENO),
+    ("¿Quién fue Cervantes?", PEQUENO),
+    ("¿Cómo se dice gracias en francés?", PEQUENO),
+    ("Cuéntame un chiste", PEQUENO),
+    ("Recomiéndame una película de ciencia ficción para esta noche", NORMAL),
+    ("¿Qué puedo cocinar con arroz, huevos y un poco de queso?", NORMAL),
+    ("Dame una idea de regalo para mi hermana que cumple treinta años", NORMAL),
+    ("Explícame esta cláusula del contrato de alquiler", GRANDE),
+    ("Compara Python y Rust para escribir un servidor web", GRANDE),
+    ("Escribe una función que ordene una lista de nombres", GRANDE),
+    ("¿Por qué el cielo es azul? Explícalo paso a paso", GRANDE),
+]
+
+def levantar(respuestas: dict | None = None, velocidades=VELOCIDADES) -> dict:
+    """@returns {dict} - Nivel → StubOllamaServer ya arrancado."""
+    return {nivel: StubOllamaServer(ttft=velocidades[nivel][0], intervalo_token=velocidades[nivel][1],
+                                    respuesta=(respuestas or {}).get(nivel, RESPUESTA_POR_DEFECTO)).start()
+            for nivel in NIVELES}
+
+
+def crear_router(stubs: dict, **kwargs) -> ModelRouterLLMService:
+    servicios = {nivel: OllamaLLMService(url=stub.url) for nivel, stub in stubs.items()}
+    return ModelRouterLLMService(servicios[NORMAL], servicios=servicios, **kwargs)
+
+
+def turno(router: ModelRouterLLMService, pregunta: str) -> tuple[str, float | None, float]:
+    """@returns {tuple} - Texto completo, TTFT y duración del turno."""
+    inicio = time.perf_counter()
+    ttft = None
+    partes = []
+    for chunk in router.stream_preguntar_a_jarvis(f"Eres Jarvis. La pregunta del usuario es: {pregunta}"):
+        if ttft is None and chunk:
+            ttft = time.perf_counter() - inicio
+        partes.append(chunk)
+    return "".join(partes), ttft, time.perf_counter() - inicio
+
+
+def imprimir_niveles(router: ModelRouterLLMService):
+    stats = router.estadisticas()
+    print(f"   {'nivel':<9}{'propuestas':>11}{'peticiones':>11}{'escaladas':>10}{'degradadas':>11}"
+          f"{'TTFT (ms)':>11}{'duración (ms)':>15}")
+    for nivel in NIVELES:
+        s = stats[nivel]
+        print(f"   {nivel:<9}{s['propuestas']:>11}{s['peticiones']:>11}{s['escaladas']:>10}{s['degradadas']:>11}"
+              f"{s['ttft_medio_s'] * 1000:>11.0f}{s['duracion_media_s'] * 1000:>15.0f}")
+
+
+def escenario_clasificador(check: Comprobaciones):
+    print("▶️  Clasificador local")
+    inicio = time.perf_counter()
+    for _ in range(100):
+        aciertos = sum(clasificar_complejidad(p) == esperado for p, esperado in PREGUNTAS)
+    coste = (time.perf_counter() - inicio) / (100 * len(PREGUNTAS))
+    print(f"   {coste * 1e6:.1f} µs por pregunta")
+    check(f"{aciertos}/{len(PREGUNTAS)} preguntas en el nivel esperado", aciertos == len(PREGUNTAS))
+
+
+def escenario_evasivas(check: Comprobaciones):
+    print("▶️  Detección de respuestas evasivas")
+    for respuesta, esperado in EVASIVAS:
+        check(f"{respuesta!r} {'es' if esperado else 'no es'} evasiva", es_evasiva(respuesta) == esperado)
+    stubs = levantar({PEQUENO: RESPUESTA_CORTES})
+    router = crear_router(stubs)
+    texto, ttft, _ = turno(router, "¿Qué hora es en Tokio?")
+    print(f"   TTFT: {ttft * 1000:.0f} ms")
+    check("una respuesta cortés pero válida no escala",
+          texto == RESPUESTA_CORTES and stubs[NORMAL].peticiones == 0)
+    for stub in stubs.values():
+        stub.stop()
+
+
+def escenario_reparto(check: Comprobaciones):
+    print("▶️  Todo al modelo de siempre frente a enrutado por complejidad")
+    stubs = levantar()
+    filas = {}
+    for nombre, clasificador in (("siempre normal", lambda _: NORMAL), ("enrutado", clasificar_complejidad)):
+        router = crear_router(stubs, clasificador=clasificador)
+        turnos = [turno(router, p) for p, _ in PREGUNTAS]
+        filas[nombre] = turnos
+        print(f"   {nombre:<15} TTFT medio {statistics.fmean(t for _, t, _ in turnos) * 1000:6.0f} ms, "
+              f"duración media {statistics.fmean(d for _, _, d in turnos) * 1000:6.0f} ms")
+        if nombre == "enrutado":
+            imprimir_niveles(router)
+    simples = [i for i, (_, nivel) in enumerate(PREGUNTAS) if nivel == PEQUENO]
+    ttft_simple = {n: statistics.fmean(filas[n][i][1] for i in simples) for n in filas}
+    check(f"las preguntas simples empiezan antes ({ttft_simple['enrutado'] * 1000:.0f} ms frente a "
+          f"{ttft_simple['siempre normal'] * 1000:.0f} ms)", ttft_simple["enrutado"] < ttft_simple["siempre normal"])
+    check("todas las respuestas llegan completas",
+          all(texto == RESPUESTA_POR_DEFECTO for turnos in filas.values() for texto, _, _ in turnos))
+    for stub in stubs.values():
+        stub.stop()
+
+
+def escenario_escalado(check: Comprobaciones):
+    print("▶️  Escalado cuando el modelo pequeño responde con evasivas")
+    stubs = levantar({PEQUENO: RESPUESTA_EVASIVA})
+    router = crear_router(stubs)
+    texto, ttft, _ = turno(router, "¿Quién fue Cervantes?")
+    print(f"   TTFT con escalado: {ttft * 1000:.0f} ms")
+    check("el usuario solo oye la respuesta del nivel normal", texto == RESPUESTA_POR_DEFECTO)
+    check("se pidió a los dos niveles", stubs[PEQUENO].peticiones == 1 and stubs[NORMAL].peticiones == 1)
+    check("el escalado queda contado", router.estadisticas()[PEQUENO]["escaladas"] == 1)
+    for stub in stubs.values():
+        stub.stop()
+
+
+def escenario_presupuesto(check: Comprobaciones):
+    print("▶️  Presupuesto de TTFT de 1 s con un modelo grande que tarda 2 s")
+    stubs = levantar(velocidades={**VELOCIDADES, GRANDE: (2.0, 0.06)})
+    router = crear_router(stubs, presupuesto_ttft=1.0, refresco=4)
+    pregunta = "Explícame esta cláusula del contrato de alquiler"
+    ttfts = [turno(router, pregunta)[1] for _ in range(5)]
+    print(f"   TTFT por turno: {', '.join(f'{t * 1000:.0f}' for t in ttfts)} ms")
+    imprimir_niveles(router)
+    check("tras medirlo una vez se usa el nivel normal", ttfts[1] < 1.0 and ttfts[2] < 1.0)
+    check(f"el nivel grande se vuelve a probar cada 4 degradaciones ({stubs[GRANDE].peticiones} peticiones)",
+          stubs[GRANDE].peticiones == 2)
+    for stub in stubs.values():
+        stub.stop()
+
+
+def main():
+    check = Comprobaciones()
+    for escenario in (escenario_clasificador, escenario_evasivas, escenario_reparto, escenario_escalado,
+                      escenario_presupuesto):
+        escenario(check)
+    print("✅ Todos los escenarios pasan." if not check.fallos else f"❌ {check.fallos} comprobación(es) fallida(s).")
+    sys.exit(1 if check.fallos else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+@fileoverview Benchmark del jitter de detección del hotword dentro y fuera del proceso.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Reproduce a tiempo real un WAV de 'benchmarks/escenarios.json'
+             repetido varias veces y mide, para cada detección, el tiempo desde
+             el final de la palabra clave hasta el callback del hotword. Compara
+             el detector en el mismo proceso con RecognitionWorker, con y sin
+             una carga que retiene el GIL como lo hacen el pintado de la mascota
+             y el TTS (ráfagas de Python puro de unos 12 ms a 60 Hz). El jitter
+             es la desviación típica y la distancia entre p50 y p95.
+             Uso: python -m benchmarks.bench_recognition_jitter [--repeticiones 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.bench_e2e import ESCENARIOS
+from benchmarks.bench_segmenter import DATA_DIR
+from infrastructure.audio.audio_capture import AudioCaptureService
+from infrastructure.audio.audio_source import WavFileSource
+from infrastructure.audio.hotword_detector import VoskHotwordDetector
+from infrastructure.audio.recognition_worker import RecognitionWorker, ProcessHotwordDetector
+
+def wav_repetido(ruta: str, repeticiones: int, pausa_s: float) -> tuple[str, float]:
+    """Escribe un WAV temporal con el original repetido; devuelve su ruta y el periodo (s)."""
+    with wave.open(ruta, "rb") as wav:
+        params = wav.getparams()
+        muestras = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    silencio = np.zeros(int(pausa_s * params.framerate) * params.nchannels, dtype=np.int16)
+    periodo = (len(muestras) + len(silencio)) / params.nchannels / params.framerate
+    destino = tempfile.NamedTemporaryFile(suffix=".wav", delete=False).name
+    with wave.open(destino, "wb") as wav:
+        wav.setparams(params)
+        wav.writeframes(np.tile(np.concatenate([muestras, silencio]), repeticiones).tobytes())
+    return destino, periodo
+
+
+def carga_gil(detener: threading.Event, rafaga_s=0.012, periodo_s=1 / 60):
+    """Simula el bucle de pintado: trabajo en Python puro que no suelta el GIL."""
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        x = 0
+        while time.perf_counter() - inicio < rafaga_s:
+            for i in range(200):
+                x += i * i
+        time.sleep(max(0.0, periodo_s - (time.perf_counter() - inicio)))
+
+
+def medir(modo: str, ruta: str, repeticiones: int, periodo: float, fin_hotword_s: float, con_carga: bool) -> list[float]:
+    fuente = WavFileSource(ruta, velocidad=1.0)
+    detecciones = []
+    registrar = lambda: detecciones.append(time.perf_counter())
+    worker = None
+    if modo == "en_proceso":
+        capture = AudioCaptureService(source=fuente)
+        detector = VoskHotwordDetector(capture, on_hotword_callback=registrar)
+    else:
+        worker = RecognitionWorker(source=fuente).iniciar()
+        detector = ProcessHotwordDetector(worker)
+        detector.on_hotword_callback = registrar
+
+    detener = threading.Event()
+    cargas = [threading.Thread(target=carga_gil, args=(detener,), daemon=True) for _ in range(2 if con_carga else 0)]
+    for carga in cargas:
+        carga.start()
+    hilo = threading.Thread(target=detector.start, daemon=True)
+    hilo.start()
+    fuente.terminado.wait(timeout=periodo * repeticiones + 30)
+    time.sleep(1.0)
+    detener.set()
+    detector.stop()
+    if worker:
+        worker.detener()
+    else:
+        capture.stop()
+    hilo.join(timeout=2.0)
+
+    latencias = []
+    for k in range(repeticiones):
+        fin = fuente.instante_de(k * periodo + fin_hotword_s)
+        siguientes = [t - fin for t in detecciones if fin is not None and 0 <= t - fin < periodo]
+        if siguientes:
+            latencias.append(min(siguientes))
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_recognition_jitter")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--pausa", type=float, default=1.5, help="Silencio entre repeticiones (s).")
+    args = parser.parse_args()
+
+    with open(ESCENARIOS, encoding="utf-8") as f:
+        escenario = json.load(f)[0]
+    original = os.path.join(DATA_DIR, escenario["wav"])
+    if not os.path.exists(original):
+        print(f"Falta {escenario['wav']}; graba el escenario para ejecutar este benchmark.")
+        return
+    ruta, periodo = wav_repetido(original, args.repeticiones, args.pausa)
+
+    print(f"{'modo':<16}{'carga':>7}{'detect.':>9}{'media (ms)':>12}{'p50':>8}{'p95':>8}{'máx':>8}{'desv.':>8}")
+    try:
+        for modo in ("en_proceso", "proceso_aparte"):
+            for con_carga in (False, True):
+                latencias = medir(modo, ruta, args.repeticiones, periodo, escenario["fin_hotword_s"], con_carga)
+                if not latencias:
+                    print(f"{modo:<16}{'sí' if con_carga else 'no':>7}{0:>9}   (sin detecciones)")
+                    continue
+                ms = sorted(l * 1000 for l in latencias)
+                desviacion = statistics.pstdev(ms) if len(ms) > 1 else 0.0
+                print(f"{modo:<16}{'sí' if con_carga else 'no':>7}{len(ms):>9}{statistics.fmean(ms):>12.1f}"
+                      f"{ms[len(ms) // 2]:>8.1f}{ms[min(len(ms) - 1, int(len(ms) * 0.95))]:>8.1f}"
+                      f"{ms[-1]:>8.1f}{desviacion:>8.1f}")
+    finally:
+        os.unlink(ruta)
+
+
+if __name__ == '__main__':
+    main()
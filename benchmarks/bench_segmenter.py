@@ -0,0 +1,99 @@
+"""
+@fileoverview Benchmark del segmentador de frases sobre streams reales de Ollama.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Reproduce los streams NDJSON grabados en 'benchmarks/data' usando
+             sus marcas 'created_at' como reloj virtual y mide, para el
+             segmentador heredado (rfind) y el incremental, la latencia hasta
+             la primera frase emitida y el coste de CPU por token.
+             Uso: python -m benchmarks.bench_segmenter
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from application.sentence_segmenter import StreamingSentenceSegmenter
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+REPETICIONES = 200
+
+def cargar_stream(path: str) -> list[tuple[float, str]]:
+    """Lee un stream grabado y devuelve (segundos desde el primer token, texto)."""
+    tokens = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            chunk = json.loads(line)
+            if chunk.get("done"):
+                break
+            instante = datetime.fromisoformat(chunk["created_at"].rstrip("Z")[:26])
+            tokens.append((instante.timestamp(), chunk.get("response", "")))
+    t0 = tokens[0][0]
+    return [(t - t0, texto) for t, texto in tokens]
+
+
+class LegacySegmenter:
+    """Réplica del algoritmo original de '_stream_and_speak' como referencia."""
+    terminators = ['.', '?', '!', ':', '\n']
+
+    def reset(self):
+        self.buffer = ""
+
+    def feed(self, chunk: str) -> list[str]:
+        self.buffer += chunk
+        last = -1
+        for terminator in self.terminators:
+            pos = self.buffer.rfind(terminator)
+            if pos > last:
+                last = pos
+        if last == -1:
+            return []
+        frase = self.buffer[:last + 1].strip()
+        self.buffer = self.buffer[last + 1:]
+        return [frase] if frase else []
+
+    def flush(self):
+        resto = self.buffer.strip()
+        self.reset()
+        return resto or None
+
+
+def primera_frase(segmenter, tokens) -> tuple[float, str]:
+    segmenter.reset()
+    for instante, texto in tokens:
+        frases = segmenter.feed(texto)
+        if frases:
+            return instante, frases[0]
+    return tokens[-1][0], segmenter.flush() or ""
+
+
+def coste_por_token(segmenter, tokens) -> float:
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        segmenter.reset()
+        for _, texto in tokens:
+            segmenter.feed(texto)
+        segmenter.flush()
+    return (time.perf_counter() - inicio) / (REPETICIONES * len(tokens)) * 1e6
+
+
+def main():
+    segmentadores = {"legacy": LegacySegmenter(), "incremental": StreamingSentenceSegmenter()}
+    print(f"{'stream':<28}{'segmentador':<14}{'1ª frase (ms)':>15}{'µs/token':>11}  primera frase")
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "*.ndjson"))):
+        tokens = cargar_stream(path)
+        nombre = os.path.splitext(os.path.basename(path))[0]
+        for etiqueta, segmenter in segmentadores.items():
+            instante, frase = primera_frase(segmenter, tokens)
+            coste = coste_por_token(segmenter, tokens)
+            print(f"{nombre:<28}{etiqueta:<14}{instante * 1000:>15.0f}{coste:>11.2f}  {frase[:40]!r}")
+
+if __name__ == '__main__':
+    main()
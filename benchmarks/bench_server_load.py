@@ -0,0 +1,162 @@
+"""
+@fileoverview Prueba de carga del modo servidor: escalado con el número de clientes.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Arranca StubOllamaServer en este proceso y 'presentation.server' en
+             un subproceso, y conecta N clientes a la vez (por defecto 1, 2, 4 y
+             8). Cada cliente envía en tiempo real el WAV de un escenario de
+             tiempo real de 'escenarios.json' y mide la latencia del turno (fin
+             del comando → primera frase de la respuesta). Por nivel informa de
+             los turnos completados por segundo, p50/p95 de la latencia y las
+             sesiones rechazadas por el control de admisión.
+             Uso: python -m benchmarks.bench_server_load [--niveles 1,2,4,8] [--max-sesiones 4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import wave
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.bench_e2e import ESCENARIOS
+from benchmarks.bench_segmenter import DATA_DIR
+from benchmarks.stub_ollama import StubOllamaServer
+from infrastructure.server import protocol
+
+BLOQUE_S = 0.05
+
+def leer_wav(ruta: str) -> tuple[bytes, int, int]:
+    """@returns {tuple[bytes, int, int]} - PCM int16, frecuencia y canales."""
+    with wave.open(ruta, "rb") as wav:
+        return wav.readframes(wav.getnframes()), wav.getframerate(), wav.getnchannels()
+
+
+async def cliente(host: str, puerto: int, escenario: dict, timeout: float) -> dict:
+    """Una sesión: envía el WAV a tiempo real seguido de silencio y espera la respuesta."""
+    pcm, samplerate, canales = leer_wav(os.path.join(DATA_DIR, escenario["wav"]))
+    reader, writer = await asyncio.open_connection(host, puerto)
+    writer.write(protocol.empaquetar(protocol.HOLA, json.dumps({"samplerate": samplerate, "canales": canales}).encode()))
+    resultado = {"nombre": escenario["nombre"], "rechazado": False, "latencia_s": None}
+    inicio = time.perf_counter()
+    respuesta = asyncio.get_running_loop().create_future()
+
+    async def escuchar():
+        while True:
+            trama = await protocol.leer_trama(reader)
+            if trama is None:
+                break
+            if trama[0] == protocol.CONTROL:
+                mensaje = json.loads(trama[1])
+                if mensaje.get("error"):
+                    resultado["rechazado"] = True
+                    break
+                if mensaje.get("origen") == "respuesta" and not respuesta.done():
+                    respuesta.set_result(time.perf_counter())
+        if not respuesta.done():
+            respuesta.set_result(None)
+
+    escucha = asyncio.create_task(escuchar())
+    tam_bloque = int(samplerate * BLOQUE_S) * canales * 2
+    # Tras el comando, silencio para que el endpointing del servidor cierre la frase.
+    audio = pcm + bytes(int(samplerate * 2.0) * canales * 2)
+    try:
+        for i, desde in enumerate(range(0, len(audio), tam_bloque)):
+            if respuesta.done():
+                break
+            writer.write(protocol.empaquetar(protocol.AUDIO, audio[desde:desde + tam_bloque]))
+            await writer.drain()
+            # Ritmo de tiempo real respecto al inicio, sin acumular deriva.
+            await asyncio.sleep(max(0.0, inicio + (i + 1) * BLOQUE_S - time.perf_counter()))
+        instante = await asyncio.wait_for(asyncio.shield(respuesta), timeout)
+        if instante is not None:
+            resultado["latencia_s"] = instante - (inicio + escenario["fin_comando_s"])
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        try:
+            writer.write(protocol.empaquetar(protocol.FIN))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        escucha.cancel()
+        writer.close()
+    return resultado
+
+
+async def nivel(host: str, puerto: int, escenarios: list[dict], clientes: int, timeout: float) -> dict:
+    """Lanza 'clientes' sesiones simultáneas y resume sus resultados."""
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(cliente(host, puerto, escenarios[i % len(escenarios)], timeout)
+                                         for i in range(clientes)))
+    duracion = time.perf_counter() - inicio
+    latencias = [r["latencia_s"] for r in resultados if r["latencia_s"] is not None]
+    ordenadas = sorted(latencias)
+    p50, p95 = (ordenadas[int(q * (len(ordenadas) - 1))] for q in (0.5, 0.95)) if ordenadas else (None, None)
+    return {"clientes": clientes, "completados": len(latencias),
+            "rechazados": sum(r["rechazado"] for r in resultados),
+            "turnos_por_s": len(latencias) / duracion, "p50_s": p50, "p95_s": p95}
+
+
+def esperar_puerto(host: str, puerto: int, proceso: subprocess.Popen, timeout=120.0) -> bool:
+    """Espera a que el servidor acepte conexiones (cargar el modelo VOSK tarda)."""
+    limite = time.perf_counter() + timeout
+    while time.perf_counter() < limite and proceso.poll() is None:
+        try:
+            socket.create_connection((host, puerto), timeout=1.0).close()
+            return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_server_load")
+    parser.add_argument("--niveles", default="1,2,4,8", help="Clientes simultáneos por ronda.")
+    parser.add_argument("--max-sesiones", type=int, default=4)
+    parser.add_argument("--llm-concurrentes", type=int, default=2)
+    parser.add_argument("--puerto", type=int, default=8799)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Segundos máximos por turno.")
+    args = parser.parse_args()
+
+    with open(ESCENARIOS, encoding="utf-8") as f:
+        escenarios = [e for e in json.load(f)
+                      if e.get("velocidad") and os.path.exists(os.path.join(DATA_DIR, e["wav"]))]
+    if not escenarios:
+        print("No hay WAV de escenarios de tiempo real en benchmarks/data/audio; se omite la prueba.")
+        return
+
+    host = "127.0.0.1"
+    stub = StubOllamaServer(ttft=0.3).start()
+    servidor = subprocess.Popen([sys.executable, "-m", "presentation.server", "--host", host,
+                                 "--puerto", str(args.puerto), "--max-sesiones", str(args.max_sesiones),
+                                 "--llm-concurrentes", str(args.llm_concurrentes),
+                                 "--url-ollama", stub.url, "--sin-cache"],
+                                cwd=project_root, stdout=subprocess.DEVNULL)
+    try:
+        if not esperar_puerto(host, args.puerto, servidor):
+            print("El servidor no arrancó.")
+            return
+        print(f"{'clientes':>8}{'completados':>13}{'rechazados':>12}{'turnos/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+        for clientes in (int(n) for n in args.niveles.split(",")):
+            r = asyncio.run(nivel(host, args.puerto, escenarios, clientes, args.timeout))
+            p50 = f"{r['p50_s'] * 1000:.0f}" if r["p50_s"] is not None else "-"
+            p95 = f"{r['p95_s'] * 1000:.0f}" if r["p95_s"] is not None else "-"
+            print(f"{clientes:>8}{r['completados']:>13}{r['rechazados']:>12}{r['turnos_por_s']:>10.3f}{p50:>10}{p95:>10}")
+            time.sleep(1.0)  # Deja que el servidor cierre las sesiones de la ronda.
+        print(f"Peticiones al LLM: {stub.peticiones}, máximo simultáneo: {stub.max_en_curso}")
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=10)
+        stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+@fileoverview Dobles de servicios para ejecutar el asistente sin altavoz ni GUI.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description RecordingTTSService implementa ITTSService sin sintetizar nada:
+             registra cada frase y su instante, y puede simular la duración de
+             la locución. MemoryTracer implementa ITracer guardando los turnos
+             en memoria con instantes absolutos para que el runner los compare
+             con los de la fuente de audio.
+"""
+
+import threading
+import time
+from domain.services import ITTSService, ITracer, NullTracer
+
+class RecordingTTSService(ITTSService):
+    """
+    @class RecordingTTSService
+    @description TTS nulo que graba lo que se le pide decir.
+    """
+    def __init__(self, tracer: ITracer | None = None, segundos_por_caracter=0.0):
+        """
+        @param {ITracer | None} tracer - Recibe la marca 'primera_frase'.
+        @param {float} segundos_por_caracter - Duración simulada de la locución (0 = instantánea).
+        """
+        self.tracer = tracer or NullTracer()
+        self.segundos_por_caracter = segundos_por_caracter
+        self.frases = []
+        self._fin_locucion = 0.0
+        self._cancelado = threading.Event()
+
+    def _decir(self, texto: str, origen: str):
+        ahora = time.perf_counter()
+        self.frases.append((ahora, origen, texto))
+        inicio = max(ahora, self._fin_locucion)
+        self._fin_locucion = inicio + len(texto) * self.segundos_por_caracter
+        if origen == "respuesta":
+            self.tracer.marcar("primera_frase")
+
+    def hablar(self, texto: str):
+        self._decir(texto, "hablar")
+        self.esperar()
+
+    def hablar_frase(self, texto: str):
+        self._decir(texto, "frase")
+        self.esperar()
+
+    def encolar(self, texto: str):
+        self._decir(texto, "respuesta")
+
+    def esperar(self):
+        self._cancelado.clear()
+        self._cancelado.wait(max(0.0, self._fin_locucion - time.perf_counter()))
+
+    def cancelar(self):
+        self._fin_locucion = 0.0
+        self._cancelado.set()
+
+
+class MemoryTracer(ITracer):
+    """
+    @class MemoryTracer
+    @description Tracer que conserva los turnos cerrados con instantes perf_counter absolutos.
+    """
+    def __init__(self):
+        self.turnos = []
+        self._turno = None
+        self._cond = threading.Condition()
+
+    def iniciar_turno(self, instante: float | None = None):
+        with self._cond:
+            if self._turno is not None:
+                self._cerrar("interrumpido")
+            self._turno = {"eventos": {"hotword": instante if instante is not None else time.perf_counter()},
+                           "medidas": {}}
+
+    def marcar(self, evento: str):
+        ahora = time.perf_counter()
+        with self._cond:
+            if self._turno is not None:
+                self._turno["eventos"].setdefault(evento, ahora)
+
+    def registrar(self, nombre: str, valor: float):
+        with self._cond:
+            if self._turno is not None:
+                self._turno["medidas"][nombre] = valor
+
+    def finalizar_turno(self, resultado: str = "ok"):
+        with self._cond:
+            if self._turno is not None:
+                self._cerrar(resultado)
+
+    def _cerrar(self, resultado: str):
+        self._turno["eventos"].setdefault("fin", time.perf_counter())
+        self._turno["resultado"] = resultado
+        self.turnos.append(self._turno)
+        self._turno = None
+        self._cond.notify_all()
+
+    def esperar_turnos(self, n: int, timeout: float) -> bool:
+        """
+        @returns {bool} - True si se cerraron al menos 'n' turnos antes del timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self.turnos) >= n, timeout)
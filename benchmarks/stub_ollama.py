@@ -0,0 +1,225 @@
+"""
+@fileoverview Servidor HTTP local que imita la API de streaming de Ollama.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Responde a '/api/generate' y '/api/chat' con NDJSON troceado
+             (chunked) y tiempos configurables: retardo hasta el primer token,
+             intervalo entre tokens, carga simulada del modelo y prefill
+             proporcional a los tokens del prompt que no están en la caché de
+             prefijo. Puede reproducir un stream grabado de 'benchmarks/data'
+             respetando sus 'created_at'. También expone '/api/tags' y '/api/ps'
+             para las sondas de salud.
+             Uso: python -m benchmarks.stub_ollama --puerto 11435
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.bench_segmenter import cargar_stream, DATA_DIR
+
+RESPUESTA_POR_DEFECTO = "Claro, señor. Son las diez y cuarto. ¿Necesita algo más?"
+
+def tokens_de_texto(texto: str, intervalo: float) -> list[tuple[float, str]]:
+    """Trocea un texto en palabras espaciadas 'intervalo' segundos."""
+    palabras = texto.split(" ")
+    return [(i * intervalo, palabra if i == 0 else " " + palabra) for i, palabra in enumerate(palabras)]
+
+
+class StubOllamaServer:
+    """
+    @class StubOllamaServer
+    @description Servidor en un hilo propio; 'url' apunta a su '/api/generate'
+                 (también atiende '/api/chat').
+    """
+    def __init__(self, host="127.0.0.1", puerto=0, respuesta=RESPUESTA_POR_DEFECTO, ttft=0.2,
+                 intervalo_token=0.03, stream_grabado: str | None = None, carga_modelo=0.0, modelo="mistral",
+                 fallo_http: int | None = None, prefill_por_token=0.0, cache_prefijo=True):
+        """
+        @param {int} puerto - 0 elige un puerto libre.
+        @param {str} respuesta - Texto devuelto si no hay stream grabado.
+        @param {float} ttft - Segundos hasta el primer token (prefill simulado).
+        @param {float} intervalo_token - Segundos entre tokens del texto.
+        @param {str | None} stream_grabado - Fichero NDJSON (ruta o nombre en 'benchmarks/data').
+        @param {float} carga_modelo - Retardo extra de la primera petición (modelo en frío).
+        @param {int | None} fallo_http - Si se indica, '/api/generate' responde con ese
+               código de error (se puede cambiar en caliente para simular una caída).
+        @param {float} prefill_por_token - Segundos de prefill por cada token del prompt
+               que no esté en la caché; se suma a 'ttft'.
+        @param {bool} cache_prefijo - Simula la caché KV de Ollama: los tokens del
+               prefijo común con la petición anterior no se vuelven a evaluar.
+        """
+        if stream_grabado:
+            if not os.path.exists(stream_grabado):
+                stream_grabado = os.path.join(DATA_DIR, stream_grabado)
+            self.tokens = cargar_stream(stream_grabado)
+        else:
+            self.tokens = tokens_de_texto(respuesta, intervalo_token)
+        self.ttft = ttft
+        self.carga_modelo = carga_modelo
+        self.modelo = modelo
+        self.fallo_http = fallo_http
+        self.prefill_por_token = prefill_por_token
+        self.cache_prefijo = cache_prefijo
+        self._en_cache = []
+        self.peticiones = 0
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self._cargado = carga_modelo <= 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, puerto), self._crear_handler())
+        self._server.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._server.server_address[:2]
+        return f"http://{host}:{puerto}/api/generate"
+
+    def start(self) -> "StubOllamaServer":
+        self._hilo = threading.Thread(target=self._server.serve_forever, name="stub-ollama", daemon=True)
+        self._hilo.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _evaluar_prompt(self, palabras: list[str]) -> int:
+        """Tokens (palabras) del prompt que hay que evaluar, descontando el prefijo en caché."""
+        with self._lock:
+            comunes = 0
+            if self.cache_prefijo:
+                for a, b in zip(self._en_cache, palabras):
+                    if a != b:
+                        break
+                    comunes += 1
+            # La respuesta también queda en la caché, como en Ollama.
+            self._en_cache = palabras + ["assistant:"] + "".join(t for _, t in self.tokens).split()
+            return len(palabras) - comunes
+
+    def _retardo_carga(self) -> float:
+        with self._lock:
+            if self._cargado:
+                return 0.0
+            self._cargado = True
+        return self.carga_modelo
+
+    def _crear_handler(self):
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _json(self, cuerpo: dict):
+                datos = json.dumps(cuerpo).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def _chunk(self, linea: dict):
+                datos = (json.dumps(linea, ensure_ascii=False) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(datos):x}\r\n".encode("ascii") + datos + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._json({"models": [{"name": f"{stub.modelo}:latest", "model": f"{stub.modelo}:latest"}]})
+                elif self.path == "/api/ps":
+                    self._json({"models": [{"name": f"{stub.modelo}:latest"}] if stub._cargado else []})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                if self.path not in ("/api/generate", "/api/chat"):
+                    self.send_error(404)
+                    return
+                cuerpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.peticiones += 1
+                    stub.en_curso += 1
+                    stub.max_en_curso = max(stub.max_en_curso, stub.en_curso)
+                try:
+                    if stub.fallo_http:
+                        self.send_error(stub.fallo_http)
+                    else:
+                        self._generar(cuerpo)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # El cliente canceló el stream.
+                finally:
+                    with stub._lock:
+                        stub.en_curso -= 1
+
+            def _generar(self, cuerpo: dict):
+                carga = stub._retardo_carga()
+                time.sleep(carga)
+                chat = "messages" in cuerpo
+                if chat:
+                    palabras = " ".join(f"{m['role']}: {m['content']}" for m in cuerpo["messages"]).split()
+                else:
+                    palabras = cuerpo.get("prompt", "").split()
+                if not cuerpo.get("stream", True) or not palabras:
+                    self._json({"model": stub.modelo, "response": "", "done": True})
+                    return
+                evaluados = stub._evaluar_prompt(palabras)
+                prefill = stub.ttft + stub.prefill_por_token * evaluados
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                inicio = time.perf_counter() + prefill
+                contenido = (lambda t: {"message": {"role": "assistant", "content": t}}) if chat else \
+                            (lambda t: {"response": t})
+                for instante, texto in stub.tokens:
+                    espera = inicio + instante - time.perf_counter()
+                    if espera > 0:
+                        time.sleep(espera)
+                    self._chunk({"model": stub.modelo, "created_at": datetime.now(timezone.utc).isoformat(),
+                                 **contenido(texto), "done": False})
+                generacion = time.perf_counter() - inicio
+                self._chunk({"model": stub.modelo, "created_at": datetime.now(timezone.utc).isoformat(),
+                             **contenido(""), "done": True, "done_reason": "stop",
+                             "load_duration": int(carga * 1e9),
+                             "prompt_eval_count": evaluados,
+                             "prompt_eval_duration": int(prefill * 1e9),
+                             "eval_count": len(stub.tokens), "eval_duration": int(max(generacion, 1e-3) * 1e9)})
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return _Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.stub_ollama", description=__doc__)
+    parser.add_argument("--puerto", type=int, default=11435)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--intervalo", type=float, default=0.03)
+    parser.add_argument("--stream", default=None, help="Stream NDJSON grabado a reproducir.")
+    parser.add_argument("--carga", type=float, default=0.0, help="Carga simulada del modelo en frío.")
+    args = parser.parse_args()
+    stub = StubOllamaServer(puerto=args.puerto, ttft=args.ttft, intervalo_token=args.intervalo,
+                            stream_grabado=args.stream, carga_modelo=args.carga).start()
+    print(f"Stub de Ollama escuchando en {stub.url}")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        stub.stop()
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,8 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Generator
+from typing import Callable, Generator
+import threading
 
 class IHotwordDetector(ABC):
     """
@@ -35,6 +36,14 @@ class IHotwordDetector(ABC):
         """ Detiene y libera los recursos del detector. """
         pass
 
+    def set_supresion_eco(self, activa: bool):
+        """
+        @param {bool} activa - True mientras el asistente está hablando.
+        @description Endurece la detección para no activarse con la propia voz
+                     del asistente. Por defecto no hace nada.
+        """
+        pass
+
 
 class ISTTService(ABC):
     """
@@ -42,8 +51,10 @@ class ISTTService(ABC):
     @description Contrato para un servicio de Voz a Texto (Speech-to-Text).
     """
     @abstractmethod
-    def escuchar_comando(self) -> str | None:
+    def escuchar_comando(self, on_parcial=None) -> str | None:
         """
+        @param {Callable[[str], None] | None} on_parcial - Callback opcional que recibe
+               las transcripciones parciales mientras el usuario habla.
         @returns {str | None} - El texto transcrito o None si hay un error.
         @description Escucha un comando de voz del usuario y lo transcribe a texto.
         """
@@ -63,6 +74,45 @@ class ITTSService(ABC):
         """
         pass
 
+    def encolar(self, texto: str):
+        """
+        @param {str} texto - Frase a reproducir.
+        @description Añade una frase a la cola de reproducción sin bloquear.
+                     Por defecto se comporta como 'hablar'.
+        """
+        self.hablar(texto)
+
+    def esperar(self):
+        """ Bloquea hasta que todas las frases encoladas se hayan reproducido. """
+        pass
+
+    def cancelar(self):
+        """ Detiene la reproducción en curso y descarta las frases pendientes. """
+        pass
+
+    def ajustar_volumen(self, nivel: float):
+        """
+        @param {float} nivel - Volumen de la voz entre 0.0 y 1.0.
+        @description Por defecto no hace nada.
+        """
+        pass
+
+    def precalentar(self, frases: list[str]):
+        """
+        @param {list[str]} frases - Frases fijas que se repiten en cada interacción.
+        @description Renderiza de antemano el audio de las frases para que
+                     'hablar_frase' pueda reproducirlas sin sintetizar.
+        """
+        pass
+
+    def hablar_frase(self, texto: str):
+        """
+        @param {str} texto - Frase fija, idealmente ya precalentada.
+        @description Reproduce una frase desde la caché de audio si está disponible.
+                     Por defecto se comporta como 'hablar'.
+        """
+        self.hablar(texto)
+
 
 class ILLMService(ABC):
     """
@@ -77,4 +127,103 @@ class ILLMService(ABC):
         @returns {Generator[str, None, None]} - Un generador que produce la respuesta en trozos (streaming).
         @description Envía un prompt al LLM y devuelve la respuesta como un stream de texto.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def stream_conversar(self, mensajes: list[dict], model: str) -> Generator[str, None, None]:
+        """
+        @param {list[dict]} mensajes - Conversación como [{"role": "system"|"user"|"assistant", "content": str}].
+        @param {str} model - El identificador del modelo a usar.
+        @returns {Generator[str, None, None]} - La respuesta al último mensaje, en streaming.
+        @description Por defecto aplana la conversación en un único prompt; las
+                     implementaciones con API de chat pueden reutilizar la caché
+                     del prefijo común entre turnos.
+        """
+        etiquetas = {"user": "Usuario", "assistant": "Asistente"}
+        lineas = [m["content"] if m["role"] == "system" else f"{etiquetas.get(m['role'], m['role'])}: {m['content']}"
+                  for m in mensajes]
+        return self.stream_preguntar_a_jarvis("\n".join(lineas + ["Asistente:"]), model=model)
+
+    def stream_cancelable(self, prompt: str, model: str = "mistral",
+                          mensajes: list[dict] | None = None) -> tuple[Generator[str, None, None], Callable[[], None]]:
+        """
+        @param {list[dict] | None} mensajes - Si se pasan, se usa 'stream_conversar' y se ignora 'prompt'.
+        @returns {tuple} - El stream y una función que cancela solo ese stream
+                 (a diferencia de 'cancelar', que corta todos los de este servicio).
+        @description Por defecto el stream deja de entregar texto en el siguiente
+                     trozo; las implementaciones pueden además cortar la petición.
+        """
+        cancelado = threading.Event()
+        generador = (self.stream_conversar(mensajes, model=model) if mensajes is not None
+                     else self.stream_preguntar_a_jarvis(prompt, model=model))
+
+        def _stream():
+            try:
+                for chunk in generador:
+                    if cancelado.is_set():
+                        return
+                    yield chunk
+            finally:
+                generador.close()
+        return _stream(), cancelado.set
+
+    def cancelar(self):
+        """ Cancela las respuestas en curso para que el modelo deje de generar. """
+        pass
+
+
+class ITracer(ABC):
+    """
+    @interface ITracer
+    @description Contrato para registrar la latencia de cada turno de conversación.
+                 Los servicios marcan eventos del turno activo; las implementaciones
+                 deben ser lo bastante baratas como para dejarlas activas siempre.
+    """
+    @abstractmethod
+    def iniciar_turno(self, instante: float | None = None):
+        """
+        @param {float | None} instante - Marca de 'time.perf_counter()' del hotword;
+               si se omite se usa el momento actual.
+        @description Abre un turno nuevo (cerrando el anterior si seguía abierto).
+        """
+        pass
+
+    @abstractmethod
+    def marcar(self, evento: str):
+        """
+        @param {str} evento - Nombre del hito (p. ej. 'stt_final'). Solo cuenta la
+               primera vez que se marca en el turno.
+        """
+        pass
+
+    @abstractmethod
+    def registrar(self, nombre: str, valor: float):
+        """
+        @param {str} nombre - Nombre de la medida (p. ej. 'tokens_por_s').
+        @param {float} valor - Valor de la medida en el turno activo.
+        """
+        pass
+
+    @abstractmethod
+    def finalizar_turno(self, resultado: str = "ok"):
+        """
+        @param {str} resultado - Cómo terminó el turno ('ok', 'sin_comando', 'interrumpido'...).
+        """
+        pass
+
+
+class NullTracer(ITracer):
+    """
+    @class NullTracer
+    @description Implementación vacía usada cuando no se configura trazado.
+    """
+    def iniciar_turno(self, instante: float | None = None):
+        pass
+
+    def marcar(self, evento: str):
+        pass
+
+    def registrar(self, nombre: str, valor: float):
+        pass
+
+    def finalizar_turno(self, resultado: str = "ok"):
+        pass
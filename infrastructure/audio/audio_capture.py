@@ -0,0 +1,285 @@
+"""
+@fileoverview Servicio de captura de audio compartido basado en un buffer circular.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Centraliza la única instancia del modelo VOSK y el único stream de
+             entrada del micrófono. Los bloques capturados se escriben en un
+             buffer circular de tamaño fijo del que leen tanto el detector de
+             hotword como el servicio de STT, cada uno con su propio cursor.
+             Esto permite un "pre-roll": el STT puede empezar a leer audio
+             anterior al momento en que se le invoca. El origen del audio es
+             una AudioSource inyectable (micrófono por defecto) y cada bloque
+             pasa por el front-end DSP, así que el buffer guarda PCM mono a la
+             frecuencia nativa del modelo.
+"""
+
+from infrastructure.audio.audio_source import AudioSource, SoundDeviceSource
+from infrastructure.audio.dsp import AudioFrontEnd, SAMPLERATE_MODELO
+import math
+import threading
+import numpy as np
+import vosk
+
+DEFAULT_MODEL_PATH = "models/vosk/vosk-model-small-es-0.42"
+DESCARTAR_ANTIGUOS = "drop_oldest"
+DESCARTAR_NUEVOS = "drop_newest"
+
+def cargar_modelo_vosk(model_path=DEFAULT_MODEL_PATH):
+    """
+    @function cargar_modelo_vosk
+    @description Carga un modelo VOSK; pensado para cargarse una vez y compartirse.
+    """
+    try:
+        return vosk.Model(model_path)
+    except Exception as e:
+        raise RuntimeError(f"Error cargando modelo VOSK compartido: {e}")
+
+class AudioRingBuffer:
+    """
+    @class AudioRingBuffer
+    @description Buffer circular de bloques de audio con un único escritor y
+                 múltiples lectores. El almacenamiento es una matriz int16
+                 reservada al crearlo (una fila por bloque), así que escribir no
+                 reserva memoria. Cada bloque recibe un número de secuencia
+                 creciente; los lectores avanzan por secuencia y, si se quedan
+                 atrás más allá de la capacidad, saltan al bloque más antiguo
+                 que sigue disponible.
+    """
+    def __init__(self, capacity: int, block_samples: int):
+        """
+        @param {int} capacity - Número de bloques que conserva.
+        @param {int} block_samples - Muestras máximas por bloque.
+        """
+        if capacity <= 0 or block_samples <= 0:
+            raise ValueError("La capacidad del buffer circular debe ser positiva.")
+        self.capacity = capacity
+        self.block_samples = block_samples
+        self._datos = np.zeros((capacity, block_samples), dtype=np.int16)
+        self._longitudes = np.zeros(capacity, dtype=np.int32)
+        self._write_seq = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.truncados = 0
+
+    @property
+    def write_seq(self) -> int:
+        """Secuencia que recibirá el próximo bloque escrito."""
+        return self._write_seq
+
+    @property
+    def oldest_seq(self) -> int:
+        """Secuencia del bloque más antiguo todavía disponible."""
+        return max(0, self._write_seq - self.capacity)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def write(self, data: bytes):
+        muestras = np.frombuffer(data, dtype=np.int16)
+        n = min(len(muestras), self.block_samples)
+        with self._cond:
+            if n < len(muestras):
+                self.truncados += 1
+            slot = self._write_seq % self.capacity
+            self._datos[slot, :n] = muestras[:n]
+            self._longitudes[slot] = n
+            self._write_seq += 1
+            self._cond.notify_all()
+
+    def read(self, seq: int, timeout: float | None = None) -> tuple[int, bytes | None]:
+        """
+        @param {int} seq - Secuencia del bloque solicitado.
+        @param {float | None} timeout - Tiempo máximo de espera en segundos.
+        @returns {tuple[int, bytes | None]} - La secuencia realmente leída y una copia
+                 de sus datos, o (seq, None) si se agotó la espera o el buffer se cerró.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: seq < self._write_seq or self._closed, timeout):
+                return seq, None
+            if seq >= self._write_seq:
+                return seq, None
+            # El lector se quedó atrás y el bloque ya fue sobrescrito.
+            seq = max(seq, self.oldest_seq)
+            slot = seq % self.capacity
+            return seq, self._datos[slot, :self._longitudes[slot]].tobytes()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
+
+class AudioReader:
+    """
+    @class AudioReader
+    @description Cursor de lectura independiente sobre un AudioRingBuffer. Su cola
+                 pendiente (bloques escritos aún no leídos) se puede acotar con
+                 'max_retraso'; al desbordarse aplica la política indicada:
+                 - DESCARTAR_ANTIGUOS: salta hacia delante y conserva lo más reciente.
+                 - DESCARTAR_NUEVOS: consume los 'max_retraso' bloques que ya tenía
+                   pendientes y descarta lo que llegó mientras la cola estaba llena.
+    """
+    def __init__(self, ring: AudioRingBuffer, start_seq: int, max_retraso: int | None = None,
+                 politica=DESCARTAR_ANTIGUOS):
+        """
+        @param {AudioRingBuffer} ring - Buffer del que se lee.
+        @param {int} start_seq - Secuencia inicial.
+        @param {int | None} max_retraso - Bloques pendientes máximos (None: la capacidad del buffer).
+        @param {str} politica - DESCARTAR_ANTIGUOS o DESCARTAR_NUEVOS.
+        """
+        if politica not in (DESCARTAR_ANTIGUOS, DESCARTAR_NUEVOS):
+            raise ValueError(f"Política de desbordamiento desconocida: {politica}")
+        self._ring = ring
+        self.position = max(start_seq, ring.oldest_seq)
+        self.max_retraso = max_retraso
+        self.politica = politica
+        self._fin_ventana = None
+        self.overruns = 0      # Bloques perdidos por desbordamiento.
+        self.underruns = 0     # Lecturas que agotaron la espera sin audio.
+        self.descartados = 0   # Bloques descartados a propósito (seek_to_live).
+
+    def _aplicar_politica(self):
+        """Método privado: acota la cola pendiente según la política."""
+        if self.max_retraso is None:
+            return
+        write_seq = self._ring.write_seq
+        retraso = write_seq - self.position
+        if self.politica == DESCARTAR_ANTIGUOS:
+            if retraso > self.max_retraso:
+                self.overruns += retraso - self.max_retraso
+                self.position = write_seq - self.max_retraso
+        elif self._fin_ventana is None:
+            if retraso > self.max_retraso:
+                self._fin_ventana = self.position + self.max_retraso
+        elif self.position >= self._fin_ventana:
+            self.overruns += write_seq - self.position
+            self.position = write_seq
+            self._fin_ventana = None
+
+    def read(self, timeout: float | None = None) -> bytes | None:
+        """
+        @param {float | None} timeout - Tiempo máximo de espera en segundos.
+        @returns {bytes | None} - El siguiente bloque de audio o None si no llegó a tiempo.
+        """
+        self._aplicar_politica()
+        seq, data = self._ring.read(self.position, timeout)
+        if data is None:
+            if not self._ring.closed:
+                self.underruns += 1
+            return None
+        if seq > self.position:
+            self.overruns += seq - self.position
+        self.position = seq + 1
+        return data
+
+    def seek_to_live(self):
+        """Descarta el audio pendiente y continúa desde el bloque más reciente."""
+        self.seek(self._ring.write_seq)
+
+    def seek(self, seq: int):
+        """Descarta el audio pendiente anterior a 'seq' y continúa desde ahí."""
+        self.descartados += max(0, seq - self.position)
+        self.position = max(self.position, seq)
+        self._fin_ventana = None
+
+    def estadisticas(self) -> dict:
+        """
+        @returns {dict} - Retraso actual y contadores de overrun/underrun/descartes.
+        """
+        return {"retraso": self._ring.write_seq - self.position, "overruns": self.overruns,
+                "underruns": self.underruns, "descartados": self.descartados}
+
+
+class AudioCaptureService:
+    """
+    @class AudioCaptureService
+    @description Dueño del modelo VOSK compartido y de la única fuente de audio.
+                 La fuente se arranca una sola vez y alimenta el buffer circular
+                 del que leen todos los consumidores.
+    """
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, block_duration=0.05, buffer_seconds=10.0,
+                 source: AudioSource | None = None, samplerate_modelo=SAMPLERATE_MODELO, agc=False, model=None):
+        """
+        @param {str} model_path - Ruta del modelo VOSK compartido.
+        @param {float} block_duration - Duración de cada bloque de captura en segundos.
+               Bloques cortos reducen la latencia añadida por bloque.
+        @param {float} buffer_seconds - Audio que conserva el buffer circular.
+        @param {AudioSource | None} source - Origen del audio; por defecto, el micrófono.
+        @param {int} samplerate_modelo - Frecuencia a la que se entrega el audio a VOSK.
+        @param {bool} agc - Activa el control automático de ganancia del front-end.
+        @param {vosk.Model | None} model - Modelo ya cargado (p. ej. compartido entre sesiones).
+        """
+        print("Inicializando AudioCaptureService...")
+        self.model = model or cargar_modelo_vosk(model_path)
+
+        self.source = source or SoundDeviceSource()
+        self.front_end = AudioFrontEnd(self.source.samplerate, samplerate_modelo,
+                                       canales=self.source.canales, agc=agc)
+        # Frecuencia del audio que leen los consumidores (tras el front-end).
+        self.samplerate = samplerate_modelo
+        self.blocksize = max(1, int(self.source.samplerate * block_duration))
+        self.block_duration = self.blocksize / self.source.samplerate
+        # Margen para los bloques que el remuestreo fraccionario alarga en una muestra.
+        block_samples = math.ceil(self.block_duration * samplerate_modelo) + 2
+        self.ring = AudioRingBuffer(self.seconds_to_blocks(buffer_seconds), block_samples)
+        self._activa = False
+        self._stream_lock = threading.Lock()
+        self._mark_seq = 0
+
+    def start(self):
+        """Arranca la fuente de audio si todavía no está activa. Es idempotente."""
+        with self._stream_lock:
+            if self._activa:
+                return
+            self.ring.reopen()
+            self.source.start(self.blocksize, self._on_bloque)
+            self._activa = True
+            print("🎧 Captura de audio compartida iniciada.")
+
+    def _on_bloque(self, datos: bytes):
+        """Callback privado de la fuente: convierte el bloque y lo publica."""
+        self.ring.write(self.front_end.procesar(datos))
+
+    def stop(self):
+        """Detiene la fuente y despierta a los lectores que estén esperando."""
+        with self._stream_lock:
+            if not self._activa:
+                return
+            self.source.stop()
+            self._activa = False
+            self.ring.close()
+            print("Captura de audio compartida detenida.")
+
+    def seconds_to_blocks(self, seconds: float) -> int:
+        return math.ceil(seconds / self.block_duration)
+
+    @property
+    def mark_seq(self) -> int:
+        """Secuencia registrada en la última llamada a mark()."""
+        return self._mark_seq
+
+    def mark(self, seq: int | None = None):
+        """
+        @param {int | None} seq - Secuencia a marcar; por defecto, el bloque más reciente.
+        @description Marca una posición del buffer (p. ej. el instante del hotword).
+        """
+        self._mark_seq = self.ring.write_seq if seq is None else seq
+
+    def create_reader(self, pre_roll: float = 0.0, from_mark: bool = False, max_retraso_s: float | None = None,
+                      politica=DESCARTAR_ANTIGUOS) -> AudioReader:
+        """
+        @param {float} pre_roll - Segundos de audio previo que el lector debe incluir.
+        @param {bool} from_mark - Si es True, el pre-roll se cuenta desde la última marca
+                                  en lugar de desde el bloque más reciente.
+        @param {float | None} max_retraso_s - Audio pendiente máximo del lector.
+        @param {str} politica - Qué se descarta al superarlo.
+        @returns {AudioReader} - Un cursor de lectura independiente.
+        """
+        origin = self._mark_seq if from_mark else self.ring.write_seq
+        max_retraso = self.seconds_to_blocks(max_retraso_s) if max_retraso_s is not None else None
+        return AudioReader(self.ring, origin - self.seconds_to_blocks(pre_roll), max_retraso, politica)
@@ -0,0 +1,185 @@
+"""
+@fileoverview Fuentes de audio intercambiables para el servicio de captura.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Separa el origen de los bloques de audio del buffer circular que los
+             reparte. En producción la fuente es el micrófono (sounddevice); en
+             los benchmarks es un fichero WAV grabado que se reproduce a tiempo
+             real o a la máxima velocidad posible, de modo que el detector de
+             hotword y el STT se ejercitan con exactamente el mismo audio.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Callable
+import queue
+import threading
+import time
+import wave
+import numpy as np
+import sounddevice as sd
+
+class AudioSource(ABC):
+    """
+    @class AudioSource
+    @description Productor de bloques PCM int16 entrelazados. 'samplerate' y
+                 'canales' deben estar disponibles antes de llamar a 'start'.
+    """
+    samplerate: int
+    canales: int = 1
+
+    @abstractmethod
+    def start(self, blocksize: int, callback: Callable[[bytes], None]):
+        """
+        @param {int} blocksize - Muestras por canal en cada bloque.
+        @param {Callable[[bytes], None]} callback - Recibe cada bloque capturado.
+        """
+        pass
+
+    @abstractmethod
+    def stop(self):
+        pass
+
+
+class SoundDeviceSource(AudioSource):
+    """
+    @class SoundDeviceSource
+    @description Micrófono del sistema a través de un RawInputStream de sounddevice.
+    """
+    def __init__(self, device=None, canales=1):
+        self.device = device
+        self.canales = canales
+        self.device_info = sd.query_devices(device, kind='input')
+        self.samplerate = int(self.device_info['default_samplerate'])
+        self._stream = None
+
+    def start(self, blocksize: int, callback: Callable[[bytes], None]):
+        def _audio_callback(indata, frames, time, status):
+            if status:
+                print(f"Status del stream (captura): {status}")
+            callback(bytes(indata))
+
+        self._stream = sd.RawInputStream(samplerate=self.samplerate, blocksize=blocksize,
+                                         device=self.device, dtype='int16', channels=self.canales,
+                                         callback=_audio_callback)
+        self._stream.start()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class WavFileSource(AudioSource):
+    """
+    @class WavFileSource
+    @description Reproduce un WAV PCM de 16 bits como si fuera el micrófono, con su
+                 frecuencia y canales originales (el front-end los convierte). Guarda
+                 el instante en que se entregó cada bloque para poder traducir una
+                 posición del fichero (p. ej. el final de la palabra clave) a un
+                 instante de reloj comparable con los del tracer.
+    """
+    def __init__(self, ruta: str, velocidad: float | None = 1.0, silencio_final=2.0):
+        """
+        @param {str} ruta - Fichero WAV de 16 bits.
+        @param {float | None} velocidad - 1.0 es tiempo real; None entrega los bloques
+               sin esperas (el buffer circular debe poder contener todo el fichero).
+        @param {float} silencio_final - Segundos de silencio añadidos al final para que
+               el endpointing pueda cerrar el último enunciado.
+        """
+        with wave.open(ruta, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"'{ruta}' no es PCM de 16 bits.")
+            self.samplerate = wav.getframerate()
+            muestras = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+            self.canales = wav.getnchannels()
+        silencio = np.zeros(int(silencio_final * self.samplerate) * self.canales, dtype=np.int16)
+        self._muestras = np.concatenate([muestras, silencio])
+        self.duracion = len(muestras) / self.canales / self.samplerate
+        self.velocidad = velocidad
+        self.terminado = threading.Event()
+        self._instantes = []
+        self._blocksize = 1
+        self._stop_event = threading.Event()
+        self._hilo = None
+
+    def start(self, blocksize: int, callback: Callable[[bytes], None]):
+        self._blocksize = blocksize
+        self._stop_event.clear()
+        self._hilo = threading.Thread(target=self._run, args=(blocksize, callback),
+                                      name="wav-source", daemon=True)
+        self._hilo.start()
+
+    def _run(self, blocksize: int, callback: Callable[[bytes], None]):
+        """Bucle privado: entrega los bloques con un calendario absoluto para no acumular deriva."""
+        inicio = time.perf_counter()
+        for desde in range(0, len(self._muestras) // self.canales, blocksize):
+            if self._stop_event.is_set():
+                break
+            if self.velocidad:
+                espera = inicio + (desde + blocksize) / self.samplerate / self.velocidad - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+            self._instantes.append(time.perf_counter())
+            callback(self._muestras[desde * self.canales:(desde + blocksize) * self.canales].tobytes())
+        self.terminado.set()
+
+    def instante_de(self, segundos: float) -> float | None:
+        """
+        @param {float} segundos - Posición dentro del fichero.
+        @returns {float | None} - perf_counter en que se entregó el bloque que contiene
+                 esa posición, o None si todavía no se ha reproducido.
+        """
+        bloque = int(segundos * self.samplerate) // self._blocksize
+        return self._instantes[bloque] if bloque < len(self._instantes) else None
+
+    def stop(self):
+        self._stop_event.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=1.0)
+            self._hilo = None
+
+
+class PushAudioSource(AudioSource):
+    """
+    @class PushAudioSource
+    @description Fuente alimentada desde fuera (p. ej. un cliente de red). Agrupa los
+                 bytes recibidos en bloques de 'blocksize' muestras por canal. El
+                 troceado y el callback (con el front-end DSP del servicio de
+                 captura) corren en un hilo propio: 'empujar' solo encola, así que
+                 puede llamarse desde el bucle de asyncio sin retenerlo.
+    """
+    def __init__(self, samplerate: int, canales=1):
+        self.samplerate = samplerate
+        self.canales = canales
+        self._entrada = None
+
+    def start(self, blocksize: int, callback: Callable[[bytes], None]):
+        self._entrada = queue.Queue()
+        threading.Thread(target=self._run, args=(self._entrada, blocksize * self.canales * 2, callback),
+                         name="push-source", daemon=True).start()
+
+    def empujar(self, datos: bytes):
+        """@param {bytes} datos - PCM int16 entrelazado, de cualquier longitud."""
+        entrada = self._entrada
+        if entrada is not None:
+            entrada.put(datos)
+
+    @staticmethod
+    def _run(entrada: queue.Queue, bytes_bloque: int, callback: Callable[[bytes], None]):
+        pendiente = bytearray()
+        while True:
+            datos = entrada.get()
+            if datos is None:
+                return
+            pendiente += datos
+            while len(pendiente) >= bytes_bloque:
+                bloque = bytes(pendiente[:bytes_bloque])
+                del pendiente[:bytes_bloque]
+                callback(bloque)
+
+    def stop(self):
+        # Sin esperar al hilo: se llama desde el bucle de asyncio al cerrar la sesión.
+        entrada, self._entrada = self._entrada, None
+        if entrada is not None:
+            entrada.put(None)
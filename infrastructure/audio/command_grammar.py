@@ -0,0 +1,261 @@
+"""
+@fileoverview Gramática de comandos intercambiable en caliente y reconocedor en dos niveles.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Decodificar con el grafo de vocabulario abierto es caro y, para
+             comandos cortos y conocidos, menos preciso que una gramática cerrada
+             (como la que ya usa el detector de hotword). CommandGrammar reúne las
+             frases de varios orígenes (intenciones, contactos, dispositivos...)
+             y las compila en la gramática JSON de KaldiRecognizer; al cambiar
+             un origen se reconstruye sin recargar el modelo y los reconocedores
+             la adoptan con SetGrammar en su siguiente uso.
+             TwoTierRecognizer decodifica primero con la gramática y comprueba
+             la confianza por palabra frente al modelo completo, que corre en
+             paralelo o solo como respaldo; gana el nivel que sea fiable.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Iterable
+import vosk
+
+PARALELO = "paralelo"
+RESPALDO = "respaldo"
+GRAMATICA = "gramatica"
+COMPLETO = "completo"
+
+class CommandGrammar:
+    """
+    @class CommandGrammar
+    @description Frases por origen, gramática compilada con versión y reconocedores
+                 reutilizables que se actualizan al cambiar la versión.
+    """
+    def __init__(self, prefijo: str | None = "jarvis"):
+        """
+        @param {str | None} prefijo - Palabra clave que puede preceder al comando (el STT
+               lee con pre-roll desde el hotword, así que suele estar en el audio).
+        """
+        self.prefijo = prefijo
+        self._origenes = {}
+        self._lock = threading.Lock()
+        self._libres = []
+        self._versiones = {}
+        self.version = 0
+        self.json = '["[unk]"]'
+        self.stats = {"frases": 0, "reconstrucciones": 0, "actualizados": 0}
+        # Recibe las frases por origen tras cada cambio (p. ej. para reenviarlas a otro proceso).
+        self.on_cambio = None
+
+    def registrar(self, origen: str, frases: Iterable[str]):
+        """
+        @param {str} origen - Nombre del grupo de frases ('intenciones', 'contactos'...).
+        @param {Iterable[str]} frases - Frases del grupo; sustituyen a las anteriores del origen.
+        """
+        frases = [" ".join(re.sub(r"[^\w\s]", " ", frase.lower()).split()) for frase in frases]
+        with self._lock:
+            self._origenes[origen] = [frase for frase in frases if frase]
+            self._compilar()
+        if self.on_cambio:
+            self.on_cambio(self.origenes())
+
+    def quitar(self, origen: str):
+        with self._lock:
+            if self._origenes.pop(origen, None) is None:
+                return
+            self._compilar()
+        if self.on_cambio:
+            self.on_cambio(self.origenes())
+
+    def origenes(self) -> dict[str, list[str]]:
+        with self._lock:
+            return {origen: list(frases) for origen, frases in self._origenes.items()}
+
+    def _compilar(self):
+        """
+        El modelo de lenguaje que VOSK construye con la gramática es de bigramas:
+        basta con que cada par de palabras consecutivas aparezca en alguna frase,
+        así que se descartan las que no aportan pares nuevos (con huecos numéricos
+        la expansión completa tendría miles de frases).
+        """
+        vistos, frases = set(), []
+        for frase in (f for grupo in self._origenes.values() for f in grupo):
+            palabras = frase.split()
+            for variante in ([palabras, [self.prefijo] + palabras] if self.prefijo else [palabras]):
+                pares = set(zip(["<s>"] + variante, variante + ["</s>"]))
+                if not pares <= vistos:
+                    vistos |= pares
+                    frases.append(" ".join(variante))
+        self.json = json.dumps(frases + ["[unk]"], ensure_ascii=False)
+        self.version += 1
+        self.stats["frases"] = len(frases)
+        self.stats["reconstrucciones"] += 1
+
+    def cargar_archivo(self, ruta: str):
+        """
+        @param {str} ruta - JSON con un objeto origen → lista de frases, p. ej.
+               {"contactos": ["llama a marta"], "dispositivos": ["enciende la lámpara"]}.
+        """
+        with open(ruta, encoding="utf-8") as f:
+            for origen, frases in json.load(f).items():
+                self.registrar(origen, frases)
+
+    def vigilar(self, ruta: str, intervalo=5.0):
+        """
+        @description Carga el archivo y lo vuelve a cargar en segundo plano cada vez
+                     que cambia, de modo que la gramática se edita sin reiniciar.
+        """
+        def _bucle():
+            modificado = None
+            while True:
+                try:
+                    actual = os.path.getmtime(ruta)
+                    if actual != modificado:
+                        self.cargar_archivo(ruta)
+                        if modificado is not None:
+                            print(f"🔁 Gramática de comandos recargada ({self.stats['frases']} frases).")
+                        modificado = actual
+                except (OSError, ValueError) as e:
+                    print(f"Error cargando la gramática '{ruta}': {e}")
+                time.sleep(intervalo)
+        threading.Thread(target=_bucle, name="gramatica-vigilante", daemon=True).start()
+
+    def adquirir(self, model, samplerate: int):
+        """
+        @returns {vosk.KaldiRecognizer} - Un reconocedor con la gramática vigente y confianza por palabra.
+        """
+        with self._lock:
+            gramatica, version = self.json, self.version
+            for i, (sr, recognizer) in enumerate(self._libres):
+                if sr == samplerate:
+                    del self._libres[i]
+                    break
+            else:
+                recognizer = None
+        if recognizer is None:
+            recognizer = vosk.KaldiRecognizer(model, samplerate, gramatica)
+            recognizer.SetWords(True)
+        elif self._versiones.get(id(recognizer)) != version:
+            # Cambio en caliente: se recompila el grafo de la gramática, no el modelo.
+            recognizer.SetGrammar(gramatica)
+            with self._lock:
+                self.stats["actualizados"] += 1
+        with self._lock:
+            self._versiones[id(recognizer)] = version
+        return recognizer
+
+    def liberar(self, recognizer, samplerate: int):
+        recognizer.Reset()
+        with self._lock:
+            self._libres.append((samplerate, recognizer))
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {**self.stats, "version": self.version, "origenes": {o: len(f) for o, f in self._origenes.items()}}
+
+
+class TwoTierRecognizer:
+    """
+    @class TwoTierRecognizer
+    @description Expone la interfaz de KaldiRecognizer que usa el STT
+                 (AcceptWaveform, Result, FinalResult, PartialResult, Reset).
+                 Los finales de enunciado los marca el reconocedor de la gramática.
+    """
+    def __init__(self, gramatical, completo, conf_minima=0.85, modo=PARALELO):
+        """
+        @param {vosk.KaldiRecognizer} gramatical - Reconocedor con la gramática de comandos.
+        @param {vosk.KaldiRecognizer} completo - Reconocedor de vocabulario abierto.
+        @param {float} conf_minima - Confianza mínima de cada palabra de la gramática.
+        @param {str} modo - PARALELO (ambos decodifican siempre; el respaldo no añade
+               latencia) o RESPALDO (el completo solo decodifica, desde el audio
+               guardado, cuando la gramática no es fiable; ahorra CPU).
+        """
+        self.gramatical = gramatical
+        self.completo = completo
+        self.conf_minima = conf_minima
+        self.modo = modo
+        self.completo.SetWords(True)
+        self._audio = []
+        self._segmentos = []
+        self._resultado = '{"text": ""}'
+        self.nivel = None
+        self.cpu = {GRAMATICA: 0.0, COMPLETO: 0.0}
+        self.niveles = {GRAMATICA: 0, COMPLETO: 0}
+
+    def _alimentar(self, recognizer, nivel: str, data: bytes) -> bool:
+        inicio = time.thread_time()
+        fin = recognizer.AcceptWaveform(data)
+        self.cpu[nivel] += time.thread_time() - inicio
+        return fin
+
+    def AcceptWaveform(self, data: bytes) -> bool:
+        if self.modo == PARALELO:
+            if self._alimentar(self.completo, COMPLETO, data):
+                # El completo puede cerrar un segmento antes que la gramática.
+                self._segmentos.append(json.loads(self.completo.Result()))
+        else:
+            self._audio.append(data)
+        if not self._alimentar(self.gramatical, GRAMATICA, data):
+            return False
+        self._resultado = self._decidir(self.gramatical.Result())
+        return True
+
+    def Result(self) -> str:
+        return self._resultado
+
+    def FinalResult(self) -> str:
+        return self._decidir(self.gramatical.FinalResult())
+
+    def PartialResult(self) -> str:
+        return (self.completo if self.modo == PARALELO else self.gramatical).PartialResult()
+
+    def Reset(self):
+        self.gramatical.Reset()
+        self.completo.Reset()
+        self._audio = []
+        self._segmentos = []
+
+    @staticmethod
+    def _confianza(resultado: dict) -> float:
+        """Confianza mínima por palabra; 0 si no hay palabras o alguna está fuera de la gramática."""
+        palabras = resultado.get("result", [])
+        if not palabras or any(p.get("word") == "[unk]" for p in palabras):
+            return 0.0
+        return min(p.get("conf", 0.0) for p in palabras)
+
+    def _resultado_completo(self) -> dict:
+        """Cierra el enunciado en el reconocedor completo y une sus segmentos."""
+        if self.modo == RESPALDO:
+            for data in self._audio:
+                if self._alimentar(self.completo, COMPLETO, data):
+                    self._segmentos.append(json.loads(self.completo.Result()))
+        inicio = time.thread_time()
+        self._segmentos.append(json.loads(self.completo.FinalResult()))
+        self.cpu[COMPLETO] += time.thread_time() - inicio
+        segmentos, self._segmentos = self._segmentos, []
+        return {"text": " ".join(s.get("text", "") for s in segmentos if s.get("text")),
+                "result": [p for s in segmentos for p in s.get("result", [])]}
+
+    def _decidir(self, resultado_gramatica: str) -> str:
+        gramatica = json.loads(resultado_gramatica)
+        conf_gramatica = self._confianza(gramatica)
+        if self.modo == RESPALDO and conf_gramatica >= self.conf_minima:
+            completo = None
+        else:
+            completo = self._resultado_completo()
+        self._audio = []
+
+        # La gramática gana si es fiable y el modelo completo no está más seguro de otra cosa.
+        if conf_gramatica >= self.conf_minima and (
+                completo is None or completo["text"] == gramatica.get("text")
+                or self._confianza(completo) <= conf_gramatica):
+            self.nivel = GRAMATICA
+            elegido = gramatica
+        else:
+            self.nivel = COMPLETO
+            elegido = completo
+        if elegido.get("text"):
+            self.niveles[self.nivel] += 1
+        return json.dumps({"text": elegido.get("text", ""), "nivel": self.nivel}, ensure_ascii=False)
@@ -0,0 +1,179 @@
+"""
+@fileoverview Front-end de audio previo a Kaldi: mezcla, remuestreo, DC, AGC y puerta.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Los modelos VOSK trabajan a 16 kHz, pero los micrófonos suelen
+             entregar 44.1 o 48 kHz. AudioFrontEnd convierte cada bloque una sola
+             vez en la captura (mezcla a mono, filtro anti-aliasing y remuestreo,
+             eliminación de DC y control de ganancia opcional), de modo que todos
+             los reconocedores reciben un tercio de las muestras. EnergyGate deja
+             pasar al reconocedor solo los bloques con voz, más un pre-roll y una
+             cola de "hangover", para no ejecutar Kaldi sobre el silencio.
+             Todo el procesado está vectorizado con NumPy.
+"""
+
+from collections import deque
+import numpy as np
+from infrastructure.audio.vad import EnergyVAD
+
+SAMPLERATE_MODELO = 16000
+
+class AudioFrontEnd:
+    """
+    @class AudioFrontEnd
+    @description Conversión con estado de bloques PCM int16 entrelazados a PCM
+                 int16 mono a 'samplerate_salida'. El estado (historia del filtro,
+                 fase del remuestreo, DC y ganancia) se conserva entre bloques
+                 para que no aparezcan discontinuidades en las fronteras.
+    """
+    def __init__(self, samplerate_entrada: int, samplerate_salida=SAMPLERATE_MODELO, canales=1,
+                 quitar_dc=True, agc=False, nivel_objetivo_db=-20.0, ganancia_max=8.0, taps=48):
+        """
+        @param {int} samplerate_entrada - Frecuencia del dispositivo o fichero.
+        @param {int} samplerate_salida - Frecuencia que espera el modelo.
+        @param {int} canales - Canales entrelazados de la entrada.
+        @param {bool} quitar_dc - Resta la componente continua estimada.
+        @param {bool} agc - Normaliza la ganancia hacia 'nivel_objetivo_db'.
+        @param {float} ganancia_max - Amplificación máxima del AGC.
+        @param {int} taps - Longitud del filtro anti-aliasing.
+        """
+        self.samplerate_entrada = samplerate_entrada
+        self.samplerate_salida = samplerate_salida
+        self.canales = canales
+        self.quitar_dc = quitar_dc
+        self.agc = agc
+        self.rms_objetivo = 10 ** (nivel_objetivo_db / 20.0)
+        self.ganancia_max = ganancia_max
+        self.ganancia = 1.0
+        self._dc = 0.0
+
+        self._paso = samplerate_entrada / samplerate_salida
+        self._remuestrear = samplerate_entrada != samplerate_salida
+        if self._remuestrear:
+            # Sinc enventanada con corte al 90 % del Nyquist más bajo.
+            corte = 0.9 * min(samplerate_entrada, samplerate_salida) / 2 / samplerate_entrada
+            n = np.arange(taps) - (taps - 1) / 2
+            filtro = 2 * corte * np.sinc(2 * corte * n) * np.hamming(taps)
+            self._filtro = (filtro / filtro.sum()).astype(np.float32)
+            self._historia = np.zeros(taps - 1, dtype=np.float32)
+            self._ultimo = np.float32(0.0)
+            self._posicion = 1.0
+
+    def procesar(self, datos: bytes) -> bytes:
+        """
+        @param {bytes} datos - Bloque PCM int16 con 'canales' canales entrelazados.
+        @returns {bytes} - Bloque PCM int16 mono a 'samplerate_salida'.
+        """
+        x = np.frombuffer(datos, dtype=np.int16).astype(np.float32)
+        if self.canales > 1:
+            x = x.reshape(-1, self.canales).mean(axis=1)
+        x *= 1.0 / 32768.0
+        if self.quitar_dc and len(x):
+            self._dc = 0.98 * self._dc + 0.02 * float(x.mean())
+            x -= self._dc
+        if self._remuestrear:
+            x = self._remuestreo(x)
+        if self.agc and len(x):
+            x = self._control_ganancia(x)
+        return (np.clip(x, -1.0, 32767 / 32768) * 32768.0).astype(np.int16).tobytes()
+
+    def _remuestreo(self, x: np.ndarray) -> np.ndarray:
+        """Método privado: filtro FIR con historia e interpolación lineal a posiciones fraccionarias."""
+        extendida = np.concatenate([self._historia, x])
+        self._historia = extendida[len(extendida) - len(self._historia):]
+        filtrada = np.convolve(extendida, self._filtro, mode="valid")
+        # 'y[0]' es la última muestra filtrada del bloque anterior.
+        y = np.concatenate([[self._ultimo], filtrada])
+        ultimo_indice = len(y) - 1
+        if self._posicion > ultimo_indice:
+            self._posicion -= ultimo_indice
+            self._ultimo = y[-1]
+            return np.zeros(0, dtype=np.float32)
+        n = int((ultimo_indice - self._posicion) // self._paso) + 1
+        posiciones = self._posicion + self._paso * np.arange(n)
+        indices = posiciones.astype(np.int64)
+        fraccion = (posiciones - indices).astype(np.float32)
+        salida = y[indices] * (1.0 - fraccion) + y[np.minimum(indices + 1, ultimo_indice)] * fraccion
+        self._posicion += self._paso * n - ultimo_indice
+        self._ultimo = y[-1]
+        return salida.astype(np.float32)
+
+    def _control_ganancia(self, x: np.ndarray) -> np.ndarray:
+        """Método privado: AGC lento que solo se adapta con señal por encima del ruido."""
+        rms = float(np.sqrt(np.mean(x * x)))
+        if rms > self.rms_objetivo / self.ganancia_max:
+            objetivo = min(self.ganancia_max, self.rms_objetivo / rms)
+            # Se reduce deprisa (evita saturar) y se amplifica despacio.
+            coef = 0.5 if objetivo < self.ganancia else 0.05
+            self.ganancia += coef * (objetivo - self.ganancia)
+        return x * self.ganancia
+
+
+class EnergyGate:
+    """
+    @class EnergyGate
+    @description Puerta de energía delante del reconocedor. Cuando se abre entrega
+                 también los últimos bloques de silencio (pre-roll) para no cortar
+                 el ataque de la palabra, y tras la última voz sigue abierta
+                 'hangover_s' para que Kaldi vea el silencio que cierra el enunciado.
+    """
+    def __init__(self, vad: EnergyVAD, hangover_s=0.6, pre_roll_s=0.15):
+        """
+        @param {EnergyVAD} vad - Clasificador voz/silencio por bloque.
+        @param {float} hangover_s - Silencio que se sigue entregando tras la voz.
+        @param {float} pre_roll_s - Silencio previo que se entrega al abrirse.
+        """
+        self.vad = vad
+        self.hangover_s = hangover_s
+        self.pre_roll_s = pre_roll_s
+        self._previos = deque()
+        self._previos_s = 0.0
+        self._silencio = hangover_s
+        self.bloques = 0
+        self.bloques_pasados = 0
+
+    @property
+    def abierta(self) -> bool:
+        return self._silencio < self.hangover_s
+
+    def filtrar(self, datos: bytes, es_voz: bool | None = None) -> list[bytes]:
+        """
+        @param {bytes} datos - Bloque PCM int16 mono.
+        @param {bool | None} es_voz - Decisión ya calculada; si es None la calcula el VAD.
+        @returns {list[bytes]} - Bloques que deben llegar al reconocedor (vacía si está cerrada).
+        """
+        if es_voz is None:
+            es_voz = self.vad.es_voz(datos)
+        duracion = self._duracion(datos)
+        self.bloques += 1
+        if es_voz:
+            salida = list(self._previos) + [datos] if not self.abierta else [datos]
+            self._previos.clear()
+            self._previos_s = 0.0
+            self._silencio = 0.0
+        elif self.abierta:
+            self._silencio += duracion
+            salida = [datos]
+        else:
+            self._previos.append(datos)
+            self._previos_s += duracion
+            while self._previos_s > self.pre_roll_s and len(self._previos) > 1:
+                self._previos_s -= self._duracion(self._previos.popleft())
+            return []
+        self.bloques_pasados += len(salida)
+        return salida
+
+    def _duracion(self, datos: bytes) -> float:
+        return len(datos) / 2 / self.vad.samplerate
+
+    def reset(self):
+        """Cierra la puerta y olvida el pre-roll (p. ej. tras un salto en el audio)."""
+        self._previos.clear()
+        self._previos_s = 0.0
+        self._silencio = self.hangover_s
+
+    def fraccion_pasada(self) -> float:
+        """
+        @returns {float} - Proporción de bloques entregados al reconocedor.
+        """
+        return self.bloques_pasados / self.bloques if self.bloques else 0.0
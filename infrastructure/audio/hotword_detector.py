@@ -3,61 +3,117 @@
 @author Danilo Castillejo (DJ111980)
 @version 1.0.0
 @description Esta clase implementa la interfaz IHotwordDetector, utilizando la
-             librería VOSK para una detección 100% local y offline.
+             librería VOSK para una detección 100% local y offline. Una puerta
+             de energía evita ejecutar el reconocedor mientras hay silencio.
 """
 
 from domain.services import IHotwordDetector
+from infrastructure.audio.audio_capture import AudioCaptureService, DESCARTAR_ANTIGUOS
+from infrastructure.audio.dsp import EnergyGate
+from infrastructure.audio.vad import EnergyVAD
 import vosk
-import sounddevice as sd
-import queue
+import json
 import threading
 
 class VoskHotwordDetector(IHotwordDetector):
     """
     @class VoskHotwordDetector
-    @description Implementa IHotwordDetector usando el motor de VOSK.
+    @description Implementa IHotwordDetector usando el motor de VOSK. Lee el audio
+                 del servicio de captura compartido en lugar de abrir su propio stream.
+                 En pausa no consume audio, y al reanudarse descarta lo acumulado
+                 (p. ej. la propia voz del asistente) y empieza desde el presente.
     """
-    def __init__(self, on_hotword_callback=None, keyword="jarvis"):
+    def __init__(self, capture_service: AudioCaptureService, on_hotword_callback=None, keyword="jarvis",
+                 conf_minima_eco=0.9, puerta=True, hangover_s=0.6, max_retraso_s: float | None = 1.0,
+                 politica=DESCARTAR_ANTIGUOS, recognizer_pool=None):
+        """
+        @param {AudioCaptureService} capture_service - Servicio de captura compartido.
+        @param {Callable | None} on_hotword_callback - Función llamada al detectar la palabra.
+        @param {str} keyword - Palabra clave.
+        @param {float} conf_minima_eco - Confianza mínima exigida mientras el asistente habla.
+        @param {bool} puerta - Solo entrega al reconocedor los bloques con voz.
+        @param {float} hangover_s - Silencio entregado tras la voz para cerrar el resultado.
+        @param {float | None} max_retraso_s - Audio pendiente máximo si el detector se retrasa.
+        @param {str} politica - Política de desbordamiento del lector.
+        @param {RecognizerPool | None} recognizer_pool - Pool con la gramática del hotword.
+        """
         print("Inicializando VoskHotwordDetector...")
         self.on_hotword_callback = on_hotword_callback
         self.keyword = keyword.lower()
-
-        try:
-            self.model = vosk.Model("models/vosk/vosk-model-small-es-0.42")
-        except Exception as e:
-            raise RuntimeError(f"Error cargando modelo VOSK para hotword: {e}")
-
-        self.device_info = sd.query_devices(kind='input')
-        self.samplerate = int(self.device_info['default_samplerate'])
-        self.q = queue.Queue()
+        self.capture = capture_service
+        self.model = capture_service.model
+        self.samplerate = capture_service.samplerate
         self._is_paused = threading.Event()
         self._is_paused.set()
         self._stop_event = threading.Event()
-
-    def _audio_callback(self, indata, frames, time, status):
-        """Callback privado para manejar los datos del stream de audio."""
-        if status:
-            print(f"Status del stream (hotword): {status}")
-        self.q.put(bytes(indata))
+        self.conf_minima_eco = conf_minima_eco
+        self._supresion_eco = False
+        self.gate = EnergyGate(EnergyVAD(self.samplerate), hangover_s=hangover_s) if puerta else None
+        self.max_retraso_s = max_retraso_s
+        self.politica = politica
+        self._descartar_pendiente = threading.Event()
+        self._reader = None
+        self.recognizer_pool = recognizer_pool
 
     def start(self):
         print(f"👂 Escuchando pasivamente por la palabra clave '{self.keyword}'...")
+        recognizer = None
         try:
-            with sd.RawInputStream(samplerate=self.samplerate, blocksize=8000,
-                                   device=None, dtype='int16', channels=1,
-                                   callback=self._audio_callback):
+            self.capture.start()
+            reader = self._reader = self.capture.create_reader(max_retraso_s=self.max_retraso_s,
+                                                               politica=self.politica)
+            if self.recognizer_pool:
+                recognizer = self.recognizer_pool.adquirir()
+            else:
                 recognizer = vosk.KaldiRecognizer(self.model, self.samplerate, f'["{self.keyword}", "[unk]"]')
-                while not self._stop_event.is_set():
-                    self._is_paused.wait()
-                    data = self.q.get()
-                    if recognizer.AcceptWaveform(data):
-                        result = recognizer.Result()
-                        if f'"{self.keyword}"' in result:
-                            print(f"✅ ¡Palabra clave '{self.keyword}' detectada!")
-                            if self.on_hotword_callback:
-                                self.on_hotword_callback()
+                recognizer.SetWords(True)
+            while not self._stop_event.is_set():
+                self._is_paused.wait()
+                if self._descartar_pendiente.is_set():
+                    # El audio acumulado durante la pausa ya no es relevante.
+                    self._descartar_pendiente.clear()
+                    reader.seek_to_live()
+                    recognizer.Reset()
+                    if self.gate:
+                        self.gate.reset()
+                data = reader.read(timeout=0.5)
+                if data is None:
+                    if self.capture.ring.closed:
+                        break
+                    continue
+                bloques = self.gate.filtrar(data) if self.gate else (data,)
+                for bloque in bloques:
+                    if not recognizer.AcceptWaveform(bloque):
+                        continue
+                    result = recognizer.Result()
+                    if f'"{self.keyword}"' in result and self._supera_supresion_eco(result):
+                        print(f"✅ ¡Palabra clave '{self.keyword}' detectada!")
+                        # Se marca la posición del audio ya reconocido (no la del
+                        # último bloque capturado) para que el STT pueda leer con
+                        # pre-roll lo dicho justo después, aunque el detector vaya
+                        # por detrás de la captura.
+                        self.capture.mark(reader.position)
+                        if self.on_hotword_callback:
+                            self.on_hotword_callback()
         except Exception as e:
             print(f"Error en el bucle de detección de hotword: {e}")
+        finally:
+            if self.recognizer_pool and recognizer is not None:
+                self.recognizer_pool.liberar(recognizer)
+
+    def _supera_supresion_eco(self, result: str) -> bool:
+        """
+        Método privado: mientras el asistente habla, su propia voz llega al
+        micrófono, así que solo se acepta la palabra clave con confianza alta.
+        """
+        if not self._supresion_eco:
+            return True
+        palabras = json.loads(result).get("result", [])
+        return any(p.get("word") == self.keyword and p.get("conf", 0.0) >= self.conf_minima_eco
+                   for p in palabras)
+
+    def set_supresion_eco(self, activa: bool):
+        self._supresion_eco = activa
 
     def pause(self):
         print("⏸️  Detector de palabra clave pausado.")
@@ -65,8 +121,19 @@ class VoskHotwordDetector(IHotwordDetector):
 
     def resume(self):
         print("▶️  Detector de palabra clave reanudado.")
+        self._descartar_pendiente.set()
         self._is_paused.set()
 
+    def estadisticas(self) -> dict:
+        """
+        @returns {dict} - Contadores del lector y fracción de bloques que pasa la puerta.
+        """
+        stats = self._reader.estadisticas() if self._reader else {}
+        if self.gate:
+            stats["fraccion_puerta"] = self.gate.fraccion_pasada()
+        return stats
+
     def stop(self):
         print("Deteniendo detector de palabra clave...")
-        self._stop_event.set()
\ No newline at end of file
+        self._stop_event.set()
+        self._is_paused.set()
@@ -0,0 +1,123 @@
+"""
+@fileoverview TTS de una sesión remota: sintetiza y envía la voz al cliente.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Implementa ITTSService para el modo servidor. Las frases se
+             renderizan con un motor compartido entre sesiones y se envían al
+             cliente como PCM; el cliente las reproduce en orden. Para que
+             'esperar' siga significando "hasta que termine de sonar", el servicio
+             lleva la cuenta del instante en que acabará la reproducción.
+"""
+
+from domain.services import ITTSService
+from typing import Callable
+import queue
+import threading
+import time
+
+class NetworkTTSService(ITTSService):
+    """
+    @class NetworkTTSService
+    @description Cola de frases por sesión con un worker que renderiza y envía.
+    """
+    def __init__(self, renderer, enviar_audio: Callable[[bytes, int], None],
+                 enviar_control: Callable[[dict], None], max_pendientes=2):
+        """
+        @param {Pyttsx3TTSService} renderer - Servicio con 'renderizar(texto)', compartido.
+        @param {Callable[[bytes, int], None]} enviar_audio - Envía PCM int16 mono y su frecuencia.
+        @param {Callable[[dict], None]} enviar_control - Envía un mensaje de control JSON.
+        @param {int} max_pendientes - Frases sin enviar a partir de las que 'encolar' espera.
+        """
+        self.renderer = renderer
+        self.enviar_audio = enviar_audio
+        self.enviar_control = enviar_control
+        self.volume = 1.0
+        self.max_pendientes = max_pendientes
+        self._cola = queue.Queue()
+        self._cond = threading.Condition()
+        self._pendientes = 0
+        self._fin_reproduccion = 0.0
+        self._generacion = 0
+        self._cancelado = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="tts-red", daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        """Bucle privado: renderiza cada frase y la envía en cuanto está lista."""
+        while True:
+            item = self._cola.get()
+            if item is None:
+                return
+            generacion, texto, origen = item
+            try:
+                if generacion == self._generacion:
+                    self._enviar(texto, origen, generacion)
+            except Exception as e:
+                print(f"Error enviando audio a la sesión: {e}")
+            finally:
+                with self._cond:
+                    self._pendientes -= 1
+                    self._cond.notify_all()
+
+    def _enviar(self, texto: str, origen: str, generacion: int):
+        audio = self.renderer.renderizar(texto)
+        if generacion != self._generacion:
+            return  # Se canceló mientras se renderizaba.
+        self.enviar_control({"texto": texto, "origen": origen})
+        if audio is None:
+            return
+        muestras, samplerate = audio
+        if muestras.ndim > 1:
+            muestras = muestras.mean(axis=1).astype(muestras.dtype)
+        self.enviar_audio(muestras.tobytes(), samplerate)
+        with self._cond:
+            inicio = max(time.perf_counter(), self._fin_reproduccion)
+            self._fin_reproduccion = inicio + len(muestras) / samplerate
+
+    def _encolar(self, texto: str, origen: str, generacion: int | None = None):
+        with self._cond:
+            self._pendientes += 1
+        self._cola.put((self._generacion if generacion is None else generacion, texto, origen))
+
+    def encolar(self, texto: str):
+        """Bloquea mientras haya 'max_pendientes' frases sin enviar; una cancelación entretanto la descarta."""
+        generacion = self._generacion
+        with self._cond:
+            while self._pendientes >= self.max_pendientes and generacion == self._generacion:
+                self._cond.wait(0.5)
+        self._encolar(texto, "respuesta", generacion)
+
+    def esperar(self):
+        with self._cond:
+            while self._pendientes > 0:
+                self._cond.wait(0.5)
+            restante = self._fin_reproduccion - time.perf_counter()
+        self._cancelado.clear()
+        if restante > 0:
+            self._cancelado.wait(restante)
+
+    def hablar(self, texto: str):
+        self._encolar(texto, "hablar")
+        self.esperar()
+
+    def hablar_frase(self, texto: str):
+        self._encolar(texto, "frase")
+        self.esperar()
+
+    def cancelar(self):
+        """Descarta lo pendiente y pide al cliente que calle."""
+        with self._cond:
+            self._generacion += 1
+            self._fin_reproduccion = 0.0
+            self._cond.notify_all()
+        self._cancelado.set()
+        self.enviar_control({"detener_audio": True})
+
+    def ajustar_volumen(self, nivel: float):
+        """El cliente aplica el volumen a su reproducción."""
+        self.volume = min(1.0, max(0.0, nivel))
+        self.enviar_control({"volumen": self.volume})
+
+    def cerrar(self):
+        self.cancelar()
+        self._cola.put(None)
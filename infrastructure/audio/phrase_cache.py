@@ -0,0 +1,112 @@
+"""
+@fileoverview Caché de audio pre-renderizado para frases fijas del asistente.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Almacena en disco y en memoria el audio ya sintetizado de frases
+             que se repiten en cada interacción ("Sí, señor?"). Las entradas se
+             direccionan por contenido: la clave es un hash del texto, la voz,
+             la velocidad y el volumen. La reproducción va directa a
+             sounddevice, sin pasar por el motor de TTS.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import wave
+import numpy as np
+import sounddevice as sd
+
+class PhraseAudioCache:
+    """
+    @class PhraseAudioCache
+    @description Caché direccionada por contenido de frases renderizadas a WAV.
+    """
+    # Compartido como el propio dispositivo de salida de sounddevice.
+    _detenido = threading.Event()
+
+    def __init__(self, directorio="cache/tts"):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self._memoria = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clave(texto: str, voz: str | None, rate: int, volumen: float) -> str:
+        """
+        @returns {str} - Hash SHA-256 que identifica el audio de esa frase con esa voz.
+        """
+        contenido = f"{texto}\x1f{voz or 'default'}\x1f{rate}\x1f{volumen:.3f}"
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    def ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.wav")
+
+    def obtener(self, clave: str) -> tuple[np.ndarray, int] | None:
+        """
+        @returns {tuple | None} - (muestras, frecuencia) desde memoria o disco, o None.
+        """
+        with self._lock:
+            if clave in self._memoria:
+                return self._memoria[clave]
+        ruta = self.ruta(clave)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            audio = self.leer_wav(ruta)
+        except (wave.Error, EOFError, ValueError) as e:
+            print(f"WAV en caché inválido, se descarta ({ruta}): {e}")
+            os.remove(ruta)
+            return None
+        with self._lock:
+            self._memoria[clave] = audio
+        return audio
+
+    @staticmethod
+    def leer_wav(ruta: str) -> tuple[np.ndarray, int]:
+        with wave.open(ruta, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError("solo se admite PCM de 16 bits")
+            canales = wav.getnchannels()
+            samplerate = wav.getframerate()
+            datos = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        if canales > 1:
+            datos = datos.reshape(-1, canales)
+        return datos, samplerate
+
+    @staticmethod
+    def envolvente(audio: tuple[np.ndarray, int], paso=0.03) -> np.ndarray:
+        """
+        @returns {np.ndarray} - Nivel RMS por ventana de 'paso' segundos, normalizado a [0, 1].
+        """
+        muestras, samplerate = audio
+        mono = muestras.mean(axis=1) if muestras.ndim > 1 else muestras.astype(np.float32)
+        ventana = max(1, int(samplerate * paso))
+        n = len(mono) // ventana
+        if n == 0:
+            return np.zeros(0, dtype=np.float32)
+        tramas = mono[:n * ventana].reshape(n, ventana) / 32768.0
+        rms = np.sqrt(np.mean(tramas * tramas, axis=1))
+        return (rms / max(float(rms.max()), 1e-6)).astype(np.float32)
+
+    @staticmethod
+    def reproducir(audio: tuple[np.ndarray, int], on_nivel=None, paso=0.03):
+        """
+        Reproduce el audio directamente por sounddevice y espera a que termine.
+        @param {Callable[[float], None] | None} on_nivel - Recibe el nivel de salida cada 'paso' segundos.
+        """
+        muestras, samplerate = audio
+        PhraseAudioCache._detenido.clear()
+        sd.play(muestras, samplerate)
+        if on_nivel:
+            inicio = time.perf_counter()
+            for i, nivel in enumerate(PhraseAudioCache.envolvente(audio, paso)):
+                if PhraseAudioCache._detenido.wait(max(0.0, inicio + i * paso - time.perf_counter())):
+                    break
+                on_nivel(float(nivel))
+        sd.wait()
+
+    @staticmethod
+    def detener():
+        PhraseAudioCache._detenido.set()
+        sd.stop()
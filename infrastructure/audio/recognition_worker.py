@@ -0,0 +1,298 @@
+"""
+@fileoverview Reconocimiento (hotword y STT) en un proceso dedicado y supervisado.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description En un solo proceso, los AcceptWaveform de Kaldi, el análisis JSON
+             de sus resultados, pyttsx3 y el pintado de Qt compiten por el GIL,
+             y la latencia de detección oscila cuando la mascota se anima o el
+             TTS habla. RecognitionWorker mueve el modelo VOSK, el detector y el
+             STT a un proceso propio: el audio capturado viaja por un
+             SharedAudioRing (sin serializar cada bloque) y por un Pipe solo
+             circulan órdenes y resultados pequeños. Si el proceso muere, se
+             relanza con espera creciente y recupera el estado (pausa, supresión
+             de eco, gramática de comandos). ProcessHotwordDetector y ProcessSTTService implementan las
+             interfaces del dominio, así que el orquestador no cambia.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from domain.services import IHotwordDetector, ISTTService, ITracer, NullTracer
+from infrastructure.audio.audio_capture import DEFAULT_MODEL_PATH
+from infrastructure.audio.audio_source import AudioSource, SoundDeviceSource
+from infrastructure.audio.command_grammar import CommandGrammar, PARALELO
+from infrastructure.audio.shared_audio import SharedAudioRing, SharedMemoryAudioSource
+
+def _proceso_reconocimiento(conexion, parametros_anillo, hay_audio, config: dict):
+    """
+    @function _proceso_reconocimiento
+    @description Punto de entrada del proceso hijo: carga el modelo, lee el audio del
+                 anillo compartido y atiende las órdenes del proceso principal.
+    """
+    # Importaciones dentro del hijo: es él quien carga VOSK.
+    from infrastructure.audio.audio_capture import AudioCaptureService
+    from infrastructure.audio.hotword_detector import VoskHotwordDetector
+    from infrastructure.audio.stt_service import VoskSTTService
+
+    lock_envio = threading.Lock()
+    def enviar(*mensaje):
+        with lock_envio:
+            conexion.send(mensaje)
+
+    anillo = SharedAudioRing.adjuntar(*parametros_anillo)
+    fuente = SharedMemoryAudioSource(anillo, hay_audio, config["samplerate"], config["canales"])
+    capture = AudioCaptureService(model_path=config["model_path"], source=fuente,
+                                  block_duration=config["block_duration"], buffer_seconds=config["buffer_seconds"],
+                                  agc=config["agc"])
+    hotword = VoskHotwordDetector(capture, keyword=config["keyword"],
+                                  on_hotword_callback=lambda: enviar("hotword", time.perf_counter()))
+    gramatica = None
+    if config["modo_gramatica"]:
+        gramatica = CommandGrammar()
+        for origen, frases in config["frases_gramatica"].items():
+            gramatica.registrar(origen, frases)
+    stt = VoskSTTService(capture, keyword=config["keyword"], gramatica=gramatica,
+                         modo_gramatica=config["modo_gramatica"] or PARALELO)
+    if config["pausado"]:
+        hotword.pause()
+    hotword.set_supresion_eco(config["supresion_eco"])
+    threading.Thread(target=hotword.start, name="hotword", daemon=True).start()
+
+    def escuchar(con_parciales: bool):
+        on_parcial = (lambda parcial: enviar("parcial", parcial)) if con_parciales else None
+        comando = stt.escuchar_comando(on_parcial=on_parcial)
+        enviar("comando", comando, stt.ultima_medicion)
+
+    enviar("listo")
+    try:
+        while True:
+            orden, *argumentos = conexion.recv()
+            if orden == "pausar":
+                hotword.pause()
+            elif orden == "reanudar":
+                hotword.resume()
+            elif orden == "supresion_eco":
+                hotword.set_supresion_eco(*argumentos)
+            elif orden == "gramatica" and gramatica:
+                origenes = argumentos[0]
+                for origen in set(gramatica.origenes()) - set(origenes):
+                    gramatica.quitar(origen)
+                for origen, frases in origenes.items():
+                    gramatica.registrar(origen, frases)
+            elif orden == "escuchar":
+                threading.Thread(target=escuchar, args=argumentos, name="stt", daemon=True).start()
+            elif orden == "detener":
+                break
+    except EOFError:
+        pass  # El proceso principal terminó.
+    finally:
+        hotword.stop()
+        capture.stop()
+
+
+class RecognitionWorker:
+    """
+    @class RecognitionWorker
+    @description Lado del proceso principal: captura el audio hacia el anillo
+                 compartido, lanza y supervisa el proceso de reconocimiento y
+                 reparte sus mensajes.
+    """
+    def __init__(self, source: AudioSource | None = None, model_path=DEFAULT_MODEL_PATH, keyword="jarvis",
+                 block_duration=0.05, buffer_seconds=10.0, agc=False, max_reinicios=5, ventana_reinicios=60.0,
+                 tracer: ITracer | None = None, gramatica: CommandGrammar | None = None, modo_gramatica=PARALELO):
+        """
+        @param {AudioSource | None} source - Origen del audio; por defecto, el micrófono.
+        @param {int} max_reinicios - Reinicios admitidos dentro de 'ventana_reinicios'
+               segundos antes de dar el reconocimiento por perdido.
+        @param {ITracer | None} tracer - Recibe las medidas del STT del proceso hijo.
+        @param {CommandGrammar | None} gramatica - Gramática de comandos del STT; sus cambios
+               se reenvían al proceso hijo, que compila su propia copia.
+        @param {str} modo_gramatica - 'paralelo' o 'respaldo' (ver TwoTierRecognizer).
+        """
+        print("Inicializando RecognitionWorker...")
+        self.source = source or SoundDeviceSource()
+        self.keyword = keyword
+        self.tracer = tracer or NullTracer()
+        self.max_reinicios = max_reinicios
+        self.ventana_reinicios = ventana_reinicios
+        self.blocksize = max(1, int(self.source.samplerate * block_duration))
+        self._config = {"model_path": model_path, "keyword": keyword, "samplerate": self.source.samplerate,
+                        "canales": self.source.canales, "block_duration": block_duration,
+                        "buffer_seconds": buffer_seconds, "agc": agc, "pausado": False, "supresion_eco": False,
+                        "modo_gramatica": modo_gramatica if gramatica else None,
+                        "frases_gramatica": gramatica.origenes() if gramatica else {}}
+        if gramatica:
+            gramatica.on_cambio = lambda origenes: self.ajustar("frases_gramatica", origenes, "gramatica", origenes)
+        capacidad = max(1, int(buffer_seconds / block_duration))
+        self.anillo = SharedAudioRing.crear(capacidad, self.blocksize * self.source.canales)
+        # 'spawn': el hijo no hereda los hilos ni el estado de Qt/pyttsx3 del padre.
+        self._ctx = multiprocessing.get_context("spawn")
+        self._hay_audio = self._ctx.Event()
+        self._proceso = None
+        self._conexion = None
+        self._lock_envio = threading.Lock()
+        self._listo = threading.Event()
+        self._detenido = threading.Event()
+        self._reinicios = []
+        self._resultados = queue.Queue()
+        self._on_parcial = None
+        self.on_hotword = None
+        self.stats = {"reinicios": 0, "hotwords": 0, "comandos": 0}
+
+    # --- Ciclo de vida -------------------------------------------------------
+
+    def iniciar(self, timeout=120.0) -> "RecognitionWorker":
+        """Arranca la captura y el proceso hijo; espera a que el modelo esté cargado."""
+        self.source.start(self.blocksize, self._on_bloque)
+        self._lanzar()
+        if not self._listo.wait(timeout):
+            raise RuntimeError("El proceso de reconocimiento no arrancó a tiempo.")
+        return self
+
+    def _on_bloque(self, datos: bytes):
+        """Callback de la fuente: una copia a memoria compartida y un aviso."""
+        self.anillo.write(datos)
+        self._hay_audio.set()
+
+    def _lanzar(self):
+        self._listo.clear()
+        padre, hijo = self._ctx.Pipe()
+        self._proceso = self._ctx.Process(target=_proceso_reconocimiento, name="jarvis-reconocimiento",
+                                          args=(hijo, self.anillo.parametros, self._hay_audio, dict(self._config)),
+                                          daemon=True)
+        self._proceso.start()
+        hijo.close()
+        self._conexion = padre
+        threading.Thread(target=self._recibir, args=(padre,), name="reconocimiento-rx", daemon=True).start()
+
+    def _recibir(self, conexion):
+        """Hilo del padre: reparte los mensajes del hijo y detecta su caída."""
+        try:
+            while True:
+                mensaje, *argumentos = conexion.recv()
+                if mensaje == "hotword":
+                    self.stats["hotwords"] += 1
+                    if self.on_hotword:
+                        self.on_hotword()
+                elif mensaje == "parcial":
+                    if self._on_parcial:
+                        self._on_parcial(*argumentos)
+                elif mensaje == "comando":
+                    self._resultados.put(tuple(argumentos))
+                elif mensaje == "listo":
+                    self._listo.set()
+        except (EOFError, OSError):
+            pass
+        conexion.close()
+        if not self._detenido.is_set():
+            self._supervisar()
+
+    def _supervisar(self):
+        """El hijo murió: se relanza con espera creciente, o se desiste si cae en bucle."""
+        self._proceso.join(timeout=1.0)
+        codigo = self._proceso.exitcode
+        print(f"💥 El proceso de reconocimiento terminó (código {codigo}).")
+        # Un comando que estuviera escuchando no llegará.
+        self._resultados.put((None, {"motivo": "reconocimiento_caido"}))
+        ahora = time.monotonic()
+        self._reinicios = [t for t in self._reinicios if ahora - t < self.ventana_reinicios] + [ahora]
+        if len(self._reinicios) > self.max_reinicios:
+            print(f"❌ {self.max_reinicios} reinicios en {self.ventana_reinicios:.0f} s; se desiste.")
+            return
+        espera = min(5.0, 0.5 * 2 ** (len(self._reinicios) - 1))
+        time.sleep(espera)
+        if self._detenido.is_set():
+            return
+        self.stats["reinicios"] += 1
+        print(f"🔁 Relanzando el proceso de reconocimiento (reinicio {self.stats['reinicios']}).")
+        self._lanzar()
+
+    def enviar(self, *mensaje):
+        with self._lock_envio:
+            try:
+                self._conexion.send(mensaje)
+            except (OSError, AttributeError):
+                pass  # El hijo está caído; el estado se reenvía al relanzarlo.
+
+    def detener(self):
+        self._detenido.set()
+        self.enviar("detener")
+        self.source.stop()
+        if self._proceso is not None:
+            self._proceso.join(timeout=3.0)
+            if self._proceso.is_alive():
+                self._proceso.kill()
+        self._resultados.put((None, {"motivo": "detenido"}))
+        self.anillo.cerrar()
+
+    # --- Estado que se conserva entre reinicios --------------------------------
+
+    def ajustar(self, clave: str, valor, orden: str, *argumentos):
+        self._config[clave] = valor
+        self.enviar(orden, *argumentos)
+
+    def escuchar_comando(self, on_parcial=None) -> str | None:
+        if not self._listo.is_set() and not self._listo.wait(timeout=10.0):
+            return None
+        while not self._resultados.empty():
+            self._resultados.get_nowait()  # Restos de una caída anterior.
+        self._on_parcial = on_parcial
+        self.enviar("escuchar", on_parcial is not None)
+        try:
+            comando, medicion = self._resultados.get()
+        finally:
+            self._on_parcial = None
+        self.stats["comandos"] += 1
+        if comando:
+            for nombre, clave in (("stt_audio_s", "duracion_s"), ("stt_rtf", "rtf"), ("stt_overruns", "overruns"),
+                                  ("endpointing_s", "endpointing_s")):
+                if clave in medicion:
+                    self.tracer.registrar(nombre, medicion[clave])
+        return comando
+
+    def estadisticas(self) -> dict:
+        vivo = self._proceso is not None and self._proceso.is_alive()
+        return {**self.stats, "vivo": vivo, "overruns_anillo": self.anillo.overruns}
+
+
+class ProcessHotwordDetector(IHotwordDetector):
+    """
+    @class ProcessHotwordDetector
+    @description IHotwordDetector cuyo detector corre en el proceso de reconocimiento.
+    """
+    def __init__(self, worker: RecognitionWorker):
+        self.worker = worker
+        self.on_hotword_callback = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        print(f"👂 Escuchando pasivamente por la palabra clave '{self.worker.keyword}' (proceso aparte)...")
+        self._stop_event.clear()
+        self.worker.on_hotword = lambda: self.on_hotword_callback and self.on_hotword_callback()
+        self._stop_event.wait()
+        self.worker.on_hotword = None
+
+    def pause(self):
+        self.worker.ajustar("pausado", True, "pausar")
+
+    def resume(self):
+        self.worker.ajustar("pausado", False, "reanudar")
+
+    def set_supresion_eco(self, activa: bool):
+        self.worker.ajustar("supresion_eco", activa, "supresion_eco", activa)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class ProcessSTTService(ISTTService):
+    """
+    @class ProcessSTTService
+    @description ISTTService cuyo reconocedor corre en el proceso de reconocimiento.
+    """
+    def __init__(self, worker: RecognitionWorker):
+        self.worker = worker
+
+    def escuchar_comando(self, on_parcial=None) -> str | None:
+        return self.worker.escuchar_comando(on_parcial)
@@ -0,0 +1,78 @@
+"""
+@fileoverview Pool de reconocedores Kaldi sobre un modelo VOSK compartido.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Un KaldiRecognizer es barato comparado con el modelo, pero crearlo en
+             cada comando sigue costando. El pool crea reconocedores bajo demanda
+             hasta un máximo y los reutiliza (con Reset) entre sesiones y turnos.
+             Su tamaño acota además cuántos reconocimientos corren a la vez.
+"""
+
+import queue
+import threading
+import vosk
+
+class RecognizerPool:
+    """
+    @class RecognizerPool
+    @description Reconocedores de una misma configuración (modelo, frecuencia, gramática).
+    """
+    def __init__(self, model, samplerate: int, tam: int, gramatica: str | None = None, palabras=False):
+        """
+        @param {vosk.Model} model - Modelo compartido.
+        @param {int} samplerate - Frecuencia del audio que recibirán.
+        @param {int} tam - Reconocedores máximos.
+        @param {str | None} gramatica - Gramática JSON restringida (p. ej. la del hotword).
+        @param {bool} palabras - Activa SetWords para obtener la confianza por palabra.
+        """
+        self.model = model
+        self.samplerate = samplerate
+        self.tam = tam
+        self.gramatica = gramatica
+        self.palabras = palabras
+        self._libres = queue.Queue()
+        self._lock = threading.Lock()
+        self.creados = 0
+        self.en_uso = 0
+        self.esperas = 0
+
+    def _crear(self):
+        if self.gramatica:
+            recognizer = vosk.KaldiRecognizer(self.model, self.samplerate, self.gramatica)
+        else:
+            recognizer = vosk.KaldiRecognizer(self.model, self.samplerate)
+        if self.palabras:
+            recognizer.SetWords(True)
+        return recognizer
+
+    def adquirir(self, timeout: float | None = None):
+        """
+        @param {float | None} timeout - Espera máxima si el pool está agotado.
+        @returns {vosk.KaldiRecognizer | None} - Un reconocedor limpio, o None si se agotó la espera.
+        """
+        with self._lock:
+            self.en_uso += 1
+            try:
+                return self._libres.get_nowait()
+            except queue.Empty:
+                if self.creados < self.tam:
+                    self.creados += 1
+                    return self._crear()
+                self.esperas += 1
+        try:
+            return self._libres.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self.en_uso -= 1
+            return None
+
+    def liberar(self, recognizer):
+        """Devuelve un reconocedor al pool tras reiniciar su estado."""
+        recognizer.Reset()
+        with self._lock:
+            self.en_uso -= 1
+        self._libres.put(recognizer)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {"tam": self.tam, "creados": self.creados, "en_uso": self.en_uso, "esperas": self.esperas}
@@ -0,0 +1,150 @@
+"""
+@fileoverview Buffer circular de audio en memoria compartida entre procesos.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Permite que el reconocimiento corra en otro proceso sin serializar
+             cada bloque: el proceso principal copia el PCM capturado en una
+             ranura de un segmento de 'multiprocessing.shared_memory' y el
+             proceso de reconocimiento lo lee directamente de ahí. Solo viaja
+             por el canal del sistema operativo un aviso de "hay audio".
+             Un único escritor y un único lector; la secuencia de escritura se
+             publica después de los datos, y el lector comprueba tras copiar
+             que la ranura no se sobrescribió mientras tanto.
+"""
+
+from multiprocessing import shared_memory
+from typing import Callable
+import threading
+import numpy as np
+from infrastructure.audio.audio_source import AudioSource
+
+class SharedAudioRing:
+    """
+    @class SharedAudioRing
+    @description Cabecera (secuencia de escritura), longitudes y una matriz int16
+                 de 'capacidad' × 'muestras_bloque', todo en un mismo segmento.
+    """
+    def __init__(self, memoria: shared_memory.SharedMemory, capacidad: int, muestras_bloque: int, propia: bool):
+        self._memoria = memoria
+        self.capacidad = capacidad
+        self.muestras_bloque = muestras_bloque
+        self._propia = propia
+        self._cabecera = np.ndarray((1,), dtype=np.int64, buffer=memoria.buf, offset=0)
+        self._longitudes = np.ndarray((capacidad,), dtype=np.int32, buffer=memoria.buf, offset=8)
+        self._datos = np.ndarray((capacidad, muestras_bloque), dtype=np.int16, buffer=memoria.buf,
+                                 offset=8 + 4 * capacidad)
+        self.truncados = 0
+        self.overruns = 0
+
+    @classmethod
+    def crear(cls, capacidad: int, muestras_bloque: int) -> "SharedAudioRing":
+        """
+        @param {int} capacidad - Bloques que conserva.
+        @param {int} muestras_bloque - Muestras (todos los canales) por bloque.
+        """
+        if capacidad <= 0 or muestras_bloque <= 0:
+            raise ValueError("La capacidad del buffer compartido debe ser positiva.")
+        memoria = shared_memory.SharedMemory(create=True, size=8 + capacidad * (4 + 2 * muestras_bloque))
+        anillo = cls(memoria, capacidad, muestras_bloque, propia=True)
+        anillo._cabecera[0] = 0
+        return anillo
+
+    @classmethod
+    def adjuntar(cls, nombre: str, capacidad: int, muestras_bloque: int) -> "SharedAudioRing":
+        """Abre desde otro proceso un anillo creado con 'crear'."""
+        return cls(shared_memory.SharedMemory(name=nombre), capacidad, muestras_bloque, propia=False)
+
+    @property
+    def parametros(self) -> tuple[str, int, int]:
+        """Lo que otro proceso necesita para 'adjuntar' (nombre, capacidad, muestras por bloque)."""
+        return self._memoria.name, self.capacidad, self.muestras_bloque
+
+    @property
+    def write_seq(self) -> int:
+        return int(self._cabecera[0])
+
+    def write(self, data: bytes):
+        muestras = np.frombuffer(data, dtype=np.int16)
+        n = min(len(muestras), self.muestras_bloque)
+        if n < len(muestras):
+            self.truncados += 1
+        seq = int(self._cabecera[0])
+        slot = seq % self.capacidad
+        self._datos[slot, :n] = muestras[:n]
+        self._longitudes[slot] = n
+        # La secuencia se publica al final: el lector nunca ve una ranura a medias.
+        self._cabecera[0] = seq + 1
+
+    def read(self, seq: int) -> tuple[int, bytes | None]:
+        """
+        @param {int} seq - Secuencia solicitada.
+        @returns {tuple[int, bytes | None]} - Secuencia leída y una copia de sus datos, o
+                 (seq, None) si aún no se ha escrito. Si el lector se quedó atrás, salta
+                 al bloque más antiguo disponible.
+        """
+        while True:
+            escrita = int(self._cabecera[0])
+            if seq >= escrita:
+                return seq, None
+            # La ranura del bloque más antiguo es la que el escritor rellena a
+            # continuación, así que se deja fuera.
+            if escrita - seq >= self.capacidad:
+                self.overruns += escrita - self.capacidad + 1 - seq
+                seq = escrita - self.capacidad + 1
+            slot = seq % self.capacidad
+            data = self._datos[slot, :self._longitudes[slot]].tobytes()
+            if int(self._cabecera[0]) - seq < self.capacidad:
+                return seq, data
+
+    def cerrar(self):
+        """Suelta las vistas y el segmento; el creador además lo elimina."""
+        del self._cabecera, self._longitudes, self._datos
+        self._memoria.close()
+        if self._propia:
+            self._memoria.unlink()
+
+
+class SharedMemoryAudioSource(AudioSource):
+    """
+    @class SharedMemoryAudioSource
+    @description Fuente de audio del proceso de reconocimiento: entrega, en el
+                 orden escrito, los bloques que el proceso principal deja en el
+                 anillo compartido. Empieza por el presente, no por lo antiguo.
+    """
+    def __init__(self, anillo: SharedAudioRing, hay_audio, samplerate: int, canales=1):
+        """
+        @param {SharedAudioRing} anillo - Anillo adjuntado en este proceso.
+        @param {multiprocessing.Event} hay_audio - Aviso del escritor tras cada bloque.
+        """
+        self.anillo = anillo
+        self.hay_audio = hay_audio
+        self.samplerate = samplerate
+        self.canales = canales
+        self._stop_event = threading.Event()
+        self._hilo = None
+
+    def start(self, blocksize: int, callback: Callable[[bytes], None]):
+        # Los bloques ya llegan con el tamaño que usó el escritor.
+        self._stop_event.clear()
+        self._hilo = threading.Thread(target=self._run, args=(callback,), name="shm-source", daemon=True)
+        self._hilo.start()
+
+    def _run(self, callback: Callable[[bytes], None]):
+        posicion = self.anillo.write_seq
+        while not self._stop_event.is_set():
+            if not self.hay_audio.wait(timeout=0.5):
+                continue
+            # Se limpia antes de leer: un aviso posterior no se pierde.
+            self.hay_audio.clear()
+            while True:
+                seq, data = self.anillo.read(posicion)
+                if data is None:
+                    break
+                posicion = seq + 1
+                callback(data)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=1.0)
+            self._hilo = None
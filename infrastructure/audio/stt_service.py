@@ -5,52 +5,194 @@
 @description Implementa la interfaz ISTTService para transcribir comandos de voz.
 """
 
-from domain.services import ISTTService
+from domain.services import ISTTService, ITracer, NullTracer
+from infrastructure.audio.audio_capture import AudioCaptureService, DESCARTAR_ANTIGUOS
+from infrastructure.audio.vad import EnergyVAD
+from infrastructure.audio.dsp import EnergyGate
+from infrastructure.audio.command_grammar import TwoTierRecognizer, PARALELO, GRAMATICA
 import vosk
-import sounddevice as sd
 import json
-import queue
+import time
 
 class VoskSTTService(ISTTService):
     """
     @class VoskSTTService
-    @description Implementa ISTTService usando el motor de VOSK.
+    @description Implementa ISTTService usando el motor de VOSK. Comparte el modelo
+                 y el stream del servicio de captura y lee con pre-roll desde el
+                 instante del hotword, de modo que "Jarvis, qué hora es" funciona
+                 en una sola frase. Un VAD decide el final del enunciado y acota
+                 la escucha con límites de silencio inicial y duración máxima; el
+                 mismo VAD alimenta una puerta que ahorra al reconocedor el
+                 silencio previo a la voz. El audio entre la marca y el inicio
+                 de la escucha (el acuse "Sí, señor?") se descarta para que el
+                 micrófono no lo transcriba como parte del comando.
     """
-    def __init__(self):
+    def __init__(self, capture_service: AudioCaptureService, pre_roll=3.0, keyword="jarvis",
+                 silencio_final=0.8, timeout_sin_voz=5.0, max_duracion=15.0, tracer: ITracer | None = None,
+                 max_retraso_s: float | None = 5.0, politica=DESCARTAR_ANTIGUOS, recognizer_pool=None,
+                 gramatica=None, conf_gramatica=0.85, modo_gramatica=PARALELO):
+        """
+        @param {AudioCaptureService} capture_service - Servicio de captura compartido.
+        @param {float} pre_roll - Segundos de audio previos a la marca del hotword.
+        @param {str} keyword - Palabra clave que se elimina del comando.
+        @param {float} silencio_final - Silencio tras la voz que cierra el enunciado.
+        @param {float} timeout_sin_voz - Segundos sin voz tras el hotword antes de rendirse.
+        @param {float} max_duracion - Duración máxima de un comando.
+        @param {ITracer | None} tracer - Recibe la duración del comando y el endpointing.
+        @param {float | None} max_retraso_s - Audio pendiente máximo (debe superar el pre-roll).
+        @param {str} politica - Política de desbordamiento del lector.
+        @param {RecognizerPool | None} recognizer_pool - Pool de reconocedores compartido.
+        @param {CommandGrammar | None} gramatica - Activa el reconocimiento en dos niveles:
+               primero la gramática de comandos y, si no es fiable, el modelo completo.
+        @param {float} conf_gramatica - Confianza mínima por palabra del nivel de gramática.
+        @param {str} modo_gramatica - 'paralelo' o 'respaldo' (ver TwoTierRecognizer).
+        """
         print("Inicializando VoskSTTService...")
-        try:
-            self.model = vosk.Model("models/vosk/vosk-model-small-es-0.42")
-        except Exception as e:
-            print(f"Error fatal al cargar el modelo VOSK (STT): {e}")
-            self.model = None
+        self.capture = capture_service
+        self.model = capture_service.model
+        self.pre_roll = pre_roll
+        self.keyword = keyword.lower()
+        self.silencio_final = silencio_final
+        self.timeout_sin_voz = timeout_sin_voz
+        self.max_duracion = max_duracion
+        self.ultima_medicion = {}
+        self.tracer = tracer or NullTracer()
+        self.max_retraso_s = max(max_retraso_s, pre_roll + 1.0) if max_retraso_s is not None else None
+        self.politica = politica
+        self.recognizer_pool = recognizer_pool
+        self.gramatica = gramatica
+        self.conf_gramatica = conf_gramatica
+        self.modo_gramatica = modo_gramatica
+
+    def _extraer_comando(self, texto: str, en_pre_roll: bool) -> str:
+        """
+        Método privado que elimina la palabra clave del texto reconocido. El audio
+        del pre-roll anterior a la palabra clave no forma parte del comando.
+        """
+        palabras = texto.split()
+        if self.keyword in palabras:
+            ultima = len(palabras) - 1 - palabras[::-1].index(self.keyword)
+            return " ".join(palabras[ultima + 1:])
+        return "" if en_pre_roll else texto
 
-    def escuchar_comando(self) -> str | None:
+    def escuchar_comando(self, on_parcial=None) -> str | None:
         if not self.model:
             return None
 
-        q = queue.Queue()
-
-        def audio_callback(indata, frames, time, status):
-            if status:
-                print(f"Status del stream (STT): {status}")
-            q.put(bytes(indata))
-
         print("🎙️  Escuchando tu comando...")
+        recognizer = None
+        reconocedor = None
         try:
-            device_info = sd.query_devices(kind='input')
-            samplerate = int(device_info['default_samplerate'])
-            
-            with sd.RawInputStream(samplerate=samplerate, blocksize=8000, device=None,
-                                   dtype='int16', channels=1, callback=audio_callback):
+            self.capture.start()
+            # Lo grabado hasta ahora desde la marca es el acuse del asistente.
+            inicio_escucha = self.capture.ring.write_seq
+            reader = self.capture.create_reader(pre_roll=self.pre_roll, from_mark=True,
+                                                max_retraso_s=self.max_retraso_s, politica=self.politica)
+            # Bloques posteriores a la marca del hotword ya no pertenecen al pre-roll
+            # (se concede un bloque de margen al endpointing de este reconocedor).
+            fin_pre_roll = self.capture.mark_seq + 1
+            samplerate = self.capture.samplerate
+            if self.recognizer_pool:
+                recognizer = self.recognizer_pool.adquirir(timeout=self.timeout_sin_voz)
+                if recognizer is None:
+                    print("No hay reconocedores libres para atender el comando.")
+                    return None
+            else:
                 recognizer = vosk.KaldiRecognizer(self.model, samplerate)
-                while True:
-                    data = q.get()
-                    if recognizer.AcceptWaveform(data):
-                        result = json.loads(recognizer.Result())
-                        if result.get("text"):
-                            comando = result["text"]
-                            print(f"Texto reconocido: '{comando}'")
-                            return comando
+            reconocedor = recognizer
+            if self.gramatica:
+                reconocedor = TwoTierRecognizer(self.gramatica.adquirir(self.model, samplerate), recognizer,
+                                                conf_minima=self.conf_gramatica, modo=self.modo_gramatica)
+            vad = EnergyVAD(samplerate)
+            # La cola de la puerta cubre el silencio que cierra el enunciado.
+            gate = EnergyGate(vad, hangover_s=self.silencio_final + 2 * self.capture.block_duration)
+
+            duracion = 0.0        # Audio posterior al hotword procesado (s).
+            silencio = 0.0        # Silencio acumulado desde la última voz (s).
+            hubo_voz = False
+            instante_ultima_voz = None
+            audio_total = 0.0     # Audio procesado, pre-roll incluido (s).
+            proceso = 0.0         # CPU de reloj gastada en VAD y reconocedor (s).
+            inicio = time.perf_counter()
+            while True:
+                if fin_pre_roll <= reader.position < inicio_escucha:
+                    reader.seek(inicio_escucha)
+                data = reader.read(timeout=1.0)
+                if data is None:
+                    # Sin audio del dispositivo no hay tiempo de audio que avance.
+                    if self.capture.ring.closed or time.perf_counter() - inicio > self.max_duracion:
+                        return None
+                    continue
+
+                t_bloque = time.perf_counter()
+                en_pre_roll = reader.position <= fin_pre_roll
+                bloque = len(data) / 2 / samplerate
+                audio_total += bloque
+                if not en_pre_roll:
+                    duracion += bloque
+
+                es_voz = vad.es_voz(data)
+                if es_voz:
+                    hubo_voz = True
+                    silencio = 0.0
+                    instante_ultima_voz = time.perf_counter()
+                else:
+                    silencio += bloque
+
+                resultados = [json.loads(reconocedor.Result()).get("text", "")
+                              for b in gate.filtrar(data, es_voz) if reconocedor.AcceptWaveform(b)]
+                if resultados:
+                    texto = " ".join(t for t in resultados if t)
+                elif hubo_voz and silencio >= self.silencio_final:
+                    texto = json.loads(reconocedor.FinalResult()).get("text", "")
+                elif duracion >= self.max_duracion:
+                    print("Duración máxima del comando alcanzada.")
+                    texto = json.loads(reconocedor.FinalResult()).get("text", "")
+                else:
+                    if on_parcial and gate.abierta:
+                        # Se notifica en cada bloque, aunque no cambie, para que el
+                        # receptor pueda medir cuánto tiempo lleva estable.
+                        parcial = json.loads(reconocedor.PartialResult()).get("partial", "")
+                        parcial = self._extraer_comando(parcial, en_pre_roll)
+                        if parcial:
+                            on_parcial(parcial)
+                    proceso += time.perf_counter() - t_bloque
+                    if not hubo_voz and not en_pre_roll and duracion >= self.timeout_sin_voz:
+                        print("No se detectó voz a tiempo.")
+                        self.ultima_medicion = {"motivo": "sin_voz", "duracion_s": duracion,
+                                                **reader.estadisticas()}
+                        return None
+                    continue
+
+                proceso += time.perf_counter() - t_bloque
+                comando = self._extraer_comando(texto, en_pre_roll)
+                if comando:
+                    endpointing = time.perf_counter() - instante_ultima_voz if instante_ultima_voz else 0.0
+                    rtf = proceso / audio_total
+                    self.ultima_medicion = {"motivo": "comando", "duracion_s": duracion,
+                                            "endpointing_s": endpointing, "rtf": rtf, **reader.estadisticas()}
+                    self.tracer.registrar("stt_audio_s", duracion)
+                    self.tracer.registrar("stt_rtf", rtf)
+                    self.tracer.registrar("stt_overruns", reader.overruns)
+                    self.tracer.registrar("endpointing_s", endpointing)
+                    if self.gramatica:
+                        self.ultima_medicion.update(nivel=reconocedor.nivel, cpu_niveles=dict(reconocedor.cpu))
+                        self.tracer.registrar("stt_gramatica", 1.0 if reconocedor.nivel == GRAMATICA else 0.0)
+                    print(f"Texto reconocido: '{comando}' (endpointing: {endpointing * 1000:.0f} ms)")
+                    return comando
+                if duracion >= self.max_duracion:
+                    self.ultima_medicion = {"motivo": "max_duracion", "duracion_s": duracion,
+                                            **reader.estadisticas()}
+                    return None
+                # Enunciado vacío (solo la palabra clave o ruido): se sigue escuchando.
+                hubo_voz = False
+                silencio = 0.0
+                instante_ultima_voz = None
         except Exception as e:
             print(f"Error durante la escucha del comando: {e}")
             return None
+        finally:
+            if self.recognizer_pool and recognizer is not None:
+                self.recognizer_pool.liberar(recognizer)
+            if isinstance(reconocedor, TwoTierRecognizer):
+                self.gramatica.liberar(reconocedor.gramatical, samplerate)
@@ -6,28 +6,84 @@
              pero funcional y 100% offline para el asistente.
 """
 
-from domain.services import ITTSService
+from domain.services import ITTSService, ITracer, NullTracer
+from infrastructure.audio.phrase_cache import PhraseAudioCache
 import pyttsx3
+import itertools
+import os
+import queue
+import tempfile
 import threading
+import time
+
+class _Frase:
+    """Unidad de trabajo privada del worker de TTS. Con 'ruta' se renderiza a fichero."""
+    __slots__ = ("nombre", "texto", "ruta", "hecho", "inicio")
+
+    def __init__(self, nombre: str, texto: str, ruta: str | None = None):
+        self.nombre = nombre
+        self.texto = texto
+        self.ruta = ruta
+        self.hecho = threading.Event()
+        self.inicio = None
+
 
 class Pyttsx3TTSService(ITTSService):
     """
     @class Pyttsx3TTSService
     @description Implementa ITTSService usando la librería pyttsx3.
-                 Está diseñado para ser thread-safe creando una nueva instancia
-                 del motor en cada llamada a 'hablar'.
+                 Un único hilo worker de larga duración es dueño del motor: lo
+                 inicializa una sola vez y consume frases de una cola. Para evitar
+                 pausas entre frases mantiene hasta 'lookahead' frases ya entregadas
+                 al motor, de modo que la frase N+1 empieza en cuanto termina la N.
+                 Las frases fijas se pueden pre-renderizar a WAV y reproducirse
+                 desde una caché de audio sin pasar por el motor.
     """
-    def __init__(self):
+    def __init__(self, rate=165, volume=0.9, lookahead=2, phrase_cache: PhraseAudioCache | None = None,
+                 tracer: ITracer | None = None, on_nivel_audio=None, max_pendientes=4):
+        """
+        @param {int} lookahead - Frases entregadas al motor por adelantado.
+        @param {int} max_pendientes - Frases pendientes a partir de las que 'encolar'
+               espera a que haya hueco (contrapresión hacia el LLM).
+        @param {ITracer | None} tracer - Recibe 'primera_frase' y el RTF de cada ráfaga.
+        @param {Callable[[float], None] | None} on_nivel_audio - Recibe el nivel de salida
+               (0-1): la envolvente de las frases en caché y un pulso por palabra del motor.
+        """
         print("Inicializando Pyttsx3TTSService...")
-        self.tts_lock = threading.Lock()
+        self.rate = rate
+        self.volume = volume
+        self.lookahead = max(1, lookahead)
+        self.max_pendientes = max(self.lookahead, max_pendientes)
         self.spanish_voice_id = None
-        self._find_voice()
+        self.phrase_cache = phrase_cache or PhraseAudioCache()
+        self.tracer = tracer or NullTracer()
+        self.on_nivel_audio = on_nivel_audio
+        self._precalentadas = []
+        self._volumen_cambiado = threading.Event()
+
+        self._cola = queue.Queue()
+        self._en_motor = {}
+        self._ids = itertools.count()
+        self._cond = threading.Condition()
+        self._pendientes = 0
+        self._cancelaciones = 0
+        self._metricas = {"encoladas": 0, "reproducidas": 0, "canceladas": 0, "profundidad_max": 0}
+        # Ventana de habla continua para el factor de tiempo real (RTF).
+        self._rafaga_inicio = None
+        self._rafaga_voz = 0.0
+
+        self._cancelar_evt = threading.Event()
+        self._cancelado_ack = threading.Event()
+        self._stop_event = threading.Event()
+        self._listo = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+        self._worker.start()
+        self._listo.wait()
 
-    def _find_voice(self):
+    def _find_voice(self, engine):
         """Método privado para encontrar y almacenar el ID de una voz en español."""
         try:
-            temp_engine = pyttsx3.init()
-            voices = temp_engine.getProperty('voices')
+            voices = engine.getProperty('voices')
             spanish_voice_names = ["helena", "sabina", "spanish"]
             for voice in voices:
                 for name in spanish_voice_names:
@@ -36,24 +92,251 @@ class Pyttsx3TTSService(ITTSService):
                         break
                 if self.spanish_voice_id:
                     break
-            temp_engine.stop()
-            del temp_engine
             if self.spanish_voice_id:
                 print(f"Voz en español encontrada: {self.spanish_voice_id}")
         except Exception as e:
             print(f"ERROR: No se pudo buscar voces de pyttsx3: {e}")
 
+    def _run(self):
+        """Bucle privado del worker: posee el motor durante toda la vida del servicio."""
+        try:
+            engine = pyttsx3.init()
+            self._find_voice(engine)
+            if self.spanish_voice_id:
+                engine.setProperty('voice', self.spanish_voice_id)
+            engine.setProperty('rate', self.rate)
+            engine.setProperty('volume', self.volume)
+            engine.connect('started-utterance', self._on_started)
+            if self.on_nivel_audio:
+                engine.connect('started-word', self._on_word)
+            engine.connect('finished-utterance', self._on_finished)
+            engine.startLoop(False)
+        except Exception as e:
+            print(f"Error en el motor pyttsx3: {e}")
+            self._listo.set()
+            return
+
+        self._listo.set()
+        try:
+            while not self._stop_event.is_set():
+                if self._volumen_cambiado.is_set():
+                    self._volumen_cambiado.clear()
+                    engine.setProperty('volume', self.volume)
+                if self._cancelar_evt.is_set():
+                    engine.stop()
+                    for frase in list(self._en_motor.values()):
+                        self._completar(frase, cancelada=True)
+                    self._cancelar_evt.clear()
+                    self._cancelado_ack.set()
+
+                # Lookahead: se entregan frases al motor mientras haya hueco.
+                while len(self._en_motor) < self.lookahead:
+                    try:
+                        if self._en_motor:
+                            frase = self._cola.get_nowait()
+                        else:
+                            frase = self._cola.get(timeout=0.05)
+                    except queue.Empty:
+                        break
+                    if frase is None:
+                        break
+                    self._en_motor[frase.nombre] = frase
+                    if frase.ruta:
+                        engine.save_to_file(frase.texto, frase.ruta, frase.nombre)
+                    else:
+                        print(f"Jarvis (pyttsx3) dice: {frase.texto}")
+                        engine.say(frase.texto, frase.nombre)
+
+                engine.iterate()
+        except Exception as e:
+            print(f"Error en el motor pyttsx3: {e}")
+        finally:
+            for frase in list(self._en_motor.values()):
+                self._completar(frase, cancelada=True)
+            try:
+                engine.endLoop()
+            except Exception:
+                pass
+
+    def _on_started(self, name):
+        """Callback privado del motor al empezar a sonar una frase."""
+        frase = self._en_motor.get(name)
+        if frase and not frase.ruta:
+            frase.inicio = time.perf_counter()
+            if self._rafaga_inicio is None:
+                self._rafaga_inicio = frase.inicio
+            self.tracer.marcar("primera_frase")
+
+    def _on_word(self, name, location, length):
+        """Callback privado del motor: pyttsx3 no da niveles, así que cada palabra es un pulso."""
+        frase = self._en_motor.get(name)
+        if frase and not frase.ruta:
+            self.on_nivel_audio(1.0)
+
+    def _on_finished(self, name, completed):
+        """Callback privado del motor al terminar una frase."""
+        frase = self._en_motor.get(name)
+        if frase:
+            if frase.inicio is not None and completed:
+                self._rafaga_voz += time.perf_counter() - frase.inicio
+            self._completar(frase, cancelada=not completed)
+
+    def _completar(self, frase: _Frase, cancelada: bool):
+        self._en_motor.pop(frase.nombre, None)
+        with self._cond:
+            self._pendientes -= 1
+            self._metricas["canceladas" if cancelada else "reproducidas"] += 1
+            vacia = self._pendientes == 0
+            self._cond.notify_all()
+        if vacia:
+            self._cerrar_rafaga()
+        frase.hecho.set()
+
+    def _cerrar_rafaga(self):
+        """
+        Método privado. pyttsx3 no expone el tiempo de síntesis, así que el RTF se
+        mide como el tiempo total de la ráfaga dividido entre el tiempo sonando:
+        1.0 significa que no hubo huecos entre frases.
+        """
+        if self._rafaga_inicio is not None and self._rafaga_voz > 0:
+            self.tracer.registrar("tts_rtf", (time.perf_counter() - self._rafaga_inicio) / self._rafaga_voz)
+        self._rafaga_inicio = None
+        self._rafaga_voz = 0.0
+
+    def _encolar(self, texto: str, ruta: str | None = None) -> _Frase:
+        frase = _Frase(str(next(self._ids)), texto, ruta)
+        with self._cond:
+            self._pendientes += 1
+            self._metricas["encoladas"] += 1
+            self._metricas["profundidad_max"] = max(self._metricas["profundidad_max"], self._pendientes)
+        self._cola.put(frase)
+        return frase
+
+    def _esperar_evento(self, evento: threading.Event):
+        while not evento.wait(0.5):
+            if not self._worker.is_alive():
+                return
+
     def hablar(self, texto: str):
-        with self.tts_lock:
+        if not self._worker.is_alive():
+            print("Error en el motor pyttsx3: el worker de TTS no está activo.")
+            return
+        self._esperar_evento(self._encolar(texto).hecho)
+
+    def encolar(self, texto: str):
+        """Bloquea mientras la cola esté llena; si se cancela entretanto, la frase se descarta."""
+        if not self._worker.is_alive():
+            print("Error en el motor pyttsx3: el worker de TTS no está activo.")
+            return
+        with self._cond:
+            cancelaciones = self._cancelaciones
+            while self._pendientes >= self.max_pendientes and self._worker.is_alive():
+                self._cond.wait(0.5)
+            if cancelaciones != self._cancelaciones:
+                return
+        self._encolar(texto)
+
+    def esperar(self):
+        with self._cond:
+            while self._pendientes > 0 and self._worker.is_alive():
+                self._cond.wait(0.5)
+
+    def _clave_frase(self, texto: str) -> str:
+        return PhraseAudioCache.clave(texto, self.spanish_voice_id, self.rate, self.volume)
+
+    def precalentar(self, frases: list[str]):
+        """Renderiza con el mismo motor las frases que aún no están en la caché."""
+        self._precalentadas += [texto for texto in frases if texto not in self._precalentadas]
+        for texto in frases:
+            clave = self._clave_frase(texto)
+            if self.phrase_cache.obtener(clave) is not None:
+                continue
+            if not self._worker.is_alive():
+                return
+            ruta = self.phrase_cache.ruta(clave)
+            temporal = f"{ruta}.tmp.wav"
+            self._esperar_evento(self._encolar(texto, ruta=temporal).hecho)
+            if os.path.exists(temporal):
+                os.replace(temporal, ruta)
+                self.phrase_cache.obtener(clave)
+                print(f"Frase pre-renderizada: '{texto}'")
+            else:
+                print(f"No se pudo pre-renderizar la frase: '{texto}'")
+
+    def renderizar(self, texto: str) -> tuple | None:
+        """
+        @param {str} texto - Frase a sintetizar sin reproducirla.
+        @returns {tuple | None} - (muestras int16, frecuencia), o None si el motor falló.
+        @description Usado por el modo servidor para enviar la voz a los clientes. Las
+                     frases fijas salen de la caché; el resto se renderiza con el mismo
+                     motor (las peticiones de todas las sesiones se serializan en él).
+        """
+        audio = self.phrase_cache.obtener(self._clave_frase(texto))
+        if audio is not None or not self._worker.is_alive():
+            return audio
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+            temporal = f.name
+        try:
+            self._esperar_evento(self._encolar(texto, ruta=temporal).hecho)
+            if os.path.getsize(temporal) == 0:
+                return None
+            return PhraseAudioCache.leer_wav(temporal)
+        except Exception as e:
+            print(f"No se pudo renderizar la frase: {e}")
+            return None
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+    def hablar_frase(self, texto: str):
+        audio = self.phrase_cache.obtener(self._clave_frase(texto))
+        if audio is None:
+            self.hablar(texto)
+            return
+        print(f"Jarvis (caché) dice: {texto}")
+        try:
+            PhraseAudioCache.reproducir(audio, on_nivel=self.on_nivel_audio)
+        except Exception as e:
+            print(f"Error reproduciendo audio en caché: {e}")
+            self.hablar(texto)
+
+    def ajustar_volumen(self, nivel: float):
+        """
+        El motor aplica el volumen antes de la siguiente frase. Las frases en caché
+        dependen del volumen, así que se vuelven a renderizar en segundo plano.
+        """
+        self.volume = min(1.0, max(0.0, nivel))
+        self._volumen_cambiado.set()
+        if self._precalentadas:
+            threading.Thread(target=self.precalentar, args=(list(self._precalentadas),),
+                             name="tts-precalentar", daemon=True).start()
+
+    def cancelar(self):
+        """Vacía la cola y detiene la frase en curso. Retorna cuando el motor ha callado."""
+        with self._cond:
+            self._cancelaciones += 1
+        PhraseAudioCache.detener()
+        while True:
             try:
-                print(f"Jarvis (pyttsx3) dice: {texto}")
-                engine = pyttsx3.init()
-                if self.spanish_voice_id:
-                    engine.setProperty('voice', self.spanish_voice_id)
-                engine.setProperty('rate', 165)
-                engine.setProperty('volume', 0.9)
-                engine.say(texto)
-                engine.runAndWait()
-                engine.stop()
-            except Exception as e:
-                print(f"Error en el motor pyttsx3: {e}")
\ No newline at end of file
+                frase = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if frase is not None:
+                self._completar(frase, cancelada=True)
+        if self._worker.is_alive():
+            self._cancelado_ack.clear()
+            self._cancelar_evt.set()
+            self._esperar_evento(self._cancelado_ack)
+
+    def metricas(self) -> dict:
+        """
+        @returns {dict} - Profundidad actual de la cola y contadores acumulados.
+        """
+        with self._cond:
+            return {"profundidad_cola": self._pendientes, **self._metricas}
+
+    def cerrar(self):
+        """Detiene el worker y libera el motor."""
+        self._stop_event.set()
+        self._cola.put(None)
+        self._worker.join(timeout=2.0)
@@ -0,0 +1,63 @@
+"""
+@fileoverview Detector de actividad de voz (VAD) por energía y cruces por cero.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Clasifica bloques de audio PCM de 16 bits como voz o silencio. El
+             cálculo está vectorizado con NumPy: el bloque se divide en tramas
+             cortas y se obtienen su energía y su tasa de cruces por cero de
+             una sola vez. El umbral se adapta al ruido de fondo.
+"""
+
+import numpy as np
+
+class EnergyVAD:
+    """
+    @class EnergyVAD
+    @description VAD ligero basado en energía (dBFS) y tasa de cruces por cero (ZCR).
+    """
+    def __init__(self, samplerate: int, frame_ms=20, umbral_db=-45.0, margen_ruido_db=12.0,
+                 zcr_max=0.35, fraccion_voz=0.3):
+        """
+        @param {int} samplerate - Frecuencia de muestreo del audio.
+        @param {int} frame_ms - Duración de cada trama de análisis.
+        @param {float} umbral_db - Energía mínima absoluta para considerar voz.
+        @param {float} margen_ruido_db - DB por encima del ruido de fondo estimado.
+        @param {float} zcr_max - Tasa de cruces por cero máxima (descarta ruido siseante).
+        @param {float} fraccion_voz - Fracción de tramas con voz para marcar el bloque.
+        """
+        self.samplerate = samplerate
+        self.frame_len = max(1, int(samplerate * frame_ms / 1000))
+        self.umbral_db = umbral_db
+        self.margen_ruido_db = margen_ruido_db
+        self.zcr_max = zcr_max
+        self.fraccion_voz = fraccion_voz
+        self.ruido_db = umbral_db - margen_ruido_db
+
+    def analizar(self, datos) -> tuple[bool, float]:
+        """
+        @param {bytes | np.ndarray} datos - Bloque PCM int16 mono.
+        @returns {tuple[bool, float]} - Si el bloque contiene voz y su energía media en dBFS.
+        """
+        muestras = np.frombuffer(datos, dtype=np.int16) if isinstance(datos, (bytes, bytearray)) else datos
+        n_tramas = len(muestras) // self.frame_len
+        if n_tramas == 0:
+            return False, -120.0
+        tramas = muestras[:n_tramas * self.frame_len].reshape(n_tramas, self.frame_len).astype(np.float32)
+        tramas *= 1.0 / 32768.0
+
+        energia_db = 10.0 * np.log10(np.mean(tramas * tramas, axis=1) + 1e-12)
+        signos = np.signbit(tramas)
+        zcr = np.count_nonzero(signos[:, 1:] != signos[:, :-1], axis=1) / self.frame_len
+
+        umbral = max(self.umbral_db, self.ruido_db + self.margen_ruido_db)
+        voz = (energia_db > umbral) & (zcr < self.zcr_max)
+        es_voz = np.count_nonzero(voz) >= self.fraccion_voz * n_tramas
+        energia_media = float(np.mean(energia_db))
+
+        # El ruido de fondo solo se actualiza con bloques de silencio.
+        if not es_voz:
+            self.ruido_db = 0.95 * self.ruido_db + 0.05 * energia_media
+        return bool(es_voz), energia_media
+
+    def es_voz(self, datos) -> bool:
+        return self.analizar(datos)[0]
@@ -0,0 +1,197 @@
+"""
+@fileoverview Caché de respuestas para cualquier servicio de LLM.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Decorador de ILLMService que evita volver a generar respuestas a
+             preguntas repetidas. Guarda las respuestas en una LRU en memoria y,
+             opcionalmente, en SQLite con caducidad, y las reproduce como stream
+             a través de la misma interfaz de generador.
+"""
+
+from domain.services import ILLMService
+from infrastructure.llm.llm_service import RESPUESTAS_DE_ERROR
+from collections import OrderedDict
+from typing import Callable, Generator
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# Reglas por defecto: (patrón sobre el texto normalizado, TTL en segundos).
+# Un TTL de 0 excluye la entrada de la caché.
+REGLAS_POR_DEFECTO = (
+    (r"\b(hora|fecha|hoy|ahora|manana|ayer|dia es)\b", 0),
+    (r"\b(clima|tiempo hace|temperatura|noticias)\b", 0),
+    (r"\bchiste\b", 6 * 3600),
+)
+
+def normalizar(texto: str) -> str:
+    """
+    @param {str} texto - Texto libre.
+    @returns {str} - Texto en minúsculas, sin tildes, sin signos y con espacios simples.
+    """
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"[^\w\s]", " ", texto)
+    return " ".join(texto.split())
+
+
+class CachedLLMService(ILLMService):
+    """
+    @class CachedLLMService
+    @description Envuelve otro ILLMService y sirve desde caché las respuestas ya
+                 generadas para el mismo texto normalizado y el mismo modelo.
+    """
+    def __init__(self, inner: ILLMService, max_entradas=256, ttl_por_defecto=24 * 3600,
+                 ruta_sqlite=None, reglas=REGLAS_POR_DEFECTO):
+        """
+        @param {ILLMService} inner - Servicio real al que se delega en caso de fallo.
+        @param {int} max_entradas - Tamaño máximo de la LRU en memoria.
+        @param {float} ttl_por_defecto - Caducidad en segundos de las entradas.
+        @param {str | None} ruta_sqlite - Fichero SQLite para persistir la caché.
+        @param {tuple} reglas - Pares (regex, ttl) evaluados en orden; TTL 0 excluye.
+        """
+        print("Inicializando CachedLLMService...")
+        self.inner = inner
+        self.max_entradas = max_entradas
+        self.ttl_por_defecto = ttl_por_defecto
+        self.reglas = [(re.compile(patron), ttl) for patron, ttl in reglas]
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._cancelaciones = 0
+        self._contadores = {"aciertos": 0, "fallos": 0, "excluidas": 0, "almacenadas": 0}
+
+        self._db = None
+        if ruta_sqlite:
+            os.makedirs(os.path.dirname(ruta_sqlite) or ".", exist_ok=True)
+            self._db = sqlite3.connect(ruta_sqlite, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS respuestas ("
+                             "clave TEXT PRIMARY KEY, respuesta TEXT NOT NULL, expira REAL NOT NULL)")
+            self._db.execute("DELETE FROM respuestas WHERE expira < ?", (time.time(),))
+            self._db.commit()
+
+    def _ttl(self, texto_normalizado: str) -> float:
+        for patron, ttl in self.reglas:
+            if patron.search(texto_normalizado):
+                return ttl
+        return self.ttl_por_defecto
+
+    def _leer(self, clave: str) -> str | None:
+        ahora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                respuesta, expira = entrada
+                if expira >= ahora:
+                    self._memoria.move_to_end(clave)
+                    return respuesta
+                del self._memoria[clave]
+            if self._db is None:
+                return None
+            fila = self._db.execute("SELECT respuesta, expira FROM respuestas WHERE clave = ?",
+                                    (clave,)).fetchone()
+            if fila is None or fila[1] < ahora:
+                return None
+            self._guardar_en_memoria(clave, fila[0], fila[1])
+            return fila[0]
+
+    def _guardar_en_memoria(self, clave: str, respuesta: str, expira: float):
+        self._memoria[clave] = (respuesta, expira)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def _escribir(self, clave: str, respuesta: str, ttl: float):
+        expira = time.time() + ttl
+        with self._lock:
+            self._guardar_en_memoria(clave, respuesta, expira)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO respuestas (clave, respuesta, expira) "
+                                 "VALUES (?, ?, ?)", (clave, respuesta, expira))
+                self._db.commit()
+            self._contadores["almacenadas"] += 1
+
+    def _contar(self, nombre: str):
+        with self._lock:
+            self._contadores[nombre] += 1
+
+    def _clave(self, prompt: str | None, mensajes: list[dict] | None, model: str) -> tuple[str | None, float]:
+        """
+        Método privado: clave y TTL de una petición; clave None si no se cachea. Solo
+        se cachea la primera pregunta de una conversación: con historial, la
+        respuesta depende de lo hablado antes.
+        """
+        if mensajes is None:
+            texto = normalizar(prompt)
+            return f"{model}\x1f{texto}", self._ttl(texto)
+        usuario = [m for m in mensajes if m["role"] != "system"]
+        if len(usuario) != 1:
+            return None, 0.0
+        texto = normalizar(usuario[0]["content"])
+        sistema = normalizar(" ".join(m["content"] for m in mensajes if m["role"] == "system"))
+        return f"{model}\x1f{sistema}\x1f{texto}", self._ttl(texto)
+
+    def stream_preguntar_a_jarvis(self, prompt: str, model: str = "mistral") -> Generator[str, None, None]:
+        return self._servir(*self._clave(prompt, None, model),
+                            lambda: self.inner.stream_preguntar_a_jarvis(prompt, model))
+
+    def stream_conversar(self, mensajes: list[dict], model: str = "mistral") -> Generator[str, None, None]:
+        return self._servir(*self._clave(None, mensajes, model), lambda: self.inner.stream_conversar(mensajes, model))
+
+    def stream_cancelable(self, prompt: str, model: str = "mistral",
+                          mensajes: list[dict] | None = None) -> tuple[Generator[str, None, None], Callable[[], None]]:
+        # Crear el stream interno no lanza la petición: en un acierto nunca se recorre.
+        generador, cancelar_inner = self.inner.stream_cancelable(prompt, model, mensajes)
+        cancelado = threading.Event()
+
+        def _cancelar():
+            cancelado.set()
+            cancelar_inner()
+        return self._servir(*self._clave(prompt, mensajes, model), lambda: generador, cancelado), _cancelar
+
+    def _servir(self, clave: str | None, ttl: float, generar,
+                cancelado: threading.Event | None = None) -> Generator[str, None, None]:
+        """Método privado: sirve desde la caché o genera y guarda la respuesta completa."""
+        if clave is None:
+            yield from generar()
+            return
+        if ttl <= 0:
+            self._contar("excluidas")
+            yield from generar()
+            return
+
+        respuesta = self._leer(clave)
+        if respuesta is not None:
+            self._contar("aciertos")
+            print("⚡ Respuesta servida desde la caché.")
+            # Se reproduce palabra a palabra para que el segmentador funcione igual.
+            yield from re.findall(r"\s*\S+\s*", respuesta)
+            return
+
+        self._contar("fallos")
+        cancelaciones = self._cancelaciones
+        partes = []
+        fallo = False
+        for chunk in generar():
+            # Un fallo a mitad de stream llega como la frase de error tras el texto parcial.
+            fallo = fallo or chunk.strip() in RESPUESTAS_DE_ERROR
+            partes.append(chunk)
+            yield chunk
+        respuesta = "".join(partes).strip()
+        # Solo se guardan respuestas completas: ni errores ni streams cancelados.
+        if (respuesta and not fallo and cancelaciones == self._cancelaciones
+                and not (cancelado and cancelado.is_set())):
+            self._escribir(clave, respuesta, ttl)
+
+    def cancelar(self):
+        self._cancelaciones += 1
+        self.inner.cancelar()
+
+    def estadisticas(self) -> dict:
+        """
+        @returns {dict} - Contadores de aciertos, fallos, exclusiones y escrituras.
+        """
+        with self._lock:
+            return {**self._contadores, "entradas_en_memoria": len(self._memoria)}
@@ -4,36 +4,221 @@
 @version 1.0.0
 @description Se conecta a una instancia local de Ollama para generar respuestas
              de texto en modo streaming, implementando la interfaz ILLMService.
+             Reutiliza conexiones mediante una sesión con pool, precarga el
+             modelo al arrancar, entrega cada token en cuanto su línea NDJSON
+             está completa y permite cancelar la generación en curso.
 """
 
-from domain.services import ILLMService
+from domain.services import ILLMService, ITracer, NullTracer
 import requests
+from requests.adapters import HTTPAdapter
 import json
-from typing import Generator
+import threading
+from typing import Callable, Generator
+
+RESPUESTA_SIN_CONEXION = "Lo siento, no puedo conectarme con mi cerebro."
+RESPUESTA_ERROR_INESPERADO = "Ha ocurrido un error inesperado."
+RESPUESTAS_DE_ERROR = frozenset({RESPUESTA_SIN_CONEXION, RESPUESTA_ERROR_INESPERADO})
+
+class NDJSONStreamParser:
+    """
+    @class NDJSONStreamParser
+    @description Parser incremental de NDJSON. Acumula bytes y devuelve cada objeto
+                 JSON en cuanto su línea termina, sin esperar a llenar un buffer.
+    """
+    def __init__(self):
+        self._pendiente = bytearray()
+
+    def feed(self, data: bytes) -> list[dict]:
+        """
+        @param {bytes} data - Bytes recibidos del socket.
+        @returns {list[dict]} - Los objetos de todas las líneas completadas.
+        """
+        self._pendiente += data
+        objetos = []
+        inicio = 0
+        while True:
+            fin = self._pendiente.find(b"\n", inicio)
+            if fin == -1:
+                break
+            linea = self._pendiente[inicio:fin].strip()
+            if linea:
+                objetos.append(json.loads(linea))
+            inicio = fin + 1
+        if inicio:
+            del self._pendiente[:inicio]
+        return objetos
+
+    def close(self) -> list[dict]:
+        """Procesa una posible última línea sin salto de línea final."""
+        linea = bytes(self._pendiente).strip()
+        self._pendiente.clear()
+        return [json.loads(linea)] if linea else []
+
+
+class _StreamActivo:
+    """Registro privado de una respuesta HTTP en curso, para poder cancelarla."""
+    __slots__ = ("response", "cancelado", "generacion")
+
+    def __init__(self, generacion: int):
+        self.response = None
+        self.cancelado = False
+        # Cancelaciones globales vistas al crear el stream: una posterior lo
+        # corta aunque el generador aún no haya empezado.
+        self.generacion = generacion
+
 
 class OllamaLLMService(ILLMService):
     """
     @class OllamaLLMService
     @description Implementa ILLMService para interactuar con un servidor Ollama.
     """
-    def __init__(self, url="http://localhost:11434/api/generate"):
+    def __init__(self, url="http://localhost:11434/api/generate", keep_alive="30m",
+                 connect_timeout=3.0, first_token_timeout=60.0, pool_size=4, tracer: ITracer | None = None):
+        """
+        @param {str} url - Endpoint '/api/generate' de Ollama ('/api/chat' se deriva de él).
+        @param {str | int} keep_alive - Tiempo que Ollama mantiene el modelo cargado.
+        @param {float} connect_timeout - Segundos máximos para establecer la conexión.
+        @param {float} first_token_timeout - Segundos máximos de espera por el primer
+               token; también acota cualquier pausa posterior del stream.
+        @param {int} pool_size - Conexiones que la sesión mantiene abiertas.
+        @param {ITracer | None} tracer - Recibe tokens/s, prefill y carga del modelo.
+        """
         print("Inicializando OllamaLLMService...")
         self.url = url
+        self.url_chat = url.rsplit("/api/", 1)[0] + "/api/chat"
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.first_token_timeout = first_token_timeout
+        self.tracer = tracer or NullTracer()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._activos = set()
+        self._activos_lock = threading.Lock()
+        self._cancelaciones = 0
+
+    def warm_up(self, model: str = "mistral") -> bool:
+        """
+        @param {str} model - Modelo a precargar.
+        @returns {bool} - True si Ollama confirmó la carga del modelo.
+        @description Envía un prompt vacío, que hace que Ollama cargue el modelo en
+                     memoria y lo mantenga durante 'keep_alive' sin generar texto.
+        """
+        try:
+            payload = {"model": model, "prompt": "", "stream": False, "keep_alive": self.keep_alive}
+            response = self.session.post(self.url, json=payload,
+                                         timeout=(self.connect_timeout, self.first_token_timeout))
+            response.raise_for_status()
+            print(f"🔥 Modelo '{model}' precargado en Ollama.")
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"No se pudo precargar el modelo en Ollama: {e}")
+            return False
 
     def stream_preguntar_a_jarvis(self, prompt: str, model: str = "mistral") -> Generator[str, None, None]:
+        return self._stream(*self._peticion(prompt, None, model), _StreamActivo(self._cancelaciones))
+
+    def stream_conversar(self, mensajes: list[dict], model: str = "mistral") -> Generator[str, None, None]:
+        """
+        Usa '/api/chat': con el mismo modelo cargado, Ollama reutiliza la caché KV
+        del prefijo común (sistema e historial) y solo evalúa los mensajes nuevos.
+        """
+        return self._stream(*self._peticion(None, mensajes, model), _StreamActivo(self._cancelaciones))
+
+    def stream_cancelable(self, prompt: str, model: str = "mistral",
+                          mensajes: list[dict] | None = None) -> tuple[Generator[str, None, None], Callable[[], None]]:
+        """
+        @param {list[dict] | None} mensajes - Si se pasan, la petición va a '/api/chat' y se ignora 'prompt'.
+        @returns {tuple} - El stream y una función que cancela solo ese stream
+                 (a diferencia de 'cancelar', que corta todos los de este servicio).
+        """
+        activo = _StreamActivo(self._cancelaciones)
+        return self._stream(*self._peticion(prompt, mensajes, model), activo), lambda: self._cancelar_activo(activo)
+
+    def _peticion(self, prompt: str | None, mensajes: list[dict] | None, model: str) -> tuple[str, dict]:
+        """Método privado: endpoint y cuerpo de una petición de streaming."""
+        if mensajes is not None:
+            return self.url_chat, {"model": model, "messages": mensajes, "stream": True, "keep_alive": self.keep_alive}
+        return self.url, {"model": model, "prompt": prompt, "stream": True, "keep_alive": self.keep_alive}
+
+    @staticmethod
+    def _texto(chunk: dict) -> str:
+        """El texto de un chunk de '/api/generate' ('response') o de '/api/chat' ('message')."""
+        if "message" in chunk:
+            return chunk["message"].get("content", "")
+        return chunk.get("response", "")
+
+    def _stream(self, url: str, payload: dict, activo: _StreamActivo) -> Generator[str, None, None]:
+        with self._activos_lock:
+            self._activos.add(activo)
+            if self._cancelaciones != activo.generacion:
+                activo.cancelado = True
         try:
-            payload = {"model": model, "prompt": prompt, "stream": True}
-            with requests.post(self.url, json=payload, stream=True) as response:
+            if activo.cancelado:
+                return
+            with self.session.post(url, json=payload, stream=True,
+                                   timeout=(self.connect_timeout, self.first_token_timeout)) as response:
+                activo.response = response
+                if activo.cancelado:
+                    return
                 response.raise_for_status()
-                for line in response.iter_lines():
-                    if line:
-                        chunk = json.loads(line.decode('utf-8'))
-                        yield chunk.get("response", "")
+                parser = NDJSONStreamParser()
+                for data in response.iter_content(chunk_size=None):
+                    for chunk in parser.feed(data):
                         if chunk.get("done"):
-                            break
-        except requests.exceptions.RequestException as e:
-            print(f"Error de conexión con Ollama: {e}")
-            yield "Lo siento, no puedo conectarme con mi cerebro."
+                            self._registrar_estadisticas(chunk)
+                        yield self._texto(chunk)
+                        if chunk.get("done"):
+                            return
+                for chunk in parser.close():
+                    yield self._texto(chunk)
         except Exception as e:
-            print(f"Error inesperado en el servicio LLM: {e}")
-            yield "Ha ocurrido un error inesperado."
\ No newline at end of file
+            # Cerrar el socket desde 'cancelar' hace fallar la lectura: no es un error.
+            if activo.cancelado:
+                return
+            if isinstance(e, requests.exceptions.RequestException):
+                print(f"Error de conexión con Ollama: {e}")
+                yield RESPUESTA_SIN_CONEXION
+            else:
+                print(f"Error inesperado en el servicio LLM: {e}")
+                yield RESPUESTA_ERROR_INESPERADO
+        finally:
+            with self._activos_lock:
+                self._activos.discard(activo)
+
+    def _registrar_estadisticas(self, chunk: dict):
+        """Método privado: traslada al tracer los tiempos que Ollama incluye en el chunk final."""
+        ns = 1e-9
+        if chunk.get("eval_duration"):
+            self.tracer.registrar("tokens_por_s", chunk.get("eval_count", 0) / (chunk["eval_duration"] * ns))
+        if "prompt_eval_duration" in chunk:
+            self.tracer.registrar("prefill_s", chunk["prompt_eval_duration"] * ns)
+        if "prompt_eval_count" in chunk:
+            # Ollama solo cuenta los tokens evaluados: los servidos desde la caché KV no suman.
+            self.tracer.registrar("prompt_tokens", chunk["prompt_eval_count"])
+        if "load_duration" in chunk:
+            self.tracer.registrar("carga_modelo_s", chunk["load_duration"] * ns)
+
+    def cancelar(self):
+        """
+        Cierra todas las respuestas en curso. Al cerrarse la conexión, Ollama deja
+        de generar tokens para esa petición.
+        """
+        with self._activos_lock:
+            self._cancelaciones += 1
+            activos = list(self._activos)
+        for activo in activos:
+            self._cancelar_activo(activo)
+        if activos:
+            print(f"⏹️  Cancelados {len(activos)} stream(s) de Ollama.")
+
+    @staticmethod
+    def _cancelar_activo(activo: _StreamActivo):
+        activo.cancelado = True
+        if activo.response is not None:
+            try:
+                activo.response.close()
+            except Exception:
+                pass
@@ -0,0 +1,266 @@
+"""
+@fileoverview Enrutado de cada pregunta al modelo adecuado según su complejidad.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Decorador de ILLMService que elige, por pregunta, entre tres niveles
+             de modelo: uno pequeño y rápido, el de siempre y uno grande.
+             - Un clasificador local y barato (longitud, tipo de pregunta,
+               palabras clave, operaciones aritméticas) propone el nivel.
+             - Presupuesto de TTFT: si la media móvil del tiempo hasta el primer
+               token del nivel propuesto lo supera, se baja a uno más rápido.
+             - Escalado: la respuesta del modelo pequeño se retiene hasta su
+               primera frase; si llega vacía, es un error o es evasiva ("no
+               estoy seguro...") se repite la pregunta en el nivel siguiente sin
+               que el usuario oiga la primera.
+             - Estadísticas de uso y latencia por nivel.
+"""
+
+from domain.services import ILLMService, ITracer
+from infrastructure.llm.cached_llm_service import normalizar
+from infrastructure.llm.llm_service import RESPUESTAS_DE_ERROR
+from typing import Callable, Generator
+import re
+import threading
+import time
+
+PEQUENO = "pequeno"
+NORMAL = "normal"
+GRANDE = "grande"
+NIVELES = (PEQUENO, NORMAL, GRANDE)
+
+MODELOS_POR_DEFECTO = {PEQUENO: "phi3:mini", GRANDE: "mixtral"}
+SEPARADOR_PREGUNTA = "La pregunta del usuario es:"
+
+# Patrones sobre el texto normalizado (sin tildes ni signos).
+_ARITMETICA = re.compile(r"\b\d+\s*(mas|menos|por|entre|x|[-+*/])\s*\d+\b")
+_SIMPLE = re.compile(r"^(cuanto (es|son|vale)|que (hora|dia)|como se (dice|escribe)|quien (es|fue)|"
+                     r"cual es (la capital|el plural|el sinonimo)|define|deletrea|traduce|di)\b")
+_COMPLEJA = re.compile(r"\b(explica\w*|analiza\w*|compara\w*|diferencias?|por que|resume\w*|redacta\w*|"
+                       r"escribe\w*|programa\w*|codigo|funcion|algoritmo|clausula|contrato|ley|"
+                       r"ventajas|desventajas|estrategia|plan|ensayo|argumenta\w*|demuestra\w*|"
+                       r"evalua\w*|paso a paso|detalladamente|como funciona)\b")
+# Fórmulas de negativa; se buscan en cada fragmento entre signos de puntuación,
+# de modo que "No se preocupe, son las 4" o "Lo siento, son las 5" no cuentan.
+_EVASIVA = re.compile(r"^no (lo )?se$|\bno (lo )?se (la respuesta|responder|que (decir|responder|contestar)|decir\w*)\b|"
+                      r"\bno (puedo|sabria) (responder|decir\w*|ayudar\w*|contestar\w*)\b|"
+                      r"\bno estoy segur[oa]\b|\bno tengo (suficiente )?informacion\b|\bno tengo acceso\b|"
+                      r"\b(como|soy) (un )?modelo de lenguaje\b|\bsoy una ia\b|^desconozco\b")
+
+def clasificar_complejidad(texto: str) -> str:
+    """
+    @function clasificar_complejidad
+    @param {str} texto - Pregunta del usuario (sin el prompt de sistema).
+    @returns {str} - PEQUENO, NORMAL o GRANDE.
+    """
+    texto = normalizar(texto)
+    palabras = len(texto.split())
+    complejas = len(_COMPLEJA.findall(texto))
+    if not complejas and palabras <= 12 and (_ARITMETICA.search(texto) or _SIMPLE.search(texto)):
+        return PEQUENO
+    puntos = 2 * complejas + (palabras > 15) + (palabras > 30)
+    if puntos >= 2:
+        return GRANDE
+    if puntos == 0 and palabras <= 6:
+        return PEQUENO
+    return NORMAL
+
+
+def es_evasiva(respuesta: str) -> bool:
+    """
+    @function es_evasiva
+    @returns {bool} - True si la respuesta está vacía, es un error del servicio o esquiva la pregunta.
+    """
+    respuesta = respuesta.strip()
+    if not respuesta or respuesta in RESPUESTAS_DE_ERROR:
+        return True
+    return any(_EVASIVA.search(normalizar(fragmento)) for fragmento in re.split(r"[.,;:!?¡¿\n]+", respuesta))
+
+
+class ModelRouterLLMService(ILLMService):
+    """
+    @class ModelRouterLLMService
+    @description Envuelve uno o varios ILLMService y decide, pregunta a pregunta,
+                 qué modelo la responde. El nivel NORMAL usa el modelo que pida
+                 quien llama, así que sin otros niveles se comporta como 'inner'.
+    """
+    def __init__(self, inner: ILLMService, modelos: dict | None = None, servicios: dict | None = None,
+                 presupuesto_ttft=1.5, ventana_evasiva=120, refresco=10,
+                 clasificador: Callable[[str], str] = clasificar_complejidad,
+                 separador=SEPARADOR_PREGUNTA, tracer: ITracer | None = None):
+        """
+        @param {ILLMService} inner - Servicio por defecto de todos los niveles.
+        @param {dict | None} modelos - Nivel → nombre del modelo (PEQUENO y GRANDE).
+        @param {dict | None} servicios - Nivel → ILLMService propio (otro Ollama, un stub...).
+        @param {float} presupuesto_ttft - Segundos máximos esperados hasta el primer token.
+        @param {int} ventana_evasiva - Caracteres del modelo pequeño que se retienen como
+               máximo antes de decidir si escalar (o hasta el final de la primera frase).
+        @param {int} refresco - Cada cuántas degradaciones de un nivel se usa igualmente
+               para volver a medir su TTFT.
+        @param {str} separador - Marca tras la que va la pregunta dentro del prompt.
+        """
+        print("Inicializando ModelRouterLLMService...")
+        self.inner = inner
+        self.modelos = {**MODELOS_POR_DEFECTO, **(modelos or {})}
+        self.servicios = {nivel: (servicios or {}).get(nivel, inner) for nivel in NIVELES}
+        self.presupuesto_ttft = presupuesto_ttft
+        self.ventana_evasiva = ventana_evasiva
+        self.refresco = refresco
+        self.clasificador = clasificador
+        self.separador = separador
+        self.tracer = tracer
+        self._lock = threading.Lock()
+        self._ttft_medio = {nivel: None for nivel in NIVELES}
+        self._cancelaciones = 0
+        self.stats = {nivel: {"propuestas": 0, "peticiones": 0, "escaladas": 0, "degradadas": 0,
+                              "fuera_de_presupuesto": 0, "ttft_total_s": 0.0, "duracion_total_s": 0.0,
+                              "respondidas": 0}
+                      for nivel in NIVELES}
+
+    # --- Elección del nivel ------------------------------------------------
+
+    def _elegir(self, texto: str) -> str:
+        propuesto = self.clasificador(texto)
+        with self._lock:
+            self.stats[propuesto]["propuestas"] += 1
+            nivel = propuesto
+            # Se baja mientras la media del nivel no quepa en el presupuesto.
+            while nivel != PEQUENO and (self._ttft_medio[nivel] or 0.0) > self.presupuesto_ttft:
+                stats = self.stats[nivel]
+                stats["degradadas"] += 1
+                if stats["degradadas"] % self.refresco == 0:
+                    break
+                nivel = NIVELES[NIVELES.index(nivel) - 1]
+        if nivel != propuesto:
+            print(f"⏱️  Nivel '{propuesto}' fuera del presupuesto de TTFT; se usa '{nivel}'.")
+        return nivel
+
+    def _modelo(self, nivel: str, model: str) -> str:
+        return model if nivel == NORMAL else self.modelos.get(nivel, model)
+
+    def _registrar(self, nivel: str, ttft: float | None, duracion: float):
+        with self._lock:
+            stats = self.stats[nivel]
+            stats["duracion_total_s"] += duracion
+            if ttft is None:
+                return
+            stats["respondidas"] += 1
+            stats["ttft_total_s"] += ttft
+            if ttft > self.presupuesto_ttft:
+                stats["fuera_de_presupuesto"] += 1
+            previo = self._ttft_medio[nivel]
+            self._ttft_medio[nivel] = ttft if previo is None else 0.8 * previo + 0.2 * ttft
+
+    # --- Streaming ----------------------------------------------------------
+
+    def _pregunta(self, prompt: str | None, mensajes: list[dict] | None) -> str:
+        """
+        Método privado: el texto que se clasifica. En una conversación es el último
+        mensaje del usuario; el historial viaja completo a cualquier nivel.
+        """
+        if mensajes is not None:
+            return next((m["content"] for m in reversed(mensajes) if m["role"] == "user"), "")
+        return prompt.rsplit(self.separador, 1)[-1]
+
+    def stream_preguntar_a_jarvis(self, prompt: str, model: str = "mistral") -> Generator[str, None, None]:
+        return self._responder(self._pregunta(prompt, None), lambda nivel: self.servicios[nivel].stream_preguntar_a_jarvis(
+            prompt, self._modelo(nivel, model)))
+
+    def stream_conversar(self, mensajes: list[dict], model: str = "mistral") -> Generator[str, None, None]:
+        return self._responder(self._pregunta(None, mensajes), lambda nivel: self.servicios[nivel].stream_conversar(
+            mensajes, self._modelo(nivel, model)))
+
+    def stream_cancelable(self, prompt: str, model: str = "mistral",
+                          mensajes: list[dict] | None = None) -> tuple[Generator[str, None, None], Callable[[], None]]:
+        cancelado = threading.Event()
+        abiertos = []
+
+        def _abrir(nivel: str) -> Generator[str, None, None]:
+            generador, cancelar = self.servicios[nivel].stream_cancelable(prompt, self._modelo(nivel, model), mensajes)
+            abiertos.append(cancelar)
+            # Los niveles se abren al recorrer el stream: puede que ya esté cancelado.
+            if cancelado.is_set():
+                cancelar()
+            return generador
+
+        def _cancelar():
+            cancelado.set()
+            for cancelar in list(abiertos):
+                cancelar()
+        return self._responder(self._pregunta(prompt, mensajes), _abrir, cancelado), _cancelar
+
+    def _responder(self, pregunta: str, abrir: Callable[[str], Generator],
+                   cancelado: threading.Event | None = None) -> Generator[str, None, None]:
+        nivel = self._elegir(pregunta)
+        if self.tracer:
+            self.tracer.registrar("nivel_modelo", NIVELES.index(nivel))
+        cancelaciones = self._cancelaciones
+        while True:
+            # Solo se vigila al modelo pequeño; los demás hablan directamente.
+            retenido = yield from self._stream_nivel(nivel, abrir, retener=nivel == PEQUENO)
+            if (retenido is None or cancelaciones != self._cancelaciones
+                    or (cancelado is not None and cancelado.is_set())):
+                return
+            siguiente = NIVELES[NIVELES.index(nivel) + 1]
+            with self._lock:
+                self.stats[nivel]["escaladas"] += 1
+            print(f"🔼 Respuesta evasiva del nivel '{nivel}' ({retenido.strip()[:40]!r}); se pregunta a '{siguiente}'.")
+            if self.tracer:
+                self.tracer.marcar("escalado_modelo")
+            nivel = siguiente
+
+    def _stream_nivel(self, nivel: str, abrir: Callable[[str], Generator], retener: bool):
+        """
+        Método privado: reenvía el stream de un nivel. Con 'retener', guarda el
+        principio hasta poder juzgarlo y devuelve el texto retenido si hay que
+        escalar (None si la respuesta se entregó).
+        """
+        with self._lock:
+            self.stats[nivel]["peticiones"] += 1
+        inicio = time.perf_counter()
+        ttft = None
+        retenido = [] if retener else None
+        generador = abrir(nivel)
+        try:
+            for chunk in generador:
+                if ttft is None and chunk:
+                    ttft = time.perf_counter() - inicio
+                if retenido is None:
+                    yield chunk
+                    continue
+                retenido.append(chunk)
+                texto = "".join(retenido)
+                if len(texto) >= self.ventana_evasiva or re.search(r"[.!?¿¡]\s", texto):
+                    if es_evasiva(texto):
+                        return texto
+                    retenido = None
+                    yield texto
+        finally:
+            generador.close()
+            self._registrar(nivel, ttft, time.perf_counter() - inicio)
+        if retenido is None:
+            return None
+        texto = "".join(retenido)
+        if es_evasiva(texto):
+            return texto
+        yield texto
+        return None
+
+    def cancelar(self):
+        self._cancelaciones += 1
+        for servicio in {id(s): s for s in self.servicios.values()}.values():
+            servicio.cancelar()
+
+    def estadisticas(self) -> dict:
+        """
+        @returns {dict} - Por nivel: modelo, uso, escaladas, degradaciones por presupuesto y latencias.
+        """
+        with self._lock:
+            resultado = {"presupuesto_ttft_s": self.presupuesto_ttft}
+            for nivel in NIVELES:
+                stats = self.stats[nivel]
+                respondidas = max(stats["respondidas"], 1)
+                resultado[nivel] = {**stats, "modelo": self.modelos.get(nivel),
+                                    "ttft_medio_s": stats["ttft_total_s"] / respondidas,
+                                    "ttft_movil_s": self._ttft_medio[nivel],
+                                    "duracion_media_s": stats["duracion_total_s"] / max(stats["peticiones"], 1)}
+            return resultado
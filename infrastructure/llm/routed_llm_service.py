@@ -0,0 +1,362 @@
+"""
+@fileoverview Enrutado del LLM entre varias instancias de Ollama.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Implementa ILLMService delante de una lista de backends Ollama:
+             - Reparto por menor número de peticiones en curso, prefiriendo los
+               backends sanos y con el modelo ya cargado en memoria.
+             - Sondas periódicas a '/api/tags' (salud) y '/api/ps' (modelos cargados).
+             - Circuit breaker por backend: tras varios fallos seguidos deja de
+               usarse durante un enfriamiento y luego admite una única prueba.
+             - Afinidad: los turnos de una misma conversación vuelven al backend
+               que ya tiene su prefijo en la caché KV.
+             - Peticiones de cobertura (hedging): si el primer token no llega en
+               el plazo, se lanza la misma petición en otro backend y se queda la
+               que responda antes; la otra se cancela. Si un backend falla antes
+               del primer token, se pasa al siguiente sin que el usuario lo note.
+"""
+
+from domain.services import ILLMService, ITracer
+from infrastructure.llm.llm_service import OllamaLLMService, RESPUESTA_SIN_CONEXION, RESPUESTAS_DE_ERROR
+from collections import OrderedDict
+from typing import Callable, Generator
+import queue
+import threading
+import time
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+MAX_AFINIDADES = 64
+
+# Marcas privadas que los hilos de cada intento dejan en la cola del turno.
+_FALLO = object()
+_FIN = object()
+
+class _Backend:
+    """Estado privado de un backend: carga, salud, modelos cargados y circuit breaker."""
+    def __init__(self, servicio: OllamaLLMService):
+        self.servicio = servicio
+        self.base_url = servicio.url.rsplit("/api/", 1)[0]
+        self.en_curso = 0
+        self.sano = True
+        self.modelos_cargados = set()
+        self.estado = CERRADO
+        self.fallos_seguidos = 0
+        self.abierto_hasta = 0.0
+        self.ttft_medio = None
+        self.stats = {"peticiones": 0, "fallos": 0, "ganadas": 0, "coberturas_perdidas": 0}
+
+    def tiene_cargado(self, model: str) -> bool:
+        return any(nombre == model or nombre.split(":")[0] == model for nombre in self.modelos_cargados)
+
+
+class _Intento:
+    """Una petición concreta a un backend dentro de un turno."""
+    __slots__ = ("backend", "inicio", "cancelar", "descartado", "terminado")
+
+    def __init__(self, backend: _Backend):
+        self.backend = backend
+        self.inicio = time.perf_counter()
+        self.cancelar = None
+        self.descartado = False
+        self.terminado = False
+
+
+class RoutedLLMService(ILLMService):
+    """
+    @class RoutedLLMService
+    @description Reparte las peticiones entre varios OllamaLLMService con sondas,
+                 circuit breaker y peticiones de cobertura.
+    """
+    def __init__(self, urls: list[str], plazo_primer_token=1.5, umbral_fallos=3, enfriamiento=15.0,
+                 intervalo_sondeo=5.0, timeout_sondeo=1.0, tracer: ITracer | None = None):
+        """
+        @param {list[str]} urls - Endpoints '/api/generate' de cada instancia de Ollama.
+        @param {float} plazo_primer_token - Segundos sin primer token antes de lanzar la cobertura.
+        @param {int} umbral_fallos - Fallos seguidos que abren el circuito de un backend.
+        @param {float} enfriamiento - Segundos que un circuito abierto deja fuera al backend.
+        @param {float} intervalo_sondeo - Segundos entre sondas; 0 las desactiva.
+        @param {float} timeout_sondeo - Timeout de cada petición de sonda.
+        @param {ITracer | None} tracer - Se comparte con todos los backends.
+        """
+        print(f"Inicializando RoutedLLMService con {len(urls)} backend(s)...")
+        self.backends = [_Backend(OllamaLLMService(url=url, tracer=tracer)) for url in urls]
+        self.plazo_primer_token = plazo_primer_token
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.timeout_sondeo = timeout_sondeo
+        self._lock = threading.Lock()
+        self._intentos = set()
+        self._afinidad = OrderedDict()
+        self.stats = {"turnos": 0, "coberturas": 0, "failovers": 0, "sin_backend": 0}
+        self._detenido = threading.Event()
+        if intervalo_sondeo > 0:
+            threading.Thread(target=self._bucle_sondeo, args=(intervalo_sondeo,),
+                             name="sondas-llm", daemon=True).start()
+
+    # --- Sondas de salud -------------------------------------------------
+
+    def _bucle_sondeo(self, intervalo: float):
+        while True:
+            self.sondear()
+            if self._detenido.wait(intervalo):
+                return
+
+    def sondear(self):
+        """Consulta '/api/tags' y '/api/ps' de cada backend y actualiza su estado."""
+        for backend in self.backends:
+            try:
+                sesion = backend.servicio.session
+                sesion.get(f"{backend.base_url}/api/tags", timeout=self.timeout_sondeo).raise_for_status()
+                respuesta = sesion.get(f"{backend.base_url}/api/ps", timeout=self.timeout_sondeo)
+                respuesta.raise_for_status()
+                modelos = {m.get("name", "") for m in respuesta.json().get("models", [])}
+                sano = True
+            except Exception:
+                modelos, sano = set(), False
+            with self._lock:
+                if backend.sano != sano:
+                    print(f"{'💚' if sano else '💔'} Backend {backend.base_url} {'recuperado' if sano else 'no responde'}.")
+                backend.sano = sano
+                backend.modelos_cargados = modelos
+
+    def detener(self):
+        self._detenido.set()
+
+    # --- Selección y circuit breaker ------------------------------------
+
+    def _disponible(self, backend: _Backend, ahora: float) -> bool:
+        """Con el lock tomado: aplica el circuit breaker."""
+        if backend.estado == ABIERTO and ahora >= backend.abierto_hasta:
+            backend.estado = SEMIABIERTO
+        if backend.estado == SEMIABIERTO:
+            return backend.en_curso == 0  # Una sola petición de prueba.
+        return backend.estado == CERRADO
+
+    def _elegir(self, model: str, excluidos: set, preferido: _Backend | None = None) -> _Backend | None:
+        ahora = time.perf_counter()
+        with self._lock:
+            candidatos = [b for b in self.backends if b not in excluidos and self._disponible(b, ahora)]
+            if not candidatos:
+                return None
+            # Los no sanos solo se usan si no queda otro remedio. Una conversación
+            # vuelve a su backend anterior, que conserva en caché su prefijo.
+            mejor = min(candidatos, key=lambda b: (not b.sano, b is not preferido, not b.tiene_cargado(model), b.en_curso,
+                                                   b.ttft_medio if b.ttft_medio is not None else 0.0))
+            mejor.en_curso += 1
+            mejor.stats["peticiones"] += 1
+            return mejor
+
+    def _registrar_fallo(self, backend: _Backend):
+        with self._lock:
+            backend.stats["fallos"] += 1
+            backend.fallos_seguidos += 1
+            if backend.estado == SEMIABIERTO or backend.fallos_seguidos >= self.umbral_fallos:
+                backend.estado = ABIERTO
+                backend.abierto_hasta = time.perf_counter() + self.enfriamiento
+                print(f"🔌 Circuito abierto para {backend.base_url} durante {self.enfriamiento:.0f} s.")
+
+    def _registrar_ttft(self, backend: _Backend, ttft: float):
+        """Con el lock tomado: media móvil del tiempo hasta el primer token."""
+        backend.ttft_medio = ttft if backend.ttft_medio is None else 0.8 * backend.ttft_medio + 0.2 * ttft
+
+    def _registrar_primer_token(self, backend: _Backend, ttft: float):
+        with self._lock:
+            backend.stats["ganadas"] += 1
+            backend.fallos_seguidos = 0
+            if backend.estado != CERRADO:
+                print(f"🔌 Circuito cerrado de nuevo para {backend.base_url}.")
+            backend.estado = CERRADO
+            self._registrar_ttft(backend, ttft)
+
+    # --- Streaming --------------------------------------------------------
+
+    def _consumir(self, intento: _Intento, prompt: str | None, mensajes: list[dict] | None, model: str,
+                  cola: queue.Queue):
+        """Hilo de un intento: reenvía sus chunks a la cola del turno."""
+        generador, intento.cancelar = intento.backend.servicio.stream_cancelable(prompt, model, mensajes)
+        if intento.descartado:
+            intento.cancelar()
+        try:
+            primero = True
+            for chunk in generador:
+                if intento.descartado:
+                    break
+                if primero and chunk in RESPUESTAS_DE_ERROR:
+                    cola.put((intento, _FALLO))
+                    break
+                primero = False
+                cola.put((intento, chunk))
+        finally:
+            generador.close()
+            with self._lock:
+                intento.backend.en_curso -= 1
+            cola.put((intento, _FIN))
+
+    def _lanzar(self, prompt: str | None, mensajes: list[dict] | None, model: str, cola: queue.Queue,
+                excluidos: set) -> _Intento | None:
+        clave = self._clave_afinidad(mensajes)
+        backend = self._elegir(model, excluidos, self._afinidad.get(clave))
+        if backend is None:
+            return None
+        if clave is not None:
+            with self._lock:
+                self._afinidad[clave] = backend
+                self._afinidad.move_to_end(clave)
+                if len(self._afinidad) > MAX_AFINIDADES:
+                    self._afinidad.popitem(last=False)
+        excluidos.add(backend)
+        intento = _Intento(backend)
+        with self._lock:
+            self._intentos.add(intento)
+        threading.Thread(target=self._consumir, args=(intento, prompt, mensajes, model, cola),
+                         name="llm-intento", daemon=True).start()
+        return intento
+
+    @staticmethod
+    def _clave_afinidad(mensajes: list[dict] | None) -> str | None:
+        """Identifica una conversación por su comienzo (sistema y primer mensaje)."""
+        if not mensajes:
+            return None
+        return "\x1f".join(m["content"] for m in mensajes[:2])
+
+    def _descartar(self, intento: _Intento):
+        intento.descartado = True
+        if intento.cancelar is not None:
+            # Cerrar la respuesta puede bloquear hasta que llegue el siguiente chunk:
+            # se hace aparte para no retrasar el stream ganador.
+            threading.Thread(target=intento.cancelar, name="llm-cancelar", daemon=True).start()
+
+    def stream_preguntar_a_jarvis(self, prompt: str, model: str = "mistral") -> Generator[str, None, None]:
+        return self._stream_enrutado(prompt, None, model)
+
+    def stream_conversar(self, mensajes: list[dict], model: str = "mistral") -> Generator[str, None, None]:
+        return self._stream_enrutado(None, mensajes, model)
+
+    def stream_cancelable(self, prompt: str, model: str = "mistral",
+                          mensajes: list[dict] | None = None) -> tuple[Generator[str, None, None], Callable[[], None]]:
+        """La función devuelta descarta solo los intentos de este turno."""
+        lanzados = []
+        cancelado = threading.Event()
+
+        def _cancelar():
+            cancelado.set()
+            for intento in list(lanzados):
+                self._descartar(intento)
+        return self._stream_enrutado(None if mensajes is not None else prompt, mensajes, model,
+                                     lanzados, cancelado), _cancelar
+
+    def _stream_enrutado(self, prompt: str | None, mensajes: list[dict] | None, model: str,
+                         lanzados: list | None = None, cancelado: threading.Event | None = None) -> Generator[str, None, None]:
+        cola = queue.Queue()
+        excluidos = set()
+        lanzados = [] if lanzados is None else lanzados
+
+        def _anotar(intento: _Intento):
+            lanzados.append(intento)
+            # Una cancelación de este turno pudo llegar mientras se lanzaba.
+            if cancelado is not None and cancelado.is_set():
+                self._descartar(intento)
+
+        if cancelado is not None and cancelado.is_set():
+            return
+        with self._lock:
+            self.stats["turnos"] += 1
+        try:
+            intento = self._lanzar(prompt, mensajes, model, cola, excluidos)
+            if intento is None:
+                with self._lock:
+                    self.stats["sin_backend"] += 1
+                yield RESPUESTA_SIN_CONEXION
+                return
+            _anotar(intento)
+            vivos = 1
+            ganador = None
+            plazo = intento.inicio + self.plazo_primer_token
+
+            while True:
+                espera = max(0.0, plazo - time.perf_counter()) if plazo is not None else None
+                try:
+                    intento, chunk = cola.get(timeout=espera)
+                except queue.Empty:
+                    # Sin primer token en el plazo: cobertura en otro backend.
+                    plazo = None
+                    cobertura = self._lanzar(prompt, mensajes, model, cola, excluidos)
+                    if cobertura is not None:
+                        _anotar(cobertura)
+                        vivos += 1
+                        with self._lock:
+                            self.stats["coberturas"] += 1
+                        print(f"⏱️  Sin primer token en {self.plazo_primer_token:.1f} s; "
+                              f"cobertura en {cobertura.backend.base_url}.")
+                    continue
+
+                if chunk is _FIN:
+                    vivos -= 1
+                    intento.terminado = True
+                    if intento is ganador:
+                        return
+                    if ganador is None and vivos == 0:
+                        if intento.descartado:
+                            return  # Turno cancelado antes del primer token.
+                        # Todos los intentos fallaron antes del primer token: siguiente backend.
+                        siguiente = self._lanzar(prompt, mensajes, model, cola, excluidos)
+                        if siguiente is None:
+                            yield RESPUESTA_SIN_CONEXION
+                            return
+                        _anotar(siguiente)
+                        vivos += 1
+                        plazo = siguiente.inicio + self.plazo_primer_token
+                        with self._lock:
+                            self.stats["failovers"] += 1
+                    continue
+                if chunk is _FALLO:
+                    self._registrar_fallo(intento.backend)
+                    continue
+                if intento.descartado:
+                    continue
+                if ganador is None:
+                    ganador = intento
+                    plazo = None
+                    self._registrar_primer_token(intento.backend, time.perf_counter() - intento.inicio)
+                    for otro in lanzados:
+                        if otro is not ganador and not otro.terminado:
+                            with self._lock:
+                                otro.backend.stats["coberturas_perdidas"] += 1
+                                # Lo que lleva esperando es una cota inferior de su TTFT.
+                                self._registrar_ttft(otro.backend, time.perf_counter() - otro.inicio)
+                            self._descartar(otro)
+                if intento is ganador:
+                    yield chunk
+        finally:
+            for intento in lanzados:
+                self._descartar(intento)
+                with self._lock:
+                    self._intentos.discard(intento)
+
+    def warm_up(self, model: str = "mistral") -> bool:
+        """Precarga el modelo en todos los backends en paralelo."""
+        resultados = [False] * len(self.backends)
+
+        def _precargar(i, backend):
+            resultados[i] = backend.servicio.warm_up(model)
+
+        hilos = [threading.Thread(target=_precargar, args=(i, b), daemon=True) for i, b in enumerate(self.backends)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return any(resultados)
+
+    def cancelar(self):
+        with self._lock:
+            intentos = list(self._intentos)
+        for intento in intentos:
+            self._descartar(intento)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {**self.stats, "backends": {
+                b.base_url: {**b.stats, "estado": b.estado, "sano": b.sano, "en_curso": b.en_curso,
+                             "ttft_medio_s": b.ttft_medio} for b in self.backends}}
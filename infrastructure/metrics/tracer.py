@@ -0,0 +1,146 @@
+"""
+@fileoverview Trazado de latencia por turno con exportación JSONL y Prometheus.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Implementa ITracer. Cada turno registra los instantes de sus hitos
+             (hotword, acuse, STT final, primer token, primera frase, fin) y
+             medidas como tokens/s. Al cerrar el turno se escribe una línea en
+             un JSONL rotativo y se actualiza un fichero de texto de Prometheus
+             con los percentiles p50/p95 de una ventana móvil. Marcar un evento
+             solo cuesta una lectura de reloj y una inserción en un diccionario.
+"""
+
+from domain.services import ITracer
+from collections import defaultdict, deque
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+
+# Fases derivadas: (nombre, evento inicial, evento final). 'hotword' es el origen.
+FASES = (
+    ("acuse", "hotword", "acuse"),
+    ("stt", "acuse", "stt_final"),
+    ("ttft_llm", "stt_final", "primer_token"),
+    ("segmentacion", "primer_token", "primera_frase_encolada"),
+    ("arranque_tts", "primera_frase_encolada", "primera_frase"),
+    ("hasta_primera_frase", "hotword", "primera_frase"),
+    ("turno", "hotword", "fin"),
+)
+
+class JsonlTracer(ITracer):
+    """
+    @class JsonlTracer
+    @description Tracer de producción: JSONL rotativo más fichero Prometheus.
+    """
+    def __init__(self, ruta_jsonl="metrics/turnos.jsonl", ruta_prometheus="metrics/jarvis.prom",
+                 max_bytes=5 * 1024 * 1024, copias=3, ventana=500):
+        """
+        @param {str} ruta_jsonl - Fichero donde se escribe una línea por turno.
+        @param {str | None} ruta_prometheus - Fichero de texto para el textfile collector.
+        @param {int} max_bytes - Tamaño a partir del cual rota el JSONL.
+        @param {int} copias - Ficheros rotados que se conservan.
+        @param {int} ventana - Turnos recientes usados para los percentiles.
+        """
+        os.makedirs(os.path.dirname(ruta_jsonl) or ".", exist_ok=True)
+        self.ruta_prometheus = ruta_prometheus
+        self._logger = logging.getLogger(f"jarvis.trazas.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        handler = logging.handlers.RotatingFileHandler(ruta_jsonl, maxBytes=max_bytes,
+                                                       backupCount=copias, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger.addHandler(handler)
+
+        self._lock = threading.Lock()
+        self._turno = None
+        self._historial = defaultdict(lambda: deque(maxlen=ventana))
+        self._resultados = defaultdict(int)
+
+    def iniciar_turno(self, instante: float | None = None):
+        ahora = time.perf_counter()
+        with self._lock:
+            anterior = self._turno
+            inicio = instante if instante is not None else ahora
+            self._turno = {"inicio": inicio, "inicio_unix": time.time() - (ahora - inicio),
+                           "eventos": {"hotword": 0.0}, "medidas": {}}
+        if anterior is not None:
+            self._cerrar(anterior, "interrumpido", ahora)
+
+    def marcar(self, evento: str):
+        ahora = time.perf_counter()
+        with self._lock:
+            if self._turno is not None and evento not in self._turno["eventos"]:
+                self._turno["eventos"][evento] = ahora - self._turno["inicio"]
+
+    def registrar(self, nombre: str, valor: float):
+        with self._lock:
+            if self._turno is not None:
+                self._turno["medidas"][nombre] = valor
+
+    def finalizar_turno(self, resultado: str = "ok"):
+        ahora = time.perf_counter()
+        with self._lock:
+            turno, self._turno = self._turno, None
+        if turno is not None:
+            self._cerrar(turno, resultado, ahora)
+
+    def _cerrar(self, turno: dict, resultado: str, ahora: float):
+        """Método privado: calcula las fases, escribe la traza y refresca los percentiles."""
+        eventos = turno["eventos"]
+        eventos.setdefault("fin", ahora - turno["inicio"])
+        fases = {nombre: eventos[fin] - eventos[ini]
+                 for nombre, ini, fin in FASES if ini in eventos and fin in eventos}
+        registro = {"inicio": round(turno["inicio_unix"], 3), "resultado": resultado,
+                    "eventos": {k: round(v, 4) for k, v in eventos.items()},
+                    "fases": {k: round(v, 4) for k, v in fases.items()},
+                    "medidas": turno["medidas"]}
+        with self._lock:
+            self._resultados[resultado] += 1
+            for nombre, valor in fases.items():
+                self._historial[("fase", nombre)].append(valor)
+            for nombre, valor in turno["medidas"].items():
+                self._historial[("medida", nombre)].append(valor)
+            texto = self._exportacion_prometheus()
+        try:
+            self._logger.info(json.dumps(registro, ensure_ascii=False))
+            if self.ruta_prometheus:
+                temporal = f"{self.ruta_prometheus}.tmp"
+                with open(temporal, "w", encoding="utf-8") as f:
+                    f.write(texto)
+                os.replace(temporal, self.ruta_prometheus)
+        except OSError as e:
+            print(f"No se pudo exportar la traza del turno: {e}")
+
+    @staticmethod
+    def _percentil(ordenados: list, q: float) -> float:
+        return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+    def _exportacion_prometheus(self) -> str:
+        lineas = ["# HELP jarvis_turnos_total Turnos completados por resultado.",
+                  "# TYPE jarvis_turnos_total counter"]
+        for resultado, total in sorted(self._resultados.items()):
+            lineas.append(f'jarvis_turnos_total{{resultado="{resultado}"}} {total}')
+        metricas = (("fase", "jarvis_fase_segundos", "Latencia por fase del turno (ventana móvil)."),
+                    ("medida", "jarvis_medida", "Medidas por turno como tokens/s (ventana móvil)."))
+        for tipo, metrica, ayuda in metricas:
+            lineas += [f"# HELP {metrica} {ayuda}", f"# TYPE {metrica} summary"]
+            for (t, nombre), valores in sorted(self._historial.items()):
+                if t != tipo or not valores:
+                    continue
+                ordenados = sorted(valores)
+                for q in (0.5, 0.95):
+                    lineas.append(f'{metrica}{{nombre="{nombre}",quantile="{q}"}} '
+                                  f'{self._percentil(ordenados, q):.6f}')
+                lineas.append(f'{metrica}_count{{nombre="{nombre}"}} {len(ordenados)}')
+        return "\n".join(lineas) + "\n"
+
+    def percentiles(self) -> dict:
+        """
+        @returns {dict} - p50/p95 de cada fase y medida en la ventana actual.
+        """
+        with self._lock:
+            return {nombre: {"p50": self._percentil(sorted(v), 0.5), "p95": self._percentil(sorted(v), 0.95)}
+                    for (_, nombre), v in self._historial.items() if v}
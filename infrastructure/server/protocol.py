@@ -0,0 +1,54 @@
+"""
+@fileoverview Protocolo de tramas del modo servidor sobre TCP.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Cada trama es: 1 byte de tipo, 4 bytes de longitud (big-endian) y
+             la carga. Se usa TCP de la librería estándar en lugar de WebSocket
+             para no añadir dependencias; un puente WebSocket podría traducir
+             tramas una a una.
+             Cliente → servidor: HOLA (JSON con samplerate y canales), AUDIO (PCM
+             int16 entrelazado) y FIN. Servidor → cliente: CONTROL (JSON: estado,
+             texto dicho, orden de detener el audio, errores) y AUDIO (4 bytes
+             de frecuencia seguidos de PCM int16 mono).
+"""
+
+import asyncio
+import json
+import struct
+
+HOLA = b"H"
+AUDIO = b"A"
+CONTROL = b"C"
+FIN = b"E"
+
+_CABECERA = struct.Struct(">cI")
+MAX_CARGA = 16 * 1024 * 1024
+
+def empaquetar(tipo: bytes, carga: bytes = b"") -> bytes:
+    return _CABECERA.pack(tipo, len(carga)) + carga
+
+
+def empaquetar_control(mensaje: dict) -> bytes:
+    return empaquetar(CONTROL, json.dumps(mensaje, ensure_ascii=False).encode("utf-8"))
+
+
+def empaquetar_audio(pcm: bytes, samplerate: int) -> bytes:
+    return empaquetar(AUDIO, struct.pack(">I", samplerate) + pcm)
+
+
+def desempaquetar_audio(carga: bytes) -> tuple[bytes, int]:
+    """@returns {tuple[bytes, int]} - PCM y frecuencia de una trama AUDIO del servidor."""
+    return carga[4:], struct.unpack(">I", carga[:4])[0]
+
+
+async def leer_trama(reader: asyncio.StreamReader) -> tuple[bytes, bytes] | None:
+    """
+    @returns {tuple[bytes, bytes] | None} - (tipo, carga), o None si la conexión se cerró.
+    """
+    try:
+        tipo, longitud = _CABECERA.unpack(await reader.readexactly(_CABECERA.size))
+        if longitud > MAX_CARGA:
+            raise ValueError(f"Trama demasiado grande: {longitud} bytes")
+        return tipo, await reader.readexactly(longitud)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
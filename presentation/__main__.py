@@ -5,14 +5,19 @@
 @description Este script realiza el "ensamblaje" de la aplicación siguiendo el
              principio de Inyección de Dependencias. Crea las instancias de los
              servicios concretos y las pasa a los casos de uso, desacoplando
-             las capas del sistema.
+             las capas del sistema. Los servicios se inicializan en paralelo y
+             la GUI (PyQt5) solo se importa si se pide; con '--headless' el
+             asistente corre como demonio sin Qt.
 """
 
+import time
+INICIO_PROCESO = time.perf_counter()
+
 import sys
 import os
-import threading
+import argparse
 import queue
-from PyQt5.QtWidgets import QApplication
+import threading
 
 # --- Añadir la raíz del proyecto al path para que Python encuentre los módulos ---
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -21,35 +26,178 @@ if project_root not in sys.path:
 
 # --- Ensamblaje de la Aplicación (Dependency Injection) ---
 # 1. Importar las IMPLEMENTACIONES CONCRETAS desde infrastructure
+from infrastructure.audio.audio_capture import AudioCaptureService
 from infrastructure.audio.hotword_detector import VoskHotwordDetector
 from infrastructure.audio.stt_service import VoskSTTService
+from infrastructure.audio.command_grammar import CommandGrammar
+from infrastructure.audio.recognition_worker import RecognitionWorker, ProcessHotwordDetector, ProcessSTTService
 from infrastructure.audio.tts_service import Pyttsx3TTSService
 from infrastructure.llm.llm_service import OllamaLLMService
+from infrastructure.llm.cached_llm_service import CachedLLMService
+from infrastructure.llm.routed_llm_service import RoutedLLMService
+from infrastructure.llm.model_router_service import ModelRouterLLMService, MODELOS_POR_DEFECTO, PEQUENO, GRANDE
+from infrastructure.metrics.tracer import JsonlTracer
 
 # 2. Importar el CASO DE USO desde application
-from application.use_cases import start_assistant
+from application.use_cases import start_assistant, construir_prompt, FRASES_FIJAS, MODELO_POR_DEFECTO, PROMPT_SISTEMA
+from application.conversation import ConversationSession
+from application.local_intents import LocalIntents
+from application.speculative import SpeculativePrefetcher
+
+# 3. El arranque concurrente; la GUI se importa bajo demanda (ver _importar_gui)
+from presentation.startup import StartupOrchestrator
+
+def parse_args(argv=None):
+    """
+    @function parse_args
+    @description Opciones de línea de comandos del asistente.
+    """
+    parser = argparse.ArgumentParser(prog="python -m presentation", description="Asistente J.A.R.V.I.S.")
+    parser.add_argument("--especulativo", action="store_true",
+                        help="Lanza la petición al LLM a partir de los resultados parciales del STT.")
+    parser.add_argument("--barge-in", action="store_true",
+                        help="Permite interrumpir una respuesta diciendo la palabra clave.")
+    parser.add_argument("--niveles-audio", action="store_true",
+                        help="Anima la mascota con el nivel real de la voz en lugar de una onda fija.")
+    parser.add_argument("--headless", action="store_true",
+                        help="Ejecuta el asistente sin interfaz gráfica (no importa Qt).")
+    parser.add_argument("--sin-memoria", action="store_true",
+                        help="Cada pregunta se responde sin recordar los turnos anteriores.")
+    parser.add_argument("--sin-intenciones", action="store_true",
+                        help="Envía todos los comandos al LLM, sin el atajo local de hora, temporizadores, volumen...")
+    parser.add_argument("--gramatica", choices=["paralelo", "respaldo"],
+                        help="Reconoce primero con una gramática de comandos y usa el modelo completo "
+                             "en paralelo o solo como respaldo.")
+    parser.add_argument("--frases-gramatica", metavar="RUTA",
+                        help="JSON con frases extra para la gramática (contactos, dispositivos...); "
+                             "se recarga al modificarlo.")
+    parser.add_argument("--reconocimiento-aparte", action="store_true",
+                        help="Ejecuta el modelo VOSK (hotword y STT) en un proceso dedicado y supervisado.")
+    parser.add_argument("--ollama", action="append", metavar="URL",
+                        help="Endpoint '/api/generate' de Ollama; repetido, reparte entre varias instancias.")
+    parser.add_argument("--enrutar-modelos", action="store_true",
+                        help="Elige por pregunta entre un modelo pequeño, el de siempre y uno grande.")
+    parser.add_argument("--modelo-pequeno", default=MODELOS_POR_DEFECTO[PEQUENO], metavar="MODELO")
+    parser.add_argument("--modelo-grande", default=MODELOS_POR_DEFECTO[GRANDE], metavar="MODELO")
+    parser.add_argument("--presupuesto-ttft", type=float, default=1.5, metavar="S",
+                        help="Tiempo máximo esperado hasta el primer token al elegir el modelo.")
+    return parser.parse_args(argv)
 
-# 3. Importar la GUI desde presentation
-from presentation.mascot_gui import MascotWindow
+def _importar_gui():
+    """
+    @function _importar_gui
+    @description Importa PyQt5 y la mascota; se ejecuta en paralelo con el resto del arranque.
+    """
+    from PyQt5.QtWidgets import QApplication
+    from presentation.mascot_gui import MascotWindow
+    return QApplication, MascotWindow
 
 def main():
     """
     @function main
     @description Función principal que ensambla e inicia la aplicación J.A.R.V.I.S.
     """
+    args = parse_args()
     print("Ensamblando la aplicación J.A.R.V.I.S...")
-    
-    # --- Creación de Dependencias (Instancias de los servicios) ---
-    stt_service = VoskSTTService()
-    tts_service = Pyttsx3TTSService()
-    llm_service = OllamaLLMService()
-    hotword_detector = VoskHotwordDetector() # El callback se asignará dentro de start_assistant
-    
-    comm_queue = queue.Queue()
+    arranque = StartupOrchestrator(origen=INICIO_PROCESO)
+    arranque.anotar("importaciones", INICIO_PROCESO, time.perf_counter())
+
+    # Un único tracer recoge las latencias de todas las etapas de cada turno.
+    tracer = JsonlTracer()
+    comm_queue = None if args.headless else queue.Queue()
+    on_nivel_audio = None
+    if args.niveles_audio and comm_queue:
+        on_nivel_audio = lambda nivel: comm_queue.put({"audio_level": nivel})
+
+    # --- Creación de Dependencias (en paralelo) ---
+    # Un único servicio de captura comparte modelo VOSK y micrófono entre el
+    # detector de hotword y el STT. Su carga y la del motor de TTS (que enumera
+    # las voces del sistema) son independientes y se solapan.
+    gramatica = CommandGrammar() if args.gramatica else None
+    arranque.lanzar("tts", lambda: Pyttsx3TTSService(tracer=tracer, on_nivel_audio=on_nivel_audio))
+    if args.reconocimiento_aparte:
+        # El modelo se carga en el proceso de reconocimiento; aquí solo queda la captura.
+        arranque.lanzar("reconocimiento", lambda: RecognitionWorker(tracer=tracer, gramatica=gramatica,
+                                                                    modo_gramatica=args.gramatica or "paralelo").iniciar())
+        arranque.lanzar("stt", ProcessSTTService, "reconocimiento")
+        arranque.lanzar("hotword", ProcessHotwordDetector, "reconocimiento")
+    else:
+        arranque.lanzar("modelo_vosk", AudioCaptureService)
+        arranque.lanzar("stt", lambda capture: VoskSTTService(capture, tracer=tracer, gramatica=gramatica,
+                                                              modo_gramatica=args.gramatica), "modelo_vosk")
+        # El callback del detector se asignará dentro de start_assistant.
+        arranque.lanzar("hotword", VoskHotwordDetector, "modelo_vosk")
+    # Las frases fijas se renderizan una sola vez para que el acuse de
+    # activación suene en milisegundos tras el hotword.
+    arranque.lanzar("frases_fijas", lambda tts: tts.precalentar(FRASES_FIJAS), "tts")
+
+    # Precarga del modelo en segundo plano para que la primera pregunta no
+    # pague la carga en frío.
+    # Con varias instancias de Ollama, un enrutador reparte la carga y cubre las caídas.
+    if args.ollama and len(args.ollama) > 1:
+        ollama_service = RoutedLLMService(args.ollama, tracer=tracer)
+    elif args.ollama:
+        ollama_service = OllamaLLMService(url=args.ollama[0], tracer=tracer)
+    else:
+        ollama_service = OllamaLLMService(tracer=tracer)
+    llm_service = ollama_service
+    modelos_precarga = [MODELO_POR_DEFECTO]
+    if args.enrutar_modelos:
+        # Dentro de la caché: así sus TTFT no se mezclan con los aciertos de caché.
+        llm_service = ModelRouterLLMService(ollama_service, tracer=tracer, presupuesto_ttft=args.presupuesto_ttft,
+                                            modelos={PEQUENO: args.modelo_pequeno, GRANDE: args.modelo_grande})
+        # Se precargan todos los niveles, el pequeño primero (es el más rápido de
+        # cargar y el que atiende las preguntas simples); si no, la primera
+        # pregunta de cada nivel pagaría la carga en frío y falsearía su TTFT.
+        modelos_precarga = list(dict.fromkeys([args.modelo_pequeno, MODELO_POR_DEFECTO, args.modelo_grande]))
+    llm_service = CachedLLMService(llm_service, ruta_sqlite="cache/respuestas.sqlite3")
+    # Una sola tarea que los carga de uno en uno: no ocupa más hilos del pool de
+    # arranque ni obliga a Ollama a cargar varios modelos a la vez.
+    arranque.lanzar("warm_up_ollama", lambda: [ollama_service.warm_up(m) for m in modelos_precarga], bloqueante=False)
+    if not args.headless:
+        arranque.lanzar("importar_gui", _importar_gui)
+
+    listo = arranque.esperar()
+    print(f"⏱️  Desglose del arranque:\n{arranque.resumen()}")
+    print(f"✅ Jarvis listo en {listo:.2f} s desde el inicio del proceso.")
+
+    stt_service = arranque.resultado("stt")
+    tts_service = arranque.resultado("tts")
+    hotword_detector = arranque.resultado("hotword")
+
+    conversacion = None
+    if not args.sin_memoria:
+        conversacion = ConversationSession(llm_service, PROMPT_SISTEMA, model=MODELO_POR_DEFECTO, tracer=tracer)
+
+    locales = None if args.sin_intenciones else LocalIntents(tts_service)
+    intenciones = locales.router if locales else None
+    if gramatica:
+        # Las frases de las intenciones y las del archivo se pueden cambiar en caliente.
+        if intenciones:
+            gramatica.registrar("intenciones", intenciones.frases())
+        if args.frases_gramatica:
+            gramatica.vigilar(args.frases_gramatica)
+
+    prefetcher = None
+    if args.especulativo:
+        prefetcher = SpeculativePrefetcher(llm_service, construir_prompt, model=MODELO_POR_DEFECTO,
+                                           conversacion=conversacion)
 
     # --- Inyección de Dependencias y Arranque de Hilos ---
-    backend_args = (hotword_detector, stt_service, tts_service, llm_service, comm_queue)
-    
+    backend_args = (hotword_detector, stt_service, tts_service, llm_service, comm_queue, None, prefetcher,
+                    args.barge_in, tracer, conversacion, intenciones)
+
+    if args.headless:
+        print("Iniciando el backend de Jarvis en modo headless (Ctrl+C para salir)...")
+        try:
+            start_assistant(*backend_args)
+        except KeyboardInterrupt:
+            print("Jarvis detenido.")
+        finally:
+            if locales:
+                locales.detener()
+        return
+
     backend_thread = threading.Thread(
         target=start_assistant, 
         args=backend_args, 
@@ -60,11 +208,16 @@ def main():
     backend_thread.start()
 
     print("Iniciando la interfaz gráfica de Jarvis en el hilo principal...")
+    QApplication, MascotWindow = arranque.resultado("importar_gui")
     app = QApplication(sys.argv)
     mascot = MascotWindow(comm_queue=comm_queue)
     mascot.show()
-    
-    sys.exit(app.exec_())
+
+    codigo = app.exec_()
+    # Los temporizadores pendientes no deben sonar con la ventana ya cerrada.
+    if locales:
+        locales.detener()
+    sys.exit(codigo)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
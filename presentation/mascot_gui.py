@@ -4,14 +4,46 @@
 @version 1.0.0
 @description Define la ventana y las animaciones de la mascota de J.A.R.V.I.S.
              Se comunica con el backend a través de una cola de mensajes para
-             actualizar su estado visual en tiempo real.
+             actualizar su estado visual en tiempo real. Un hilo puente vacía la
+             cola y reenvía cada mensaje como señal de Qt, así que los cambios de
+             estado llegan al momento y en orden. El temporizador de animación
+             solo corre en los estados animados: en reposo la ventana no se
+             repinta. Las capas estáticas se dibujan una vez en QPixmap.
 """
 
 import sys
 import math
+import threading
+import time
 from PyQt5.QtWidgets import QMainWindow, QApplication
-from PyQt5.QtCore import Qt, QTimer, QPoint, QRectF
-from PyQt5.QtGui import QPainter, QColor, QBrush, QPen
+from PyQt5.QtCore import Qt, QTimer, QPoint, QRectF, QObject, pyqtSignal
+from PyQt5.QtGui import QPainter, QColor, QBrush, QPen, QPixmap
+
+# Intervalo del temporizador de animación por estado (ms). None = sin animación.
+INTERVALO_POR_ESTADO = {"idle": None, "listening": 30, "processing": 30, "speaking": 30}
+# Segundos durante los que un nivel de audio recibido sigue mandando sobre la onda sintética.
+VIGENCIA_NIVEL = 0.3
+
+class _QueueBridge(QObject):
+    """
+    @class _QueueBridge
+    @description Hilo privado que bloquea en la cola del backend y emite cada
+                 mensaje como señal; Qt lo entrega en el hilo de la GUI.
+    """
+    mensaje = pyqtSignal(dict)
+
+    def __init__(self, comm_queue):
+        super().__init__()
+        self.comm_queue = comm_queue
+        threading.Thread(target=self._run, name="gui-bridge", daemon=True).start()
+
+    def _run(self):
+        while True:
+            message = self.comm_queue.get()
+            if message is None:
+                return
+            self.mensaje.emit(message)
+
 
 class MascotWindow(QMainWindow):
     """
@@ -25,7 +57,6 @@ class MascotWindow(QMainWindow):
         self.state = "idle"
         self.animation_timer = QTimer(self)
         self.animation_timer.timeout.connect(self.update_animation)
-        self.animation_timer.start(30) # ~33 FPS
 
         # Configuración de la ventana para que sea un HUD
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
@@ -36,20 +67,33 @@ class MascotWindow(QMainWindow):
         self.pulse_value = 0
         self.pulse_direction = 1
         self.rotation_angle = 0
+        self.audio_level = 0.0
+        self._instante_nivel = 0.0
+        self._capas = {}
 
-        # Timer para leer mensajes del backend
+        # Puente con el backend: cada mensaje llega como señal, sin sondeo.
         if self.comm_queue:
-            self.queue_timer = QTimer(self)
-            self.queue_timer.timeout.connect(self.check_queue)
-            self.queue_timer.start(100)
+            self._bridge = _QueueBridge(self.comm_queue)
+            self._bridge.mensaje.connect(self.on_message)
 
-    def check_queue(self):
-        """Revisa la cola de comunicación en busca de cambios de estado."""
-        if self.comm_queue and not self.comm_queue.empty():
-            message = self.comm_queue.get()
-            if "state" in message:
-                self.state = message["state"]
-                print(f"GUI: Cambiando a estado -> {self.state}")
+    def on_message(self, message: dict):
+        """Atiende un mensaje del backend (cambio de estado o nivel de audio)."""
+        if "audio_level" in message:
+            self.audio_level = max(self.audio_level, float(message["audio_level"]))
+            self._instante_nivel = time.monotonic()
+        if "state" in message and message["state"] != self.state:
+            self.state = message["state"]
+            print(f"GUI: Cambiando a estado -> {self.state}")
+            self._ajustar_temporizador()
+            self.update()
+
+    def _ajustar_temporizador(self):
+        """Arranca o detiene el temporizador de animación según el estado."""
+        intervalo = INTERVALO_POR_ESTADO.get(self.state)
+        if intervalo is None:
+            self.animation_timer.stop()
+        elif not self.animation_timer.isActive() or self.animation_timer.interval() != intervalo:
+            self.animation_timer.start(intervalo)
 
     def update_animation(self):
         """Actualiza los parámetros de la animación en cada frame."""
@@ -60,38 +104,73 @@ class MascotWindow(QMainWindow):
                 self.pulse_direction *= -1
         else:
              self.pulse_value = 0
+        # El nivel recibido decae entre palabras para que la onda "respire".
+        self.audio_level *= 0.85
         self.update() # Vuelve a llamar a paintEvent para redibujar
 
+    def resizeEvent(self, event):
+        self._capas.clear()
+        super().resizeEvent(event)
+
+    def _capa(self, nombre: str) -> QPixmap:
+        """Devuelve (y crea la primera vez) una capa estática del tamaño de la ventana."""
+        capa = self._capas.get(nombre)
+        if capa is not None:
+            return capa
+        capa = QPixmap(self.size())
+        capa.fill(Qt.transparent)
+        painter = QPainter(capa)
+        painter.setRenderHint(QPainter.Antialiasing)
+        radius = min(self.width(), self.height()) // 3
+        painter.translate(self.width() / 2, self.height() / 2)
+        if nombre == "idle":
+            painter.setPen(QPen(QColor(0, 150, 255, 100), 2))
+            painter.drawEllipse(-radius, -radius, radius * 2, radius * 2)
+        elif nombre == "processing":
+            painter.setPen(QPen(QColor(0, 150, 255, 200), 4))
+            rect = QRectF(-radius, -radius, radius * 2, radius * 2)
+            painter.drawArc(rect, 0, 90 * 16)
+            painter.drawArc(rect, 180 * 16, 90 * 16)
+        painter.end()
+        self._capas[nombre] = capa
+        return capa
+
+    def _amplitud_habla(self, i: int) -> float:
+        """Desplazamiento de la onda i: nivel real del TTS si es reciente, si no una senoide."""
+        if time.monotonic() - self._instante_nivel < VIGENCIA_NIVEL:
+            return self.audio_level * (12 - i * 3)
+        return math.sin(self.rotation_angle / 20 + i) * 5
+
     def paintEvent(self, event):
         """Método principal de dibujado, se llama en cada frame."""
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
-        
-        base_color = QColor(0, 150, 255, 200)
+
+        if self.state == "idle":
+            painter.drawPixmap(0, 0, self._capa("idle"))
+            return
+        if self.state == "processing":
+            # La capa con los arcos se gira entera en lugar de redibujarlos. Antes
+            # el lienzo giraba x1 en sentido horario y los arcos x3 en sentido
+            # antihorario (drawArc mide al revés que rotate): neto, x2 antihorario.
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            painter.translate(self.width() / 2, self.height() / 2)
+            painter.rotate(-self.rotation_angle * 2)
+            painter.drawPixmap(-self.width() // 2, -self.height() // 2, self._capa("processing"))
+            return
+
         center = QPoint(self.width() // 2, self.height() // 2)
         radius = min(self.width(), self.height()) // 3
-        
         painter.translate(center)
-        painter.rotate(self.rotation_angle)
 
-        if self.state == "idle":
-            painter.setPen(QPen(QColor(0, 150, 255, 100), 2))
-            painter.drawEllipse(-radius, -radius, radius * 2, radius * 2)
-        elif self.state == "listening":
+        if self.state == "listening":
             pulse_radius = radius + (10 * self.pulse_value)
             pulse_alpha = 150 - (100 * self.pulse_value)
             painter.setPen(QPen(QColor(0, 200, 255, int(pulse_alpha)), 3))
             painter.drawEllipse(-int(pulse_radius), -int(pulse_radius), int(pulse_radius) * 2, int(pulse_radius) * 2)
-        elif self.state == "processing":
-            painter.setPen(QPen(base_color, 4))
-            rect = QRectF(-radius, -radius, radius * 2, radius * 2)
-            start_angle = (self.rotation_angle * 3) % 360
-            painter.drawArc(rect, start_angle * 16, 90 * 16)
-            painter.drawArc(rect, (start_angle + 180) * 16, 90 * 16)
         elif self.state == "speaking":
-            painter.setPen(QPen(base_color, 2))
             for i in range(3):
-                wave_radius = radius + (i * 15) + (math.sin(self.rotation_angle / 20 + i) * 5)
+                wave_radius = radius + (i * 15) + self._amplitud_habla(i)
                 wave_alpha = 150 - (i * 40)
                 painter.setPen(QPen(QColor(0, 150, 255, wave_alpha), 2))
-                painter.drawEllipse(-int(wave_radius), -int(wave_radius), int(wave_radius) * 2, int(wave_radius) * 2)
\ No newline at end of file
+                painter.drawEllipse(-int(wave_radius), -int(wave_radius), int(wave_radius) * 2, int(wave_radius) * 2)
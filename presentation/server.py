@@ -0,0 +1,243 @@
+"""
+@fileoverview Punto de entrada del modo servidor multi-sesión de J.A.R.V.I.S.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Atiende a varios clientes (salas o clientes ligeros) desde un solo
+             proceso. Cada cliente envía su audio por TCP (ver
+             infrastructure/server/protocol.py) y recibe estados, textos y la voz
+             sintetizada. Todas las sesiones comparten un único modelo VOSK, un
+             pool de reconocedores, el motor de TTS y un planificador equitativo
+             del LLM; cada sesión tiene su propio orquestador, así que no hay un
+             lock global de conversación. Un control de admisión rechaza a los
+             clientes que superan el número máximo de sesiones.
+             Uso: python -m presentation.server --puerto 8765 --max-sesiones 4
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from infrastructure.audio.audio_capture import AudioCaptureService, cargar_modelo_vosk, DEFAULT_MODEL_PATH
+from infrastructure.audio.audio_source import PushAudioSource
+from infrastructure.audio.hotword_detector import VoskHotwordDetector
+from infrastructure.audio.network_tts import NetworkTTSService
+from infrastructure.audio.recognizer_pool import RecognizerPool
+from infrastructure.audio.stt_service import VoskSTTService
+from infrastructure.audio.tts_service import Pyttsx3TTSService
+from infrastructure.audio.dsp import SAMPLERATE_MODELO
+from infrastructure.llm.llm_service import OllamaLLMService
+from infrastructure.llm.cached_llm_service import CachedLLMService
+from infrastructure.server import protocol
+
+from application.orchestrator import AssistantOrchestrator
+from application.llm_scheduler import FairLLMScheduler
+from application.conversation import ConversationSession
+from application.local_intents import LocalIntents
+from application.use_cases import FRASES_FIJAS, MODELO_POR_DEFECTO, PROMPT_SISTEMA
+
+class _ColaCliente:
+    """Adaptador privado con la interfaz 'put' de comm_queue que envía al cliente."""
+    def __init__(self, enviar):
+        self._enviar = enviar
+
+    def put(self, mensaje: dict):
+        self._enviar(protocol.empaquetar_control(mensaje))
+
+
+class _SalidaCliente:
+    """
+    @class _SalidaCliente
+    @description Tramas pendientes de enviar a un cliente. Se encolan desde
+                 cualquier hilo en una cola acotada y una tarea del bucle las
+                 escribe esperando a 'drain()'. Si el cliente deja de leer y la
+                 cola se llena, se corta la conexión en lugar de acumular audio
+                 sin límite en el servidor compartido.
+    """
+    def __init__(self, writer: asyncio.StreamWriter, loop: asyncio.AbstractEventLoop, max_tramas: int):
+        self._writer = writer
+        self._loop = loop
+        self._cola = asyncio.Queue(maxsize=max_tramas)
+        self.desbordada = False
+        self._tarea = loop.create_task(self._escribir())
+
+    def enviar(self, trama: bytes):
+        """Encola una trama; se puede llamar desde los hilos del executor."""
+        self._loop.call_soon_threadsafe(self._meter, trama)
+
+    def _meter(self, trama: bytes):
+        if self.desbordada:
+            return
+        try:
+            self._cola.put_nowait(trama)
+        except asyncio.QueueFull:
+            self.desbordada = True
+            # Cierra la conexión; el bucle de lectura ve el fin y limpia la sesión.
+            self._writer.transport.abort()
+
+    async def _escribir(self):
+        try:
+            while True:
+                self._writer.write(await self._cola.get())
+                await self._writer.drain()
+        except ConnectionError:
+            pass
+
+    async def cerrar(self):
+        self._tarea.cancel()
+        await asyncio.gather(self._tarea, return_exceptions=True)
+
+
+class AssistantServer:
+    """
+    @class AssistantServer
+    @description Recursos compartidos y ciclo de vida de las sesiones.
+    """
+    def __init__(self, model, tts_renderer, llm_service, max_sesiones=4, llm_concurrentes=2, keyword="jarvis",
+                 max_tramas_salida=64):
+        """
+        @param {vosk.Model} model - Modelo VOSK cargado una sola vez.
+        @param {Pyttsx3TTSService} tts_renderer - Motor que renderiza la voz de todas las sesiones.
+        @param {ILLMService} llm_service - LLM compartido.
+        @param {int} max_sesiones - Sesiones simultáneas admitidas.
+        @param {int} llm_concurrentes - Generaciones simultáneas en el LLM.
+        @param {int} max_tramas_salida - Tramas sin enviar por sesión (cada frase hablada
+               es una) a partir de las que se considera que el cliente no lee y se cierra.
+        """
+        self.model = model
+        self.tts_renderer = tts_renderer
+        self.max_sesiones = max_sesiones
+        self.keyword = keyword
+        self.max_tramas_salida = max_tramas_salida
+        self.scheduler = FairLLMScheduler(llm_service, max_concurrentes=llm_concurrentes)
+        self.pool_hotword = RecognizerPool(model, SAMPLERATE_MODELO, max_sesiones,
+                                           gramatica=f'["{keyword}", "[unk]"]', palabras=True)
+        self.pool_stt = RecognizerPool(model, SAMPLERATE_MODELO, max_sesiones)
+        # Cada sesión ocupa un hilo con su detector y, durante un turno, hasta cuatro más.
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_sesiones * 5,
+                                                              thread_name_prefix="sesion")
+        self.sesiones = 0
+        self.rechazadas = 0
+        self.desbordadas = 0
+        self._ids = itertools.count(1)
+
+    async def atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Ciclo de vida de una conexión: admisión, sesión y limpieza."""
+        if self.sesiones >= self.max_sesiones:
+            self.rechazadas += 1
+            writer.write(protocol.empaquetar_control({"error": "ocupado", "max_sesiones": self.max_sesiones}))
+            await writer.drain()
+            writer.close()
+            return
+
+        self.sesiones += 1
+        sesion = f"sesion-{next(self._ids)}"
+        tarea = None
+        salida = _SalidaCliente(writer, asyncio.get_running_loop(), self.max_tramas_salida)
+        enviar = salida.enviar
+        capture = None
+        tts = None
+        intenciones = None
+        try:
+            trama = await protocol.leer_trama(reader)
+            if trama is None or trama[0] != protocol.HOLA:
+                return
+            hola = json.loads(trama[1])
+            source = PushAudioSource(int(hola.get("samplerate", SAMPLERATE_MODELO)), int(hola.get("canales", 1)))
+            capture = AudioCaptureService(model=self.model, source=source)
+            hotword = VoskHotwordDetector(capture, keyword=self.keyword, recognizer_pool=self.pool_hotword)
+            stt = VoskSTTService(capture, keyword=self.keyword, recognizer_pool=self.pool_stt)
+            tts = NetworkTTSService(self.tts_renderer,
+                                    enviar_audio=lambda pcm, sr: enviar(protocol.empaquetar_audio(pcm, sr)),
+                                    enviar_control=lambda mensaje: enviar(protocol.empaquetar_control(mensaje)))
+            llm = self.scheduler.para_sesion(sesion)
+            intenciones = LocalIntents(tts)
+            orquestador = AssistantOrchestrator(hotword, stt, tts, llm,
+                                                comm_queue=_ColaCliente(enviar), barge_in=bool(hola.get("barge_in")),
+                                                executor=self.executor,
+                                                conversacion=ConversationSession(llm, PROMPT_SISTEMA),
+                                                intenciones=intenciones.router)
+            enviar(protocol.empaquetar_control({"sesion": sesion, "state": "idle"}))
+            tarea = asyncio.create_task(orquestador.run())
+            print(f"🔌 {sesion} conectada ({self.sesiones}/{self.max_sesiones}).")
+
+            while True:
+                trama = await protocol.leer_trama(reader)
+                if trama is None or trama[0] == protocol.FIN:
+                    break
+                if trama[0] == protocol.AUDIO:
+                    source.empujar(trama[1])
+        except Exception as e:
+            print(f"Error en {sesion}: {e}")
+        finally:
+            if tarea is not None:
+                tarea.cancel()
+                await asyncio.gather(tarea, return_exceptions=True)
+            if capture is not None:
+                capture.stop()
+            if intenciones is not None:
+                intenciones.detener()
+            if tts is not None:
+                tts.cerrar()
+            await salida.cerrar()
+            if salida.desbordada:
+                self.desbordadas += 1
+                print(f"⚠️ {sesion} no leía la voz enviada; se cierra la sesión.")
+            self.sesiones -= 1
+            writer.close()
+            print(f"🔌 {sesion} desconectada.")
+
+    def estadisticas(self) -> dict:
+        return {"sesiones": self.sesiones, "rechazadas": self.rechazadas, "desbordadas": self.desbordadas,
+                "llm": self.scheduler.estadisticas(),
+                "reconocedores_hotword": self.pool_hotword.estadisticas(),
+                "reconocedores_stt": self.pool_stt.estadisticas()}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m presentation.server",
+                                     description="Servidor multi-sesión de J.A.R.V.I.S.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--max-sesiones", type=int, default=4)
+    parser.add_argument("--llm-concurrentes", type=int, default=2)
+    parser.add_argument("--url-ollama", default="http://localhost:11434/api/generate")
+    parser.add_argument("--modelo-vosk", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--sin-cache", action="store_true",
+                        help="No usa la caché de respuestas (útil en pruebas de carga).")
+    return parser.parse_args(argv)
+
+async def _servir(args):
+    model = cargar_modelo_vosk(args.modelo_vosk)
+    tts_renderer = Pyttsx3TTSService()
+    tts_renderer.precalentar(FRASES_FIJAS)
+    ollama_service = OllamaLLMService(url=args.url_ollama, pool_size=max(4, args.llm_concurrentes * 2))
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, ollama_service.warm_up, MODELO_POR_DEFECTO)
+    llm_service = ollama_service if args.sin_cache else CachedLLMService(ollama_service, ruta_sqlite="cache/respuestas.sqlite3")
+    servidor = AssistantServer(model, tts_renderer, llm_service, args.max_sesiones, args.llm_concurrentes)
+    tcp = await asyncio.start_server(servidor.atender, args.host, args.puerto)
+    print(f"🛰️  Servidor de Jarvis escuchando en {args.host}:{args.puerto} "
+          f"(máx. {args.max_sesiones} sesiones, {args.llm_concurrentes} generaciones LLM).")
+    async with tcp:
+        await tcp.serve_forever()
+
+def main():
+    """
+    @function main
+    @description Arranca el servidor hasta que se interrumpa con Ctrl+C.
+    """
+    try:
+        asyncio.run(_servir(parse_args()))
+    except KeyboardInterrupt:
+        print("Servidor detenido.")
+
+if __name__ == '__main__':
+    main()
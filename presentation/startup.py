@@ -0,0 +1,87 @@
+"""
+@fileoverview Orquestador del arranque: inicialización concurrente con desglose de tiempos.
+@author Danilo Castillejo (DJ111980)
+@version 1.0.0
+@description Ejecuta en paralelo las tareas de arranque independientes (carga del
+             modelo VOSK, motor de TTS, precarga de Ollama, importación de la GUI)
+             respetando sus dependencias, y mide cuándo empezó y terminó cada una.
+             Las tareas "bloqueantes" son las que deben terminar antes de que el
+             asistente esté listo; el resto sigue en segundo plano.
+"""
+
+import concurrent.futures
+import time
+from typing import Callable
+
+class StartupOrchestrator:
+    """
+    @class StartupOrchestrator
+    @description Grafo de tareas de arranque sobre un pool de hilos. Cada tarea recibe
+                 como argumentos los resultados de las tareas de las que depende.
+    """
+    def __init__(self, origen: float | None = None, max_workers=8):
+        """
+        @param {float | None} origen - perf_counter del inicio del proceso (por defecto, ahora).
+        @param {int} max_workers - Hilos del pool; debe cubrir todas las tareas, porque
+               una tarea dependiente ocupa su hilo mientras espera.
+        """
+        self.origen = origen if origen is not None else time.perf_counter()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                               thread_name_prefix="arranque")
+        self._tareas = {}
+        self._bloqueantes = []
+        self._tiempos = {}
+        self.instante_listo = None
+
+    def lanzar(self, nombre: str, funcion: Callable, *dependencias: str, bloqueante=True):
+        """
+        @param {str} nombre - Identificador de la tarea en el desglose.
+        @param {Callable} funcion - Se llama con los resultados de 'dependencias'.
+        @param {str} dependencias - Nombres de tareas lanzadas previamente.
+        @param {bool} bloqueante - Si el asistente debe esperarla para estar listo.
+        """
+        previas = [self._tareas[d] for d in dependencias]
+
+        def _ejecutar():
+            argumentos = [futuro.result() for futuro in previas]
+            inicio = time.perf_counter()
+            try:
+                return funcion(*argumentos)
+            finally:
+                self._tiempos[nombre] = (inicio - self.origen, time.perf_counter() - self.origen)
+
+        self._tareas[nombre] = self._executor.submit(_ejecutar)
+        if bloqueante:
+            self._bloqueantes.append(nombre)
+
+    def anotar(self, nombre: str, inicio: float, fin: float):
+        """Añade al desglose una fase medida fuera del pool (instantes perf_counter)."""
+        self._tiempos[nombre] = (inicio - self.origen, fin - self.origen)
+
+    def resultado(self, nombre: str):
+        """Espera a la tarea y devuelve su resultado (o relanza su excepción)."""
+        return self._tareas[nombre].result()
+
+    def esperar(self) -> float:
+        """
+        @returns {float} - Segundos desde el origen hasta que terminan las tareas bloqueantes.
+        """
+        for nombre in self._bloqueantes:
+            self._tareas[nombre].result()
+        self.instante_listo = time.perf_counter() - self.origen
+        self._executor.shutdown(wait=False)
+        return self.instante_listo
+
+    def resumen(self) -> str:
+        """Tabla con el inicio y la duración de cada tarea, en orden de inicio."""
+        lineas = [f"{'tarea':<18}{'inicio (s)':>11}{'duración (s)':>14}"]
+        nombres = set(self._tareas) | set(self._tiempos)
+        for nombre in sorted(nombres, key=lambda n: self._tiempos.get(n, (float("inf"),))[0]):
+            if nombre in self._tiempos:
+                inicio, fin = self._tiempos[nombre]
+                lineas.append(f"{nombre:<18}{inicio:>11.2f}{fin - inicio:>14.2f}")
+            else:
+                lineas.append(f"{nombre:<18}{'en segundo plano':>25}")
+        if self.instante_listo is not None:
+            lineas.append(f"{'listo':<18}{self.instante_listo:>11.2f}")
+        return "\n".join(lineas)